@@ -1,19 +1,32 @@
 # mentor_connect_ngo_enhanced/app/__init__.py
 import os
+from threading import Lock
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
 from flask_login import LoginManager
-from flask_mail import Mail # Import Flask-Mail
 from dotenv import load_dotenv
+from app.database import engine_options, register_sqlite_pragmas
 
 # Load environment variables from the .env file.
 load_dotenv()
 
 db = SQLAlchemy()
-bcrypt = Bcrypt()
 login_manager = LoginManager()
-mail = Mail() # Initialize Flask-Mail
+
+_mail_lock = Lock()
+
+
+def get_mail(app):
+    """
+    Returns the Flask-Mail extension for the app, importing and configuring it on first use.
+    Most requests never send email, so this keeps flask_mail out of worker startup.
+    """
+    if 'mail' not in app.extensions:
+        with _mail_lock:
+            if 'mail' not in app.extensions:
+                from flask_mail import Mail
+                Mail(app)
+    return app.extensions['mail'] # Flask-Mail's per-app state, which provides send()
 
 login_manager.login_view = 'main.login'
 login_manager.login_message_category = 'info'
@@ -24,6 +37,20 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///site.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    # Database engine profile. The SQLite pragmas are applied to every new connection;
+    # set SQLITE_JOURNAL_MODE to an empty value to keep SQLite's default rollback journal.
+    app.config['SQLITE_JOURNAL_MODE'] = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    app.config['SQLITE_SYNCHRONOUS'] = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    app.config['SQLITE_BUSY_TIMEOUT'] = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)) # Milliseconds to wait for a lock
+    app.config['SQLITE_CACHE_SIZE'] = int(os.getenv('SQLITE_CACHE_SIZE', -20000)) # Negative values are KiB (about 20 MB)
+    app.config['SQLITE_MMAP_SIZE'] = int(os.getenv('SQLITE_MMAP_SIZE', 268435456)) # Bytes (256 MB)
+    app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', 10))
+    app.config['DB_MAX_OVERFLOW'] = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    app.config['DB_POOL_TIMEOUT'] = float(os.getenv('DB_POOL_TIMEOUT', 30)) # Seconds to wait for a free connection
+    app.config['DB_POOL_PRE_PING'] = os.getenv('DB_POOL_PRE_PING', 'True').lower() in ('true', '1', 't')
+    app.config['DB_POOL_RECYCLE'] = int(os.getenv('DB_POOL_RECYCLE', 1800)) # Seconds
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
     # Configure Flask-Mail
     app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER')
     app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
@@ -33,26 +60,135 @@ def create_app():
     app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD')
     app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER')
 
+    # Opt-in request profiling: per-endpoint latency percentiles, SQL counts and N+1 detection (see app/profiling.py)
+    app.config['PROFILING_ENABLED'] = os.getenv('PROFILING_ENABLED', 'False').lower() in ('true', '1', 't')
+    app.config['PROFILING_WINDOW'] = int(os.getenv('PROFILING_WINDOW', 1000)) # Recent requests per endpoint used for percentiles
+    app.config['PROFILING_N_PLUS_ONE_THRESHOLD'] = int(os.getenv('PROFILING_N_PLUS_ONE_THRESHOLD', 5)) # Repeats of one statement per request
+    app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN') # Bearer token for Prometheus scrapes
+    # Opt-in capture of distinct SQL statements for the index advisor (see app/index_advisor.py)
+    app.config['INDEX_ADVISOR_ENABLED'] = os.getenv('INDEX_ADVISOR_ENABLED', 'False').lower() in ('true', '1', 't')
+    app.config['INDEX_ADVISOR_MAX_STATEMENTS'] = int(os.getenv('INDEX_ADVISOR_MAX_STATEMENTS', 500))
+
+    # Logged-in users are loaded from a short-lived identity cache (see app/identity.py)
+    app.config['IDENTITY_CACHE_TTL'] = int(os.getenv('IDENTITY_CACHE_TTL', 30)) # Seconds
+    app.config['IDENTITY_CACHE_MAX_ENTRIES'] = int(os.getenv('IDENTITY_CACHE_MAX_ENTRIES', 10000))
+
+    # User activity timestamps are buffered and written in bulk (see app/activity.py)
+    app.config['ACTIVITY_FLUSH_INTERVAL'] = float(os.getenv('ACTIVITY_FLUSH_INTERVAL', 5)) # Seconds between bulk writes
+    app.config['ACTIVITY_FLUSH_EVENTS'] = int(os.getenv('ACTIVITY_FLUSH_EVENTS', 200)) # Pending users that trigger an early write
+
+    # Configure the AI chatbot upstream and its response cache
+    app.config['CHATBOT_API_URL'] = os.getenv('CHATBOT_API_URL', 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent')
+    app.config['CHATBOT_STREAM_API_URL'] = os.getenv('CHATBOT_STREAM_API_URL', 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:streamGenerateContent')
+    app.config['CHATBOT_CACHE_ENABLED'] = os.getenv('CHATBOT_CACHE_ENABLED', 'True').lower() in ('true', '1', 't')
+    app.config['CHATBOT_CACHE_TTL'] = int(os.getenv('CHATBOT_CACHE_TTL', 86400)) # Seconds
+    app.config['CHATBOT_CACHE_MAX_ENTRIES'] = int(os.getenv('CHATBOT_CACHE_MAX_ENTRIES', 5000))
+    app.config['CHATBOT_CACHE_MEMORY_ENTRIES'] = int(os.getenv('CHATBOT_CACHE_MEMORY_ENTRIES', 500))
+    app.config['CHATBOT_CONNECT_TIMEOUT'] = float(os.getenv('CHATBOT_CONNECT_TIMEOUT', 3.05)) # Seconds
+    app.config['CHATBOT_READ_TIMEOUT'] = float(os.getenv('CHATBOT_READ_TIMEOUT', 30)) # Seconds
+    app.config['CHATBOT_MAX_CONCURRENCY'] = int(os.getenv('CHATBOT_MAX_CONCURRENCY', 8)) # In-flight upstream calls per process
+    app.config['CHATBOT_ACQUIRE_TIMEOUT'] = float(os.getenv('CHATBOT_ACQUIRE_TIMEOUT', 5)) # Seconds to wait for a free slot
+    app.config['CHATBOT_MAX_RETRIES'] = int(os.getenv('CHATBOT_MAX_RETRIES', 2))
+    app.config['CHATBOT_RETRY_BACKOFF'] = float(os.getenv('CHATBOT_RETRY_BACKOFF', 0.25)) # Seconds, doubled per retry
+    app.config['CHATBOT_BREAKER_THRESHOLD'] = int(os.getenv('CHATBOT_BREAKER_THRESHOLD', 5)) # Consecutive failures
+    app.config['CHATBOT_BREAKER_RESET'] = float(os.getenv('CHATBOT_BREAKER_RESET', 30)) # Seconds before a trial call
+    app.config['CHATBOT_INDEX_TTL'] = int(os.getenv('CHATBOT_INDEX_TTL', 300)) # Seconds between local index rebuilds
+    app.config['CHATBOT_FAQ_THRESHOLD'] = float(os.getenv('CHATBOT_FAQ_THRESHOLD', 0.8)) # Query coverage needed to answer from an FAQ
+    app.config['CHATBOT_CONTEXT_DOCS'] = int(os.getenv('CHATBOT_CONTEXT_DOCS', 3)) # Snippets added to upstream prompts
+    app.config['CHATBOT_HISTORY_TURNS'] = int(os.getenv('CHATBOT_HISTORY_TURNS', 6)) # Recent exchanges kept verbatim
+    app.config['CHATBOT_SUMMARY_CHARS'] = int(os.getenv('CHATBOT_SUMMARY_CHARS', 1200)) # Cap on the summary of older turns
+    app.config['CHATBOT_CONTEXT_TOKENS'] = int(os.getenv('CHATBOT_CONTEXT_TOKENS', 1500)) # History budget per upstream request
+    app.config['CHATBOT_SESSION_IDLE'] = int(os.getenv('CHATBOT_SESSION_IDLE', 1800)) # Seconds before a new conversation starts
+    app.config['CHATBOT_DELIVERY'] = os.getenv('CHATBOT_DELIVERY', 'jobs') # 'jobs' (background + polling) or 'stream' (SSE)
+    app.config['CHATBOT_WORKERS'] = int(os.getenv('CHATBOT_WORKERS', 4)) # Background threads per process
+    app.config['CHATBOT_QUEUE_SIZE'] = int(os.getenv('CHATBOT_QUEUE_SIZE', 32)) # Queued + running jobs per process
+    app.config['CHATBOT_JOB_RETENTION'] = int(os.getenv('CHATBOT_JOB_RETENTION', 3600)) # Seconds to keep finished jobs
+    app.config['CHATBOT_JOB_STALE'] = int(os.getenv('CHATBOT_JOB_STALE', 300)) # Seconds before a pending job counts as lost
+    app.config['CHATBOT_JOB_SAVE_INTERVAL'] = float(os.getenv('CHATBOT_JOB_SAVE_INTERVAL', 1.0)) # Seconds between partial reply writes
+
+    # Password hashing: bcrypt cost is calibrated to PASSWORD_HASH_TARGET_MS unless BCRYPT_LOG_ROUNDS is set.
+    if os.getenv('BCRYPT_LOG_ROUNDS'):
+        app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv('BCRYPT_LOG_ROUNDS'))
+    app.config['PASSWORD_HASH_TARGET_MS'] = int(os.getenv('PASSWORD_HASH_TARGET_MS', 250))
+    app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS', 2)) # Hashing processes; 0 hashes inline
+    app.config['PASSWORD_HASH_QUEUE'] = int(os.getenv('PASSWORD_HASH_QUEUE', 32)) # Hashes queued or running per process
+    app.config['PASSWORD_HASH_TIMEOUT'] = int(os.getenv('PASSWORD_HASH_TIMEOUT', 10)) # Seconds to wait for a free slot
+    app.config['API_BATCH_MAX_REQUESTS'] = int(os.getenv('API_BATCH_MAX_REQUESTS', 10)) # Sub-requests per /api/v1/batch call
+    app.config['ASSET_MAX_AGE'] = int(os.getenv('ASSET_MAX_AGE', 31536000)) # Cache lifetime of fingerprinted assets (build_assets.py)
+    app.config['MESSAGE_ARCHIVE_AFTER_DAYS'] = int(os.getenv('MESSAGE_ARCHIVE_AFTER_DAYS', 365)) # Older messages go to cold storage (archive_messages.py)
+    app.config['MESSAGE_ARCHIVE_BATCH_SIZE'] = int(os.getenv('MESSAGE_ARCHIVE_BATCH_SIZE', 5000)) # Messages moved per transaction
+
+    # Bulk progress reports (see app/reports.py and generate_reports.py)
+    app.config['PROGRESS_REPORT_DIR'] = os.getenv('PROGRESS_REPORT_DIR') # Where admin-triggered runs write; defaults to instance/reports
+    app.config['PROGRESS_REPORT_WORKERS'] = int(os.getenv('PROGRESS_REPORT_WORKERS')) if os.getenv('PROGRESS_REPORT_WORKERS') else None # Rendering processes; one per CPU when unset
+    app.config['PROGRESS_REPORT_CHUNK_SIZE'] = int(os.getenv('PROGRESS_REPORT_CHUNK_SIZE', 200)) # Students per worker task
+
+    # Template caching: {% cache %} fragments (see app/fragments.py) and compiled template bytecode.
+    app.config['FRAGMENT_CACHE_BACKEND'] = os.getenv('FRAGMENT_CACHE_BACKEND', 'memory') # 'memory', 'sqlite' (shared by workers) or 'none'
+    app.config['FRAGMENT_CACHE_PATH'] = os.getenv('FRAGMENT_CACHE_PATH') # SQLite file; defaults to the instance folder
+    app.config['FRAGMENT_CACHE_TTL'] = int(os.getenv('FRAGMENT_CACHE_TTL', 300)) # Seconds, when a block gives none
+    app.config['FRAGMENT_CACHE_MAX_ENTRIES'] = int(os.getenv('FRAGMENT_CACHE_MAX_ENTRIES', 5000))
+    app.config['TEMPLATE_BYTECODE_CACHE'] = os.getenv('TEMPLATE_BYTECODE_CACHE', 'True').lower() in ('true', '1', 't')
+    app.config['TEMPLATE_BYTECODE_CACHE_DIR'] = os.getenv('TEMPLATE_BYTECODE_CACHE_DIR') # Defaults to a private temp folder
+
     db.init_app(app)
-    bcrypt.init_app(app)
+    with app.app_context():
+        register_sqlite_pragmas(app, db.engine)
     login_manager.init_app(app)
-    mail.init_app(app) # Initialize mail with the app
+
+    from app.passwords import password_hasher
+    password_hasher.init_app(app)
 
     # Import ALL database models here to ensure they are registered with SQLAlchemy
-    # before db.create_all() is called.
+    # before the schema is created or queried.
     # Added new models: Quiz, Question, QuizAttempt, QuizAnswer, StudentResourceCompletion
     from app.models import User, Message, SessionLog, Resource, Announcement, \
-                           Quiz, Question, Option, QuizAttempt, QuizAnswer, StudentResourceCompletion
+                           Quiz, Question, Option, QuizAttempt, QuizAnswer, StudentResourceCompletion, \
+                           SessionRollup, ChatbotCacheEntry, ChatbotJob, FAQ, ChatHistory, ContentVersion, MessageArchive
+
+    from app.identity import identity_cache
+    identity_cache.init_app(app)
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # Served from the identity cache; only a cache miss queries the user table.
+        return identity_cache.load_user(int(user_id))
+
+    from app.profiling import request_profiler
+    request_profiler.init_app(app)
+
+    from app.index_advisor import index_advisor
+    index_advisor.init_app(app)
+
+    from app.activity import activity_tracker
+    activity_tracker.init_app(app)
+
+    from app.chatbot import response_cache, chatbot_client, job_queue
+    response_cache.init_app(app)
+    chatbot_client.init_app(app)
+    job_queue.init_app(app)
+
+    from app.retrieval import knowledge_index
+    knowledge_index.init_app(app)
+
+    from app.reports import progress_report_jobs
+    progress_report_jobs.init_app(app)
+
+    from app.assets import asset_manifest
+    asset_manifest.init_app(app)
+
+    from app.fragments import fragment_cache
+    from app.conditional import content_versions
+    fragment_cache.init_app(app)
+    app.add_template_global(content_versions) # For {% cache %} keys
 
     from app.routes import main as main_blueprint
     app.register_blueprint(main_blueprint)
 
-    with app.app_context():
-        db.create_all() # Creates all tables defined in models.py
+    from app.api import api as api_v1_blueprint
+    app.register_blueprint(api_v1_blueprint)
+
+    # Tables are no longer created here; run `python init_db.py` once per deploy (see app/database.py).
 
     return app
 
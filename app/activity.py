@@ -0,0 +1,137 @@
+# mentor_connect_ngo_enhanced/app/activity.py
+import atexit
+from datetime import datetime
+from threading import Lock, Thread, Event
+from sqlalchemy import update, bindparam, or_
+from app import db
+from app.models import User
+
+
+class ActivityTracker:
+    """
+    Buffers "user X was active at T" in memory and writes it to User.last_activity / User.last_login
+    in one bulk UPDATE every ACTIVITY_FLUSH_INTERVAL seconds, or sooner once ACTIVITY_FLUSH_EVENTS
+    users are pending. Timestamps are kept to the minute, so repeat views within the same minute
+    cost nothing and page views no longer open a write transaction of their own.
+    """
+
+    def __init__(self, app=None):
+        self._lock = Lock()
+        self._pending = {} # user_id -> {'last_activity': minute, 'last_login': minute or None}
+        self._recorded = {} # user_id -> (last_activity, last_login) minutes already queued or written
+        self._wake = Event()
+        self._thread = None
+        self._exit_hook = False
+        self.stats = {'events': 0, 'coalesced': 0, 'flushes': 0, 'rows_written': 0, 'failed_flushes': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get('ACTIVITY_FLUSH_INTERVAL', 5)
+        self.max_pending = app.config.get('ACTIVITY_FLUSH_EVENTS', 200)
+        app.extensions['activity_tracker'] = self
+        if not self._exit_hook:
+            # Once per process: scripts and benchmarks create many apps, and the flush writes through the latest one.
+            atexit.register(self.flush)
+            self._exit_hook = True
+
+    def touch(self, user_id, login=False):
+        """Records that a user was active now (and logged in, when `login` is true)."""
+        if user_id is None:
+            return
+        minute = datetime.utcnow().replace(second=0, microsecond=0)
+        with self._lock:
+            self.stats['events'] += 1
+            last_activity, last_login = self._recorded.get(user_id, (None, None))
+            if last_activity == minute and (not login or last_login == minute):
+                self.stats['coalesced'] += 1
+                return
+            entry = self._pending.setdefault(user_id, {'last_activity': minute, 'last_login': None})
+            entry['last_activity'] = minute
+            if login:
+                entry['last_login'] = minute
+            self._recorded[user_id] = (minute, minute if login else last_login)
+            pending = len(self._pending)
+            self._ensure_worker()
+        if pending >= self.max_pending:
+            self._wake.set()
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = Thread(target=self._run, name='activity-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing user activity: {e}")
+
+    def flush(self):
+        """Writes all pending timestamps in one transaction. Returns the number of users updated."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        activity_rows = [{'uid': user_id, 'ts': entry['last_activity']} for user_id, entry in pending.items()]
+        login_rows = [{'uid': user_id, 'ts': entry['last_login']} for user_id, entry in pending.items() if entry['last_login']]
+        try:
+            self._write(activity_rows, login_rows)
+        except Exception:
+            self._requeue(pending)
+            raise
+
+        with self._lock:
+            self.stats['flushes'] += 1
+            self.stats['rows_written'] += len(pending)
+            if len(self._recorded) > 10 * self.max_pending:
+                self._recorded.clear() # Only a dedupe hint; dropping it just costs one extra write per user
+        return len(pending)
+
+    def _requeue(self, pending):
+        # A failed flush (e.g. "database is locked") puts its timestamps back for the next one. touch()
+        # will not queue the same user and minute again, so dropping them would lose that minute for good.
+        with self._lock:
+            self.stats['failed_flushes'] += 1
+            for user_id, entry in pending.items():
+                current = self._pending.get(user_id)
+                if current is None:
+                    self._pending[user_id] = entry
+                    continue
+                current['last_activity'] = max(current['last_activity'], entry['last_activity'])
+                if entry['last_login'] and (current['last_login'] is None or entry['last_login'] > current['last_login']):
+                    current['last_login'] = entry['last_login']
+
+    def _write(self, activity_rows, login_rows):
+        with self.app.app_context():
+            # Never move a timestamp backwards, e.g. past a login written directly by the login view.
+            with db.engine.begin() as connection:
+                connection.execute(
+                    update(User.__table__)
+                    .where(User.__table__.c.id == bindparam('uid'))
+                    .where(or_(User.__table__.c.last_activity == None, User.__table__.c.last_activity < bindparam('ts')))
+                    .values(last_activity=bindparam('ts')),
+                    activity_rows
+                )
+                if login_rows:
+                    connection.execute(
+                        update(User.__table__)
+                        .where(User.__table__.c.id == bindparam('uid'))
+                        .where(or_(User.__table__.c.last_login == None, User.__table__.c.last_login < bindparam('ts')))
+                        .values(last_login=bindparam('ts')),
+                        login_rows
+                    )
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['pending'] = len(self._pending)
+        return stats
+
+
+activity_tracker = ActivityTracker()
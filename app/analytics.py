@@ -0,0 +1,267 @@
+# mentor_connect_ngo_enhanced/app/analytics.py
+import time
+from threading import Lock
+from datetime import datetime, date, timedelta
+from sqlalchemy import case, delete, func, insert, or_, select, text
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import User, SessionLog, QuizAttempt, StudentResourceCompletion, SessionRollup
+
+# Cohort summaries are cached per mentor for a short time. Writes that change a student's
+# metrics (session logged, quiz taken, resource completed) drop the mentor's entry right away.
+COHORT_CACHE_TTL_SECONDS = 60
+_cohort_cache = {}
+_cohort_cache_lock = Lock()
+
+
+def invalidate_cohort_summary(mentor_id):
+    if mentor_id is None:
+        return
+    with _cohort_cache_lock:
+        _cohort_cache.pop(mentor_id, None)
+
+
+def get_cohort_summary(mentor_id):
+    """Returns the cached cohort summary for a mentor, computing it if missing or expired."""
+    now = time.monotonic()
+    with _cohort_cache_lock:
+        cached = _cohort_cache.get(mentor_id)
+        if cached and cached[0] > now:
+            return cached[1]
+
+    summary = compute_cohort_summary(mentor_id)
+    with _cohort_cache_lock:
+        _cohort_cache[mentor_id] = (now + COHORT_CACHE_TTL_SECONDS, summary)
+    return summary
+
+
+def compute_cohort_summary(mentor_id):
+    """
+    Builds one row per student assigned to the mentor with their last session date,
+    sessions this month, quiz average (percentage) and resources completed.
+    Uses one query for the students plus one GROUP BY query per metric table, so the
+    query count does not depend on how many students the mentor has.
+    """
+    month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    student_ids = db.session.query(User.id).filter(User.mentor_id == mentor_id).scalar_subquery()
+
+    students = db.session.query(User.id, User.username, User.email) \
+        .filter(User.mentor_id == mentor_id) \
+        .order_by(User.username).all()
+
+    session_stats = {
+        row.student_id: row for row in db.session.query(
+            SessionLog.student_id,
+            func.max(SessionLog.session_date).label('last_session'),
+            func.sum(case((SessionLog.session_date >= month_start, 1), else_=0)).label('sessions_this_month')
+        ).filter(SessionLog.student_id.in_(student_ids)).group_by(SessionLog.student_id)
+    }
+
+    quiz_averages = dict(db.session.query(
+        QuizAttempt.student_id,
+        func.avg(QuizAttempt.score * 100.0 / func.nullif(QuizAttempt.total_questions, 0))
+    ).filter(QuizAttempt.student_id.in_(student_ids)).group_by(QuizAttempt.student_id))
+
+    completion_counts = dict(db.session.query(
+        StudentResourceCompletion.student_id,
+        func.count(StudentResourceCompletion.id)
+    ).filter(StudentResourceCompletion.student_id.in_(student_ids)).group_by(StudentResourceCompletion.student_id))
+
+    summary = []
+    for student in students:
+        sessions = session_stats.get(student.id)
+        summary.append({
+            'id': student.id,
+            'username': student.username,
+            'email': student.email,
+            'last_session': sessions.last_session if sessions else None,
+            'sessions_this_month': int(sessions.sessions_this_month or 0) if sessions else 0,
+            'quiz_average': quiz_averages.get(student.id),
+            'resources_completed': completion_counts.get(student.id, 0),
+        })
+    return summary
+
+
+# --- Organisation-wide session analytics ---
+# Reports read from the SessionRollup table (one row per mentor, student and week) instead of
+# SessionLog. Sessions logged through the app are folded in by fold_session() in the same transaction
+# that inserts them; rebuild_session_rollup() recomputes the table after rows are written any other
+# way (seed_data.py, imports, upgrading an existing database) and is run by init_db.py.
+
+def week_start_of(day):
+    """Monday of the ISO week containing the given date."""
+    return day - timedelta(days=day.weekday())
+
+
+def _week_start_expr(column):
+    # Date bucketing is dialect specific; SQLite has no date_trunc.
+    if db.engine.dialect.name == 'sqlite':
+        return func.date(column, 'weekday 0', '-6 days')
+    return func.date_trunc('week', column)
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _upsert(table):
+    # INSERT ... ON CONFLICT is dialect specific in SQLAlchemy; both supported databases have it.
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(table)
+
+
+def fold_session(session_log):
+    """
+    Adds a newly logged session to its SessionRollup row with a single INSERT ... ON CONFLICT DO UPDATE
+    in the caller's transaction. The session and its rollup commit or roll back together, and
+    concurrent writers to the same mentor/student/week update the row instead of colliding on
+    _session_rollup_uc. Call it after the SessionLog row is flushed.
+    """
+    rollup = SessionRollup.__table__
+    statement = _upsert(rollup).values(
+        mentor_id=session_log.mentor_id,
+        student_id=session_log.student_id,
+        week_start=week_start_of(session_log.session_date.date()),
+        session_count=1,
+        total_minutes=session_log.duration_minutes or 0,
+        last_session_date=session_log.session_date,
+        max_session_id=session_log.id
+    )
+    new = statement.excluded
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['mentor_id', 'student_id', 'week_start'],
+        set_={
+            'session_count': rollup.c.session_count + 1,
+            'total_minutes': rollup.c.total_minutes + new.total_minutes,
+            'last_session_date': case((rollup.c.last_session_date == None, new.last_session_date),
+                                      (rollup.c.last_session_date < new.last_session_date, new.last_session_date),
+                                      else_=rollup.c.last_session_date),
+            'max_session_id': case((rollup.c.max_session_id < new.max_session_id, new.max_session_id),
+                                   else_=rollup.c.max_session_id),
+        }
+    ))
+
+
+def forget_user_sessions(user_id):
+    """
+    Deletes the sessions a user took part in (as mentor or student) and their SessionRollup rows in the
+    caller's transaction; call it before deleting the user. Rollup rows are per mentor/student pair, so
+    removing every row of the user removes exactly those sessions. Returns the number of sessions deleted.
+    """
+    db.session.execute(delete(SessionRollup).where(or_(SessionRollup.mentor_id == user_id, SessionRollup.student_id == user_id)))
+    return db.session.execute(delete(SessionLog).where(or_(SessionLog.mentor_id == user_id, SessionLog.student_id == user_id))).rowcount
+
+
+def rebuild_session_rollup():
+    """
+    Recomputes SessionRollup from SessionLog with one grouped INSERT ... SELECT in a single transaction,
+    which blocks concurrent session writes until it commits. Returns the number of sessions rolled up.
+    The app keeps the rollup current itself (log_session() folds new sessions, delete_user() forgets a
+    user's). Any other change to session_log - bulk imports such as seed_data.py, restores, or manual
+    SQL updates and deletes - needs a rebuild afterwards: python init_db.py.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        # Readers carry on; log_session() waits, so no session is inserted between the DELETE and the SELECT.
+        db.session.execute(text('LOCK TABLE session_log IN SHARE MODE'))
+    db.session.execute(delete(SessionRollup)) # On SQLite this takes the write lock for the whole rebuild
+
+    week_start = _week_start_expr(SessionLog.session_date)
+    groups = select(
+        SessionLog.mentor_id,
+        SessionLog.student_id,
+        week_start,
+        func.count(SessionLog.id),
+        func.coalesce(func.sum(SessionLog.duration_minutes), 0),
+        func.max(SessionLog.session_date),
+        func.max(SessionLog.id)
+    ).group_by(SessionLog.mentor_id, SessionLog.student_id, week_start)
+    db.session.execute(insert(SessionRollup).from_select(
+        ['mentor_id', 'student_id', 'week_start', 'session_count', 'total_minutes', 'last_session_date',
+         'max_session_id'], groups))
+    folded = db.session.query(func.coalesce(func.sum(SessionRollup.session_count), 0)).scalar()
+    db.session.commit()
+    return folded
+
+
+def mentor_weekly_hours(weeks=8):
+    """
+    Returns (week_starts, rows) where rows hold each mentor's username and a list of hours
+    per week, oldest week first, for the last `weeks` ISO weeks.
+    """
+    current_week = week_start_of(date.today())
+    week_starts = [current_week - timedelta(weeks=i) for i in range(weeks - 1, -1, -1)]
+
+    totals = db.session.query(
+        SessionRollup.mentor_id,
+        SessionRollup.week_start,
+        func.sum(SessionRollup.total_minutes)
+    ).filter(SessionRollup.week_start >= week_starts[0]) \
+     .group_by(SessionRollup.mentor_id, SessionRollup.week_start).all()
+
+    minutes = {}
+    for mentor_id, week, total in totals:
+        minutes.setdefault(mentor_id, {})[_as_date(week)] = total or 0
+
+    mentors = db.session.query(User.id, User.username).filter(User.role == 'mentor').order_by(User.username).all()
+    rows = [{
+        'mentor_id': mentor.id,
+        'username': mentor.username,
+        'hours': [round(minutes.get(mentor.id, {}).get(week, 0) / 60.0, 1) for week in week_starts],
+    } for mentor in mentors]
+    return week_starts, rows
+
+
+def student_session_frequency(weeks=8):
+    """Sessions per student over the last `weeks` ISO weeks, with the average per week, busiest first."""
+    since = week_start_of(date.today()) - timedelta(weeks=weeks - 1)
+    rows = db.session.query(
+        User.id,
+        User.username,
+        func.sum(SessionRollup.session_count).label('session_count'),
+        func.sum(SessionRollup.total_minutes).label('total_minutes')
+    ).join(SessionRollup, SessionRollup.student_id == User.id) \
+     .filter(SessionRollup.week_start >= since) \
+     .group_by(User.id, User.username) \
+     .order_by(func.sum(SessionRollup.session_count).desc(), User.username).all()
+
+    return [{
+        'student_id': row.id,
+        'username': row.username,
+        'session_count': int(row.session_count or 0),
+        'per_week': round((row.session_count or 0) / float(weeks), 2),
+        'total_hours': round((row.total_minutes or 0) / 60.0, 1),
+    } for row in rows]
+
+
+def students_not_seen(days=14):
+    """Students whose last logged session is older than `days` days (or who never had one), longest gap first."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    last_seen = db.session.query(
+        SessionRollup.student_id,
+        func.max(SessionRollup.last_session_date).label('last_session')
+    ).group_by(SessionRollup.student_id).subquery()
+
+    mentor = aliased(User)
+    rows = db.session.query(
+        User.id, User.username, mentor.username.label('mentor_username'), last_seen.c.last_session
+    ).outerjoin(last_seen, last_seen.c.student_id == User.id) \
+     .outerjoin(mentor, mentor.id == User.mentor_id) \
+     .filter(User.role == 'student') \
+     .filter((last_seen.c.last_session == None) | (last_seen.c.last_session < cutoff)) \
+     .order_by(last_seen.c.last_session.asc().nullsfirst(), User.username).all()
+
+    now = datetime.utcnow()
+    return [{
+        'student_id': row.id,
+        'username': row.username,
+        'mentor_username': row.mentor_username,
+        'last_session': row.last_session,
+        'days_since': (now - row.last_session).days if row.last_session else None,
+    } for row in rows]
@@ -0,0 +1,222 @@
+# mentor_connect_ngo_enhanced/app/api.py
+from datetime import date, datetime
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import current_user
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import User, Announcement, Quiz, QuizAttempt, SessionLog, StudentResourceCompletion
+
+# Versioned JSON read API for the mobile app. Every resource is a resolver that selects only the
+# requested columns (no ORM objects are loaded) and returns plain dicts:
+#   GET  /api/v1/                          -> available resources and their fields
+#   GET  /api/v1/<resource>?fields=a,b&... -> {"data": ...}
+#   POST /api/v1/batch {"requests": {"me": {"resource": "profile", "fields": ["username"]}, ...}}
+#        -> {"responses": {"me": {"status": 200, "data": ...}, ...}}, resolved in one DB session.
+
+api = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+RESOURCES = {} # name -> (resolver, {field: column expression})
+
+Mentor = aliased(User, name='mentor')
+Student = aliased(User, name='student')
+Creator = aliased(User, name='creator')
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def resource(name, columns):
+    """Registers a resolver(params, columns) under `name`; `columns` maps each selectable field to its SQL expression."""
+    def decorator(resolver):
+        RESOURCES[name] = (resolver, columns)
+        return resolver
+    return decorator
+
+
+def _project(columns, fields):
+    """The labelled column expressions for the requested fields (all of them when `fields` is None)."""
+    if not fields:
+        return [column.label(name) for name, column in columns.items()]
+    unknown = [name for name in fields if name not in columns]
+    if unknown:
+        raise ApiError(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(columns)}.")
+    return [columns[name].label(name) for name in dict.fromkeys(fields)] # Keeps order, drops duplicates
+
+
+def _serialize(row):
+    return {key: value.isoformat() if isinstance(value, (datetime, date)) else value for key, value in row.items()}
+
+
+def _rows(statement):
+    return [_serialize(row) for row in db.session.execute(statement).mappings()]
+
+
+def _int_param(params, name, default, minimum=1, maximum=50):
+    value = params.get(name, default)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ApiError(f"'{name}' must be an integer.")
+    if not minimum <= value <= maximum:
+        raise ApiError(f"'{name}' must be between {minimum} and {maximum}.")
+    return value
+
+
+def resolve(name, params, fields):
+    """Runs one resolver and returns its data; raises ApiError for bad input or unknown resources."""
+    if name not in RESOURCES:
+        raise ApiError(f"Unknown resource '{name}'.", 404)
+    resolver, columns = RESOURCES[name]
+    return resolver(params, _project(columns, fields))
+
+
+# --- Resources ---
+
+def _count_of(model, owner_column):
+    return select(func.count(model.id)).where(owner_column == User.id).scalar_subquery()
+
+
+@resource('profile', {
+    'id': User.id, 'username': User.username, 'email': User.email, 'role': User.role, 'bio': User.bio,
+    'expertise_areas': User.expertise_areas, 'contact_preference': User.contact_preference,
+    'mentor_id': User.mentor_id, 'mentor_username': Mentor.username,
+    'last_login': User.last_login, 'last_activity': User.last_activity,
+    'resources_completed': _count_of(StudentResourceCompletion, StudentResourceCompletion.student_id),
+    'quiz_attempts': _count_of(QuizAttempt, QuizAttempt.student_id),
+    'quiz_points': select(func.coalesce(func.sum(QuizAttempt.score), 0)).where(QuizAttempt.student_id == User.id).scalar_subquery(),
+})
+def profile(params, columns):
+    # Same visibility as the HTML profile page: any logged-in user can read any profile.
+    username = params.get('username')
+    condition = User.username == username if username else User.id == current_user.id
+    rows = _rows(select(*columns).select_from(User).outerjoin(Mentor, Mentor.id == User.mentor_id).where(condition))
+    if not rows:
+        raise ApiError('User not found.', 404)
+    return rows[0]
+
+
+@resource('announcements', {
+    'id': Announcement.id, 'title': Announcement.title, 'content': Announcement.content,
+    'date_posted': Announcement.date_posted, 'admin_username': User.username,
+})
+def announcements(params, columns):
+    limit = _int_param(params, 'limit', 5)
+    return _rows(select(*columns).select_from(Announcement).join(User, User.id == Announcement.admin_id)
+                 .order_by(Announcement.date_posted.desc()).limit(limit))
+
+
+@resource('quizzes', {
+    'id': Quiz.id, 'title': Quiz.title, 'description': Quiz.description, 'date_created': Quiz.date_created,
+    'creator_username': Creator.username, 'attempt_id': QuizAttempt.id, 'score': QuizAttempt.score,
+    'total_questions': QuizAttempt.total_questions,
+})
+def quizzes(params, columns):
+    # scope=available (default): every quiz, with the current user's attempt if any (student dashboard).
+    # scope=mine: quizzes created by the current user (mentor dashboard).
+    scope = params.get('scope', 'available')
+    if scope not in ('available', 'mine'):
+        raise ApiError("'scope' must be 'available' or 'mine'.")
+    page = _int_param(params, 'page', 1, maximum=100000)
+    per_page = _int_param(params, 'per_page', 10)
+
+    statement = select(*columns).select_from(Quiz).join(Creator, Creator.id == Quiz.creator_id) \
+        .outerjoin(QuizAttempt, and_(QuizAttempt.quiz_id == Quiz.id, QuizAttempt.student_id == current_user.id)) \
+        .order_by(Quiz.date_created.desc(), Quiz.id.desc())
+    if scope == 'mine':
+        statement = statement.where(Quiz.creator_id == current_user.id)
+    # One extra row tells whether there is a next page, without a COUNT query.
+    rows = _rows(statement.limit(per_page + 1).offset((page - 1) * per_page))
+    return {'items': rows[:per_page], 'page': page, 'per_page': per_page, 'has_next': len(rows) > per_page}
+
+
+@resource('sessions', {
+    'id': SessionLog.id, 'session_date': SessionLog.session_date, 'duration_minutes': SessionLog.duration_minutes,
+    'topics_discussed': SessionLog.topics_discussed, 'progress_notes': SessionLog.progress_notes,
+    'mentor_id': SessionLog.mentor_id, 'mentor_username': Mentor.username,
+    'student_id': SessionLog.student_id, 'student_username': Student.username,
+})
+def sessions(params, columns):
+    # Recent sessions the current user took part in, as the mentor or as the student.
+    limit = _int_param(params, 'limit', 5)
+    participant = SessionLog.mentor_id if current_user.is_mentor() else SessionLog.student_id
+    return _rows(select(*columns).select_from(SessionLog)
+                 .join(Mentor, Mentor.id == SessionLog.mentor_id).join(Student, Student.id == SessionLog.student_id)
+                 .where(participant == current_user.id)
+                 .order_by(SessionLog.session_date.desc()).limit(limit))
+
+
+@resource('students', {
+    'id': User.id, 'username': User.username, 'email': User.email,
+    'last_login': User.last_login, 'last_activity': User.last_activity,
+})
+def students(params, columns):
+    # The current mentor's students (empty for students).
+    return _rows(select(*columns).where(User.mentor_id == current_user.id, User.role == 'student')
+                 .order_by(User.username))
+
+
+# --- Endpoints ---
+
+def _fields_param(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise ApiError("'fields' must be a list of field names or a comma-separated string.")
+    return [name.strip() for name in value if name.strip()]
+
+
+@api.before_request
+def require_login():
+    # JSON 401 instead of the login-page redirect the HTML routes use.
+    if not current_user.is_authenticated:
+        return jsonify({'error': 'Authentication required.'}), 401
+
+
+@api.errorhandler(ApiError)
+def handle_api_error(error):
+    return jsonify({'error': error.message}), error.status
+
+
+@api.route('/')
+def index():
+    return jsonify({'resources': {name: list(columns) for name, (resolver, columns) in RESOURCES.items()}})
+
+
+@api.route('/<string:name>')
+def get_resource(name):
+    params = request.args.to_dict()
+    fields = _fields_param(params.pop('fields', None))
+    return jsonify({'data': resolve(name, params, fields)})
+
+
+@api.route('/batch', methods=['POST'])
+def batch():
+    payload = request.get_json(silent=True) or {}
+    sub_requests = payload.get('requests')
+    if not isinstance(sub_requests, dict) or not sub_requests:
+        raise ApiError("Expected a JSON body like {\"requests\": {\"<key>\": {\"resource\": ..., \"params\": {...}, \"fields\": [...]}}}.")
+    limit = current_app.config.get('API_BATCH_MAX_REQUESTS', 10)
+    if len(sub_requests) > limit:
+        raise ApiError(f"At most {limit} sub-requests per batch.")
+
+    # Sub-requests run one after another in this request's session, so they read one consistent snapshot.
+    responses = {}
+    for key, sub_request in sub_requests.items():
+        try:
+            if not isinstance(sub_request, dict):
+                raise ApiError('Each sub-request must be an object.')
+            params = sub_request.get('params') or {}
+            if not isinstance(params, dict):
+                raise ApiError("'params' must be an object.")
+            data = resolve(sub_request.get('resource', key), params, _fields_param(sub_request.get('fields')))
+            responses[key] = {'status': 200, 'data': data}
+        except ApiError as e:
+            responses[key] = {'status': e.status, 'error': e.message}
+    return jsonify({'responses': responses})
@@ -0,0 +1,129 @@
+# mentor_connect_ngo_enhanced/app/archive.py
+import json
+import time
+import zlib
+from collections import namedtuple
+from datetime import date, datetime
+from itertools import groupby
+from sqlalchemy import and_, case, delete, func, or_, select
+from app import db
+from app.models import Message, MessageArchive
+
+# Cold storage for old messages. archive_messages() moves every message older than a cutoff out of the
+# hot Message table into MessageArchive rows, one per conversation per calendar month, each holding the
+# month's messages as one zlib-compressed JSON blob. Conversation queries and the Message indexes then
+# only cover recent traffic; archived months are read back one at a time through the history API.
+# Run it from archive_messages.py (e.g. nightly).
+
+ARCHIVE_COMPRESSION_LEVEL = 6
+DELETE_CHUNK = 500 # Ids per DELETE ... IN (...), well under SQLite's bound-parameter limit
+
+ArchivedMessage = namedtuple('ArchivedMessage', 'id sender_id receiver_id content timestamp')
+
+
+def conversation_key(user_id, other_user_id):
+    """(low, high): the order-independent pair of user ids a conversation is archived under."""
+    return min(user_id, other_user_id), max(user_id, other_user_id)
+
+
+def month_start(timestamp):
+    return date(timestamp.year, timestamp.month, 1)
+
+
+def pack(messages):
+    rows = [[m.id, m.sender_id, m.receiver_id, m.content, m.timestamp.isoformat()] for m in messages]
+    return zlib.compress(json.dumps(rows, separators=(',', ':')).encode('utf-8'), ARCHIVE_COMPRESSION_LEVEL)
+
+
+def unpack(payload):
+    return [ArchivedMessage(id, sender_id, receiver_id, content, datetime.fromisoformat(timestamp))
+            for id, sender_id, receiver_id, content, timestamp in json.loads(zlib.decompress(payload))]
+
+
+def _between(low, high):
+    return or_(and_(Message.sender_id == low, Message.receiver_id == high),
+               and_(Message.sender_id == high, Message.receiver_id == low))
+
+
+def _store_month(existing, low, high, month, messages):
+    """Writes (or extends, if an earlier run archived part of this month) the archive row for one month."""
+    archive = existing.get(month)
+    if archive is not None:
+        known = {m.id for m in messages}
+        messages = sorted([m for m in unpack(archive.payload) if m.id not in known] + messages,
+                          key=lambda m: (m.timestamp, m.id))
+    else:
+        archive = existing[month] = MessageArchive(user_low_id=low, user_high_id=high, month=month)
+        db.session.add(archive)
+    archive.payload = pack(messages)
+    archive.message_count = len(messages)
+    archive.first_timestamp = messages[0].timestamp
+    archive.last_timestamp = messages[-1].timestamp
+    archive.archived_at = datetime.utcnow()
+
+
+def archive_messages(cutoff, batch_size=5000, progress=None):
+    """
+    Moves messages sent before `cutoff` into MessageArchive. Each conversation is handled on its own, through
+    the ix_message_conversation index, and the archive rows are written in the same transaction as the
+    DELETE of the originals, committed every `batch_size` messages. Returns a dict of counts.
+    """
+    started = time.perf_counter()
+    low = case((Message.sender_id < Message.receiver_id, Message.sender_id), else_=Message.receiver_id)
+    high = case((Message.sender_id < Message.receiver_id, Message.receiver_id), else_=Message.sender_id)
+    pairs = db.session.execute(select(low, high).where(Message.timestamp < cutoff).distinct()).all()
+
+    stats = {'conversations': len(pairs), 'messages': 0, 'months': 0}
+    pending = 0
+    for low_id, high_id in pairs:
+        messages = db.session.execute(
+            select(Message.id, Message.sender_id, Message.receiver_id, Message.content, Message.timestamp)
+            .where(_between(low_id, high_id), Message.timestamp < cutoff)
+            .order_by(Message.timestamp, Message.id)
+        ).all()
+        if not messages:
+            continue
+        existing = {archive.month: archive for archive in MessageArchive.query.filter_by(
+            user_low_id=low_id, user_high_id=high_id)}
+        for month, month_messages in groupby(messages, key=lambda m: month_start(m.timestamp)):
+            _store_month(existing, low_id, high_id, month, list(month_messages))
+            stats['months'] += 1
+
+        ids = [m.id for m in messages]
+        for i in range(0, len(ids), DELETE_CHUNK):
+            db.session.execute(delete(Message).where(Message.id.in_(ids[i:i + DELETE_CHUNK])))
+        stats['messages'] += len(ids)
+        pending += len(ids)
+        if pending >= batch_size:
+            db.session.commit()
+            pending = 0
+            if progress:
+                progress(stats)
+    db.session.commit()
+    stats['seconds'] = round(time.perf_counter() - started, 1)
+    return stats
+
+
+def archive_months(user_id, other_user_id):
+    """The archived months of a conversation, newest first: rows of (month, message_count, archived_at)."""
+    low, high = conversation_key(user_id, other_user_id)
+    return db.session.execute(
+        select(MessageArchive.month, MessageArchive.message_count, MessageArchive.archived_at)
+        .where(MessageArchive.user_low_id == low, MessageArchive.user_high_id == high)
+        .order_by(MessageArchive.month.desc())
+    ).all()
+
+
+def archived_month(user_id, other_user_id, month):
+    """The MessageArchive row for one month of a conversation, or None."""
+    low, high = conversation_key(user_id, other_user_id)
+    return MessageArchive.query.filter_by(user_low_id=low, user_high_id=high, month=month).first()
+
+
+def archive_stats():
+    hot = db.session.query(func.count(Message.id), func.min(Message.timestamp)).one()
+    cold = db.session.query(func.count(MessageArchive.id), func.coalesce(func.sum(MessageArchive.message_count), 0),
+                            func.coalesce(func.sum(func.length(MessageArchive.payload)), 0),
+                            func.min(MessageArchive.first_timestamp)).one()
+    return {'hot_messages': hot[0], 'oldest_hot_message': hot[1], 'archive_rows': cold[0],
+            'archived_messages': cold[1], 'archive_payload_bytes': cold[2], 'oldest_archived_message': cold[3]}
@@ -0,0 +1,73 @@
+# mentor_connect_ngo_enhanced/app/assets.py
+import json
+import mimetypes
+import os
+from flask import request, send_from_directory, url_for, abort
+
+# Built by build_assets.py: <static folder>/dist/ holds the fingerprinted files and their .gz/.br variants.
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+# Fingerprinted names written by the most recent builds, newest first (kept for ASSET_KEEP_BUILDS builds).
+BUILDS_NAME = 'builds.json'
+# Precompressed variants, in order of preference when the browser accepts several.
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+class AssetManifest:
+    """
+    Serves the fingerprinted static assets written by build_assets.py. Templates call
+    asset_url('css/style.css') instead of url_for('static', ...). It returns /assets/css/style.<hash>.css,
+    which is served with a one-year immutable Cache-Control, so repeat page loads make no asset requests.
+    The brotli or gzip variant is sent when the browser accepts it. Without a manifest (assets not built),
+    asset_url falls back to the plain static URL. Files of the earlier builds still on disk are served too,
+    so pages rendered before a deploy, or revalidated from a browser cache, keep loading their assets.
+    """
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        self._built_files = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.dist_folder = os.path.join(app.static_folder, DIST_DIR)
+        self.max_age = app.config.get('ASSET_MAX_AGE', 31536000)
+        self.manifest = self._load(MANIFEST_NAME, {})
+        self._built_files = set(self.manifest.values()).union(*self._load(BUILDS_NAME, []))
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.serve)
+        app.add_template_global(self.asset_url)
+        app.extensions['asset_manifest'] = self
+
+    def _load(self, name, default):
+        try:
+            with open(os.path.join(self.dist_folder, name)) as json_file:
+                return json.load(json_file)
+        except FileNotFoundError:
+            return default
+
+    def asset_url(self, filename):
+        built = self.manifest.get(filename)
+        if built is None:
+            return url_for('static', filename=filename)
+        return url_for('assets', filename=built)
+
+    def serve(self, filename):
+        # Only files of the current or a kept earlier build are served, never the manifest or stray build output.
+        if filename not in self._built_files:
+            abort(404)
+        accepted = request.accept_encodings
+        for encoding, suffix in ENCODINGS:
+            if accepted[encoding] and os.path.exists(os.path.join(self.dist_folder, filename + suffix)):
+                response = send_from_directory(self.dist_folder, filename + suffix, max_age=self.max_age,
+                                               mimetype=mimetypes.guess_type(filename)[0])
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(self.dist_folder, filename, max_age=self.max_age)
+        response.cache_control.public = True
+        response.cache_control.immutable = True # The name changes with the content
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+asset_manifest = AssetManifest()
@@ -0,0 +1,729 @@
+# mentor_connect_ngo_enhanced/app/chatbot.py
+import re
+import json
+import time
+import random
+import uuid
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock, BoundedSemaphore
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app import db
+from app.models import ChatbotCacheEntry, ChatbotJob, ChatHistory
+from app.conditional import content_versions
+from app.retrieval import knowledge_index
+
+# Add a system instruction to encourage a natural, concise, and helpful tone.
+SYSTEM_INSTRUCTION = "If you get user query as Hi then respond friendly like Hi back. You are a friendly, concise, and natural learning assistant. Respond directly and helpfully. Always use Markdown for formatting (lists, bolding, paragraphs) as appropriate. Avoid explicitly stating that you are using Markdown or that you are 'ready to assist'. Focus on delivering information clearly and directly related to the user's query about learning, courses, or general doubts in the context of MentorConnect."
+
+EMPTY_RESPONSE_TEXT = "I'm sorry, I couldn't generate a response. The AI might have returned an empty or malformed response."
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_prompt(text):
+    """Lowercases, drops punctuation and collapses whitespace so trivially different prompts share a cache key."""
+    text = _PUNCTUATION_RE.sub(' ', text.lower())
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+class ChatbotResponseCache:
+    """
+    Two-tier cache of chatbot answers keyed by the normalized prompt and the content version.
+    An in-process LRU answers repeat prompts without touching the database; misses fall back to
+    the ChatbotCacheEntry table, which is shared by all workers. Entries expire after a TTL and
+    the table is trimmed to a maximum number of rows (oldest first). Answers are generated with
+    retrieved resources and FAQs in the prompt, so editing either bumps a ContentVersion counter
+    that switches every worker to fresh keys; the old entries age out.
+    """
+
+    def __init__(self, app=None):
+        self._memory = OrderedDict()
+        self._lock = Lock()
+        self._stores_since_prune = 0
+        self.stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+        self.enabled = True
+        self.ttl = 86400
+        self.max_entries = 5000
+        self.memory_entries = 500
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('CHATBOT_CACHE_ENABLED', True)
+        self.ttl = app.config.get('CHATBOT_CACHE_TTL', self.ttl)
+        self.max_entries = app.config.get('CHATBOT_CACHE_MAX_ENTRIES', self.max_entries)
+        self.memory_entries = app.config.get('CHATBOT_CACHE_MEMORY_ENTRIES', self.memory_entries)
+        app.extensions['chatbot_cache'] = self
+
+    # ContentVersion counters bumped by the writes that change what the knowledge index retrieves.
+    CONTENT = ('resources', 'faqs')
+
+    def content_version(self):
+        return content_versions(*self.CONTENT)
+
+    @staticmethod
+    def key_for(prompt, version):
+        scope = ':'.join(str(number) for number in version)
+        return hashlib.sha256(f"{scope}:{normalize_prompt(prompt)}".encode('utf-8')).hexdigest()
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _remember(self, key, stored_at, response):
+        with self._lock:
+            self._memory[key] = (stored_at, response)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, prompt):
+        if not self.enabled:
+            return None
+        key = self.key_for(prompt, self.content_version())
+        now = time.time()
+
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                if now - cached[0] < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return cached[1]
+                del self._memory[key]
+
+        entry = db.session.get(ChatbotCacheEntry, key)
+        if entry is not None and entry.created_at > datetime.utcnow() - timedelta(seconds=self.ttl):
+            stored_at = now - (datetime.utcnow() - entry.created_at).total_seconds()
+            self._remember(key, stored_at, entry.response)
+            self._count('db_hits')
+            return entry.response
+
+        self._count('misses')
+        return None
+
+    def set(self, prompt, response, version=None):
+        """Stores an answer under `version`: the content version read before its context was retrieved."""
+        if not self.enabled:
+            return
+        key = self.key_for(prompt, version if version is not None else self.content_version())
+        self._remember(key, time.time(), response)
+        try:
+            db.session.merge(ChatbotCacheEntry(prompt_hash=key, prompt=normalize_prompt(prompt),
+                                               response=response, created_at=datetime.utcnow()))
+            db.session.commit()
+        except Exception as e:
+            # Another worker may have stored the same prompt first; the in-memory copy is still valid.
+            db.session.rollback()
+            print(f"Could not store chatbot cache entry: {e}")
+            return
+        self._count('stores')
+
+        with self._lock:
+            self._stores_since_prune += 1
+            should_prune = self._stores_since_prune >= 100
+            if should_prune:
+                self._stores_since_prune = 0
+        if should_prune:
+            self.prune()
+
+    def prune(self):
+        """Deletes expired rows, then the oldest rows beyond max_entries. Returns the number deleted."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl)
+        deleted = ChatbotCacheEntry.query.filter(ChatbotCacheEntry.created_at < cutoff).delete(synchronize_session=False)
+
+        overflow = ChatbotCacheEntry.query.count() - self.max_entries
+        if overflow > 0:
+            oldest = db.select(ChatbotCacheEntry.prompt_hash).order_by(ChatbotCacheEntry.created_at).limit(overflow)
+            deleted += ChatbotCacheEntry.query.filter(ChatbotCacheEntry.prompt_hash.in_(oldest)) \
+                .delete(synchronize_session=False)
+        db.session.commit()
+
+        with self._lock:
+            self.stats['evictions'] += deleted
+        return deleted
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        ChatbotCacheEntry.query.delete()
+        db.session.commit()
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_size'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['db_hits']) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+response_cache = ChatbotResponseCache()
+
+
+class ChatbotUnavailable(Exception):
+    """Raised without calling the upstream when the circuit breaker is open or too many calls are in flight."""
+
+
+class ChatbotClient:
+    """
+    Shared HTTP client for the chatbot upstream.
+    Reuses keep-alive connections through one pooled requests.Session, applies connect/read
+    timeouts, caps the number of in-flight calls with a bounded semaphore, retries transient
+    failures with jittered exponential backoff and trips a circuit breaker after repeated failures
+    so requests fail fast while the upstream is down.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, app=None):
+        self._session = None
+        self._lock = Lock()
+        self._semaphore = None
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._half_open_trial = False
+        self.stats = {'calls': 0, 'retries': 0, 'failures': 0, 'rejected': 0, 'short_circuited': 0, 'in_flight': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.timeout = (app.config.get('CHATBOT_CONNECT_TIMEOUT', 3.05), app.config.get('CHATBOT_READ_TIMEOUT', 30))
+        self.max_concurrency = app.config.get('CHATBOT_MAX_CONCURRENCY', 8)
+        self.acquire_timeout = app.config.get('CHATBOT_ACQUIRE_TIMEOUT', 5)
+        self.max_retries = app.config.get('CHATBOT_MAX_RETRIES', 2)
+        self.backoff = app.config.get('CHATBOT_RETRY_BACKOFF', 0.25)
+        self.breaker_threshold = app.config.get('CHATBOT_BREAKER_THRESHOLD', 5)
+        self.breaker_reset = app.config.get('CHATBOT_BREAKER_RESET', 30)
+        self._semaphore = BoundedSemaphore(self.max_concurrency)
+        self._session = None # Rebuilt lazily with the new pool size
+        app.extensions['chatbot_client'] = self
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    # requests is only imported once the first upstream call is made, keeping app startup light.
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency, max_retries=0)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def _bump(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def _allow_request(self):
+        """Returns (allowed, trial). `trial` marks the single call let through while the breaker is half-open."""
+        with self._lock:
+            if self._consecutive_failures < self.breaker_threshold:
+                return True, False
+            if time.monotonic() < self._open_until or self._half_open_trial:
+                return False, False
+            self._half_open_trial = True # Let a single trial call through once the reset period is over
+            return True, True
+
+    def _record_success(self):
+        with self._lock:
+            self._consecutive_failures = 0
+            self._half_open_trial = False
+
+    def _end_trial(self):
+        # A trial that ended without recording a success or failure (no free slot, a 4xx from the
+        # upstream) must still give up the half-open slot, or every later call would short-circuit.
+        with self._lock:
+            self._half_open_trial = False
+
+    def _record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._half_open_trial = False
+            if self._consecutive_failures >= self.breaker_threshold:
+                self._open_until = time.monotonic() + self.breaker_reset
+
+    @property
+    def breaker_state(self):
+        with self._lock:
+            if self._consecutive_failures < self.breaker_threshold:
+                return 'closed'
+            return 'open' if time.monotonic() < self._open_until else 'half-open'
+
+    def _acquire(self):
+        """Takes an in-flight slot. Returns True if this call is the half-open trial (pass it to _release)."""
+        allowed, trial = self._allow_request()
+        if not allowed:
+            self._bump('short_circuited')
+            raise ChatbotUnavailable('The AI service is temporarily unavailable. Please try again shortly.')
+        if not self._semaphore.acquire(timeout=self.acquire_timeout):
+            if trial:
+                self._end_trial()
+            self._bump('rejected')
+            raise ChatbotUnavailable('The AI service is busy. Please try again in a moment.')
+        self._bump('in_flight')
+        return trial
+
+    def _release(self, trial=False):
+        self._bump('in_flight', -1)
+        self._semaphore.release()
+        if trial:
+            self._end_trial()
+
+    def _send(self, url, payload, params, stream=False):
+        """Sends the request with retries and returns a successful response. Must hold a slot from _acquire()."""
+        session = self.session
+        import requests # Already loaded by self.session
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._bump('retries')
+                time.sleep(random.uniform(0, self.backoff * (2 ** attempt))) # Full jitter
+            self._bump('calls')
+            try:
+                response = session.post(url, params=params, json=payload, timeout=self.timeout, stream=stream)
+            except requests.exceptions.ConnectionError:
+                # Includes connect timeouts. Read timeouts are not retried so a slow upstream
+                # cannot hold a worker for several read timeouts in a row.
+                if attempt < self.max_retries:
+                    continue
+                self._bump('failures')
+                self._record_failure()
+                raise
+            except requests.exceptions.Timeout:
+                self._bump('failures')
+                self._record_failure()
+                raise
+            except requests.exceptions.RequestException:
+                # ChunkedEncodingError, TooManyRedirects, InvalidURL, ...: not retried, but still a failed call.
+                self._bump('failures')
+                self._record_failure()
+                raise
+            if response.status_code in self.RETRY_STATUSES and attempt < self.max_retries:
+                response.close()
+                continue
+            try:
+                response.raise_for_status() # Raises HTTPError for bad responses (4xx or 5xx)
+            except requests.exceptions.HTTPError:
+                response.close()
+                self._bump('failures')
+                if response.status_code >= 500 or response.status_code == 429:
+                    self._record_failure()
+                raise
+            if not stream:
+                self._record_success() # A stream only succeeds once fully read, see stream_events()
+            return response
+
+    def post_json(self, url, payload, params=None):
+        """POSTs a JSON payload and returns the decoded JSON response."""
+        trial = self._acquire()
+        try:
+            return self._send(url, payload, params).json()
+        finally:
+            self._release(trial)
+
+    def stream_events(self, url, payload, params=None):
+        """
+        POSTs a JSON payload to a Server-Sent Events endpoint and yields each decoded `data:` payload
+        as it arrives. The concurrency slot is held until the stream ends or the generator is closed.
+        """
+        import requests # Already loaded by self.session in _send
+        trial = self._acquire()
+        try:
+            with self._send(url, payload, params, stream=True) as response:
+                try:
+                    for line in response.iter_lines(chunk_size=None, decode_unicode=True): # Yield lines as soon as they arrive
+                        if line and line.startswith('data:'):
+                            yield json.loads(line[5:].strip())
+                except (requests.exceptions.RequestException, ValueError):
+                    # A stall (read timeout), a broken chunked body or a malformed event after the headers
+                    # arrived is still a failed call for the breaker.
+                    self._bump('failures')
+                    self._record_failure()
+                    raise
+            self._record_success()
+        finally:
+            self._release(trial)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['breaker'] = self.breaker_state
+        stats['max_concurrency'] = self.max_concurrency
+        return stats
+
+
+chatbot_client = ChatbotClient()
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token) used for context budgeting."""
+    return len(text) // 4 + 1
+
+
+class Conversation:
+    """
+    A user's server-side chat history: the last CHATBOT_HISTORY_TURNS exchanges kept verbatim as a
+    ring buffer, plus a rolling plain-text summary of older turns capped at CHATBOT_SUMMARY_CHARS.
+    Both are stored in one ChatHistory row, so every upstream request carries bounded context
+    no matter how long the conversation runs. A conversation idle for CHATBOT_SESSION_IDLE seconds
+    starts over.
+    """
+
+    def __init__(self, user_id):
+        config = current_app.config
+        self.user_id = user_id
+        self.max_turns = config.get('CHATBOT_HISTORY_TURNS', 6)
+        self.summary_chars = config.get('CHATBOT_SUMMARY_CHARS', 1200)
+        self.token_budget = config.get('CHATBOT_CONTEXT_TOKENS', 1500)
+
+        self._row = db.session.get(ChatHistory, user_id)
+        idle_cutoff = datetime.utcnow() - timedelta(seconds=config.get('CHATBOT_SESSION_IDLE', 1800))
+        if self._row is None or self._row.updated_at < idle_cutoff:
+            self.turns = []
+            self.summary = ''
+        else:
+            self.turns = json.loads(self._row.turns or '[]')
+            self.summary = self._row.summary or ''
+
+    @property
+    def is_empty(self):
+        return not self.turns and not self.summary
+
+    def context_turns(self):
+        """The most recent turns that fit the token budget left after the summary, oldest first."""
+        budget = self.token_budget - estimate_tokens(self.summary)
+        selected = []
+        for turn in reversed(self.turns):
+            cost = estimate_tokens(turn['user']) + estimate_tokens(turn['model'])
+            if cost > budget:
+                break
+            budget -= cost
+            selected.append(turn)
+        selected.reverse()
+        return selected
+
+    @staticmethod
+    def _summarize(turn):
+        # Extractive one-line summary: the question and the first sentence of the answer.
+        question = _WHITESPACE_RE.sub(' ', turn['user']).strip()[:120]
+        answer = _WHITESPACE_RE.sub(' ', re.sub(r'[*_#`>]', '', turn['model'])).strip()
+        answer = re.split(r'(?<=[.!?])\s', answer, maxsplit=1)[0][:160]
+        return f"- Student asked: {question} / Assistant: {answer}"
+
+    def add_turn(self, user_message, reply):
+        """Appends an exchange, folding turns that drop out of the ring buffer into the summary, and saves."""
+        self.turns.append({'user': user_message[:1000], 'model': reply[:2000]})
+        lines = self.summary.splitlines() if self.summary else []
+        while len(self.turns) > self.max_turns:
+            lines.append(self._summarize(self.turns.pop(0)))
+        while lines and len('\n'.join(lines)) > self.summary_chars:
+            lines.pop(0) # Drop the oldest summary lines first
+        self.summary = '\n'.join(lines)
+        self._save()
+
+    def reset(self):
+        self.turns = []
+        self.summary = ''
+        self._save()
+
+    def _save(self):
+        if self._row is None:
+            self._row = ChatHistory(user_id=self.user_id)
+            db.session.add(self._row)
+        self._row.turns = json.dumps(self.turns)
+        self._row.summary = self.summary
+        self._row.updated_at = datetime.utcnow()
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Could not save chat history for user {self.user_id}: {e}")
+
+
+def _build_payload(user_message, context=None, conversation=None):
+    chatHistory = []
+    prompt = SYSTEM_INSTRUCTION + "\n\n"
+    if context:
+        prompt += context + "\n\n"
+    if conversation is not None:
+        if conversation.summary:
+            prompt += "Summary of earlier messages in this conversation:\n" + conversation.summary + "\n\n"
+        for turn in conversation.context_turns():
+            chatHistory.append({ "role": "user", "parts": [{ "text": turn['user'] }] })
+            chatHistory.append({ "role": "model", "parts": [{ "text": turn['model'] }] })
+    chatHistory.append({ "role": "user", "parts": [{ "text": prompt + user_message }] })
+    return { "contents": chatHistory }
+
+
+def _candidate_text(result):
+    if result.get('candidates') and result['candidates'][0].get('content') and result['candidates'][0]['content'].get('parts'):
+        return result['candidates'][0]['content']['parts'][0].get('text')
+    return None
+
+
+def request_completion(user_message, api_key, context=None, conversation=None):
+    """Sends one message to the configured Gemini endpoint and returns the reply text."""
+    payload = _build_payload(user_message, context, conversation)
+    result = chatbot_client.post_json(current_app.config['CHATBOT_API_URL'], payload, params={'key': api_key})
+
+    bot_response = _candidate_text(result)
+    if bot_response is None:
+        # Only the shape is logged: the response may echo the prompt, which carries history and retrieved content.
+        print(f"Gemini API returned unexpected structure (keys: {sorted(result) if isinstance(result, dict) else type(result).__name__})")
+    return bot_response
+
+
+def stream_completion(user_message, api_key, context=None, conversation=None):
+    """Yields reply text chunks from Gemini's streaming endpoint as they are generated."""
+    events = chatbot_client.stream_events(current_app.config['CHATBOT_STREAM_API_URL'],
+                                          _build_payload(user_message, context, conversation),
+                                          params={'key': api_key, 'alt': 'sse'})
+    for event in events:
+        text = _candidate_text(event)
+        if text:
+            yield text
+
+
+def local_reply(user_message, conversation):
+    """
+    Answers from the response cache or a closely matching FAQ without calling Gemini, recording the
+    turn in the conversation. Returns None otherwise. Cached answers are only used at the start of a
+    conversation, where they cannot depend on earlier messages.
+    """
+    answer = response_cache.get(user_message) if conversation.is_empty else None
+    if answer is None:
+        answer = knowledge_index.faq_answer(user_message)
+    if answer is not None:
+        conversation.add_turn(user_message, answer)
+    return answer
+
+
+def get_reply(user_message, api_key, user_id):
+    """Returns the answer for a message, locally when possible, otherwise from Gemini with history and retrieved context."""
+    conversation = Conversation(user_id)
+    answer = local_reply(user_message, conversation)
+    if answer is not None:
+        return answer
+
+    cacheable = conversation.is_empty
+    version = response_cache.content_version() if cacheable else None # Before retrieval, so an edit meanwhile is not masked
+    bot_response = request_completion(user_message, api_key, knowledge_index.context_snippets(user_message), conversation)
+    if bot_response is None:
+        return EMPTY_RESPONSE_TEXT
+    if cacheable:
+        response_cache.set(user_message, bot_response, version)
+    conversation.add_turn(user_message, bot_response)
+    return bot_response
+
+
+def stream_reply(user_message, api_key, user_id, check_local=True):
+    """
+    Yields the answer for a message in chunks. Local answers are yielded whole; fresh answers are
+    relayed chunk by chunk, then recorded in the conversation (and cached) once the stream completes.
+    """
+    conversation = Conversation(user_id)
+    if check_local:
+        answer = local_reply(user_message, conversation)
+        if answer is not None:
+            yield answer
+            return
+
+    cacheable = conversation.is_empty
+    version = response_cache.content_version() if cacheable else None # Before retrieval, so an edit meanwhile is not masked
+    chunks = []
+    for chunk in stream_completion(user_message, api_key, knowledge_index.context_snippets(user_message), conversation):
+        chunks.append(chunk)
+        yield chunk
+
+    if not chunks:
+        yield EMPTY_RESPONSE_TEXT
+        return
+    bot_response = ''.join(chunks)
+    if cacheable:
+        response_cache.set(user_message, bot_response, version)
+    conversation.add_turn(user_message, bot_response)
+
+
+class ChatbotJobQueue:
+    """
+    Runs chatbot requests on a small dedicated thread pool so web workers return in milliseconds.
+    Each request becomes a ChatbotJob row, so any worker process can answer a poll. The partial reply
+    is kept in memory in the process that runs it and copied to the row at most every
+    CHATBOT_JOB_SAVE_INTERVAL seconds, so polls served by other processes see progress too.
+    Submissions beyond CHATBOT_QUEUE_SIZE queued or running jobs are rejected instead of piling up.
+    """
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._lock = Lock()
+        self._live = {} # job_id -> list of reply chunks received so far
+        self._depth = 0
+        self._submits_since_purge = 0
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.workers = app.config.get('CHATBOT_WORKERS', 4)
+        self.max_depth = app.config.get('CHATBOT_QUEUE_SIZE', 32)
+        self.retention = app.config.get('CHATBOT_JOB_RETENTION', 3600)
+        self.stale_after = app.config.get('CHATBOT_JOB_STALE', 300)
+        self.save_interval = app.config.get('CHATBOT_JOB_SAVE_INTERVAL', 1.0)
+        app.extensions['chatbot_jobs'] = self
+
+    @property
+    def executor(self):
+        # Created on first use so forked worker processes each get their own threads.
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='chatbot')
+        return self._executor
+
+    def submit(self, user_id, user_message, api_key):
+        """Queues a message and returns the new job id. Raises ChatbotUnavailable when the queue is full."""
+        with self._lock:
+            if self._depth >= self.max_depth:
+                self.stats['rejected'] += 1
+                raise ChatbotUnavailable('The AI assistant is handling too many questions right now. Please try again in a moment.')
+            self._depth += 1
+            self.stats['submitted'] += 1
+            self._submits_since_purge += 1
+            should_purge = self._submits_since_purge >= 100
+            if should_purge:
+                self._submits_since_purge = 0
+
+        job_id = uuid.uuid4().hex
+        try:
+            db.session.add(ChatbotJob(id=job_id, user_id=user_id, status='pending'))
+            db.session.commit()
+            if should_purge:
+                self.fail_stale()
+                self.purge()
+            with self._lock:
+                self._live[job_id] = []
+            app = current_app._get_current_object()
+            self.executor.submit(self._run, app, job_id, user_id, user_message, api_key)
+        except Exception:
+            with self._lock:
+                self._depth -= 1
+                self._live.pop(job_id, None)
+            raise
+        return job_id
+
+    def _run(self, app, job_id, user_id, user_message, api_key):
+        import requests
+        with app.app_context():
+            status, response, error = 'done', None, None
+            saved_at = time.monotonic()
+            try:
+                for chunk in stream_reply(user_message, api_key, user_id, check_local=False):
+                    with self._lock:
+                        self._live[job_id].append(chunk)
+                    if time.monotonic() - saved_at >= self.save_interval:
+                        self._save_partial(job_id)
+                        saved_at = time.monotonic()
+                with self._lock:
+                    response = ''.join(self._live[job_id])
+            except ChatbotUnavailable as e:
+                print(f"Gemini API call skipped: {e}")
+                status, error = 'error', str(e)
+            except requests.exceptions.RequestException as e:
+                print(f"Error calling Gemini API: {e}")
+                status, error = 'error', f"Failed to connect to the AI service: {str(e)}"
+            except Exception as e:
+                print(f"An unexpected error occurred: {e}")
+                status, error = 'error', f"An unexpected error occurred: {str(e)}"
+
+            try:
+                job = db.session.get(ChatbotJob, job_id)
+                job.status = status
+                job.response = response
+                job.error = error
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Could not save chatbot job {job_id}: {e}")
+            finally:
+                with self._lock:
+                    self._live.pop(job_id, None)
+                    self._depth -= 1
+                    self.stats['completed' if status == 'done' else 'failed'] += 1
+
+    def _save_partial(self, job_id):
+        with self._lock:
+            partial = ''.join(self._live[job_id])
+        try:
+            db.session.execute(db.update(ChatbotJob).where(ChatbotJob.id == job_id, ChatbotJob.status == 'pending')
+                               .values(response=partial))
+            db.session.commit()
+        except Exception as e:
+            # Only progress for polls served elsewhere is lost; the final reply is still saved.
+            db.session.rollback()
+            print(f"Could not save partial reply of chatbot job {job_id}: {e}")
+
+    def status(self, job_id, user_id):
+        """Returns the job's state for its owner, including the partial reply while it is still running."""
+        with self._lock:
+            chunks = self._live.get(job_id)
+            partial = ''.join(chunks) if chunks is not None else None
+
+        job = db.session.get(ChatbotJob, job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        if job.status == 'pending' and partial is None and job.created_at < datetime.utcnow() - timedelta(seconds=self.stale_after):
+            self.fail_stale() # Whoever polls first settles a job whose process died, rather than waiting for the next sweep
+            db.session.refresh(job)
+        if job.status == 'pending' and partial is not None:
+            return {'status': 'running' if partial else 'pending', 'text': partial}
+        if job.status == 'done':
+            return {'status': 'done', 'text': job.response}
+        if job.status == 'error':
+            return {'status': 'error', 'error': job.error}
+        # Running in another process: the last partial reply it saved.
+        return {'status': 'running' if job.response else 'pending', 'text': job.response or ''}
+
+    def purge(self):
+        """Deletes jobs that finished more than CHATBOT_JOB_RETENTION seconds ago."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention)
+        deleted = ChatbotJob.query.filter(ChatbotJob.status.in_(('done', 'error')), ChatbotJob.created_at < cutoff) \
+            .delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    def fail_stale(self):
+        """
+        Marks jobs still pending CHATBOT_JOB_STALE seconds after submission as failed. Their process died
+        (restart, crash) before finishing them, so nothing would ever move them out of 'pending'.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        with self._lock:
+            live = list(self._live) # Still queued or running here, however old
+        query = ChatbotJob.query.filter(ChatbotJob.status == 'pending', ChatbotJob.created_at < cutoff)
+        if live:
+            query = query.filter(ChatbotJob.id.notin_(live))
+        failed = query.update({'status': 'error', 'finished_at': datetime.utcnow(),
+                               'error': 'The AI assistant stopped working on this question. Please ask again.'},
+                              synchronize_session=False)
+        db.session.commit()
+        return failed
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['queue_depth'] = self._depth
+            stats['running'] = sum(1 for chunks in self._live.values() if chunks)
+        stats['workers'] = self.workers
+        stats['max_queue_depth'] = self.max_depth
+        return stats
+
+
+job_queue = ChatbotJobQueue()
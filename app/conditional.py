@@ -0,0 +1,76 @@
+# mentor_connect_ngo_enhanced/app/conditional.py
+import hashlib
+from datetime import timezone
+from flask import request, session, make_response
+from flask_login import current_user
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import ContentVersion
+
+
+def version_of(name):
+    """Scalar subquery for a ContentVersion counter, so it can be read in the same SELECT as other validators."""
+    return select(ContentVersion.version).where(ContentVersion.name == name).scalar_subquery()
+
+
+def content_versions(*names):
+    """Current values of several ContentVersion counters in one query, in the order given (0 if never bumped)."""
+    rows = dict(db.session.execute(select(ContentVersion.name, ContentVersion.version)
+                                   .where(ContentVersion.name.in_(names))).all())
+    return tuple(rows.get(name, 0) for name in names)
+
+
+def bump_version(name):
+    """Increments a ContentVersion counter in the current transaction; commit it together with the change it covers."""
+    bumped = db.session.execute(update(ContentVersion).where(ContentVersion.name == name)
+                                .values(version=ContentVersion.version + 1)).rowcount
+    if bumped:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(ContentVersion(name=name, version=1))
+    except IntegrityError: # Another worker created the row first
+        db.session.execute(update(ContentVersion).where(ContentVersion.name == name)
+                           .values(version=ContentVersion.version + 1))
+
+
+class ConditionalResponse:
+    """
+    Validators for one GET response, built from cheap values (counts, max ids, version counters) that
+    change whenever the full payload would. The view checks `fresh` before running its expensive queries
+    and returns `not_modified()` (304) when the client's If-None-Match / If-Modified-Since still match.
+    The logged-in user is part of the ETag because pages render their name and role.
+    """
+
+    def __init__(self, *parts, last_modified=None):
+        if current_user.is_authenticated:
+            parts += (current_user.id, current_user.username, current_user.role)
+        self.etag = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:32]
+        self.last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc) if last_modified else None
+        # Flashed messages are rendered into the page but are not part of the validators.
+        self.cacheable = not session.get('_flashes')
+
+    @property
+    def fresh(self):
+        if not self.cacheable or request.method not in ('GET', 'HEAD'):
+            return False
+        if request.if_none_match: # Takes precedence over If-Modified-Since
+            return request.if_none_match.contains_weak(self.etag)
+        if self.last_modified and request.if_modified_since:
+            return self.last_modified <= request.if_modified_since
+        return False
+
+    def not_modified(self):
+        return self.apply(make_response('', 304))
+
+    def apply(self, response):
+        if not self.cacheable:
+            return response
+        response.set_etag(self.etag)
+        if self.last_modified:
+            response.last_modified = self.last_modified
+        # Browsers keep the body but revalidate on every use; shared caches must not store it.
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.vary.add('Cookie')
+        return response
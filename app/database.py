@@ -0,0 +1,83 @@
+# mentor_connect_ngo_enhanced/app/database.py
+from sqlalchemy import event, inspect
+
+
+def _is_sqlite(uri):
+    return uri.startswith('sqlite')
+
+
+def _is_sqlite_memory(uri):
+    return uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri
+
+
+def engine_options(config):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the configured database. Pool size and overflow only apply to
+    pooled engines; an in-memory SQLite database lives in a single connection, so it keeps the default pool.
+    """
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    options = {
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+    }
+    if not _is_sqlite_memory(uri):
+        options['pool_size'] = config['DB_POOL_SIZE']
+        options['max_overflow'] = config['DB_MAX_OVERFLOW']
+        options['pool_timeout'] = config['DB_POOL_TIMEOUT']
+    if _is_sqlite(uri):
+        # Let SQLite's own busy_timeout do the waiting, and allow pooled connections to move between threads.
+        options['connect_args'] = {'timeout': config['SQLITE_BUSY_TIMEOUT'] / 1000.0, 'check_same_thread': False}
+    return options
+
+
+def register_sqlite_pragmas(app, engine):
+    """
+    Applies the SQLite pragmas from the app config to every new connection.
+    WAL lets readers carry on while a write is in progress, synchronous=NORMAL skips the
+    fsync on each commit (WAL is still crash-safe, only the last commits can be lost on power
+    failure), and busy_timeout makes writers wait for the lock instead of failing with
+    "database is locked".
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = []
+    journal_mode = app.config['SQLITE_JOURNAL_MODE']
+    if journal_mode and not _is_sqlite_memory(app.config['SQLALCHEMY_DATABASE_URI']):
+        pragmas.append(f"PRAGMA journal_mode={journal_mode}")
+    pragmas.append(f"PRAGMA synchronous={app.config['SQLITE_SYNCHRONOUS']}")
+    pragmas.append(f"PRAGMA busy_timeout={int(app.config['SQLITE_BUSY_TIMEOUT'])}")
+    pragmas.append(f"PRAGMA cache_size={int(app.config['SQLITE_CACHE_SIZE'])}")
+    pragmas.append(f"PRAGMA mmap_size={int(app.config['SQLITE_MMAP_SIZE'])}")
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+def init_schema(db):
+    """
+    Creates missing tables, then any index declared on the models that an existing table lacks
+    (db.create_all() skips tables that already exist). Returns (created_tables, created_indexes).
+    New columns on existing tables still need a manual migration.
+    Run it once per deploy with `python init_db.py`, not from create_app, so workers don't race on DDL.
+    """
+    engine = db.engine
+    existing_tables = set(inspect(engine).get_table_names())
+    db.create_all()
+
+    inspector = inspect(engine)
+    created_tables = [table.name for table in db.metadata.sorted_tables if table.name not in existing_tables]
+    created_indexes = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=engine)
+                created_indexes.append(index.name)
+    return created_tables, created_indexes
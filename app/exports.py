@@ -0,0 +1,138 @@
+# mentor_connect_ngo_enhanced/app/exports.py
+import csv
+import io
+import json
+import zlib
+from datetime import datetime, date
+from app import db
+from app.models import User, SessionLog, QuizAttempt, QuizAnswer, Quiz, Option, StudentResourceCompletion
+
+# Rows are pulled from the database in batches of this size and written out in chunks,
+# so memory use depends on the batch size rather than on the size of the table.
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+
+def _users_query():
+    # The password hash is deliberately left out of exports.
+    return db.session.query(
+        User.id, User.username, User.email, User.role, User.mentor_id,
+        User.expertise_areas, User.contact_preference, User.bio,
+        User.last_login, User.last_activity
+    ).order_by(User.id)
+
+
+def _sessions_query():
+    return db.session.query(
+        SessionLog.id, SessionLog.mentor_id, SessionLog.student_id, SessionLog.session_date,
+        SessionLog.duration_minutes, SessionLog.topics_discussed, SessionLog.progress_notes
+    ).order_by(SessionLog.id)
+
+
+def _quiz_attempts_query():
+    return db.session.query(
+        QuizAttempt.id, QuizAttempt.quiz_id, Quiz.title.label('quiz_title'), QuizAttempt.student_id,
+        QuizAttempt.attempt_date, QuizAttempt.score, QuizAttempt.total_questions
+    ).join(Quiz, Quiz.id == QuizAttempt.quiz_id).order_by(QuizAttempt.id)
+
+
+def _quiz_answers_query():
+    return db.session.query(
+        QuizAnswer.id, QuizAnswer.attempt_id, QuizAttempt.quiz_id, QuizAttempt.student_id,
+        QuizAnswer.question_id, QuizAnswer.selected_option_id, Option.is_correct
+    ).join(QuizAttempt, QuizAttempt.id == QuizAnswer.attempt_id) \
+     .outerjoin(Option, Option.id == QuizAnswer.selected_option_id) \
+     .order_by(QuizAnswer.id)
+
+
+def _completions_query():
+    return db.session.query(
+        StudentResourceCompletion.id, StudentResourceCompletion.student_id,
+        StudentResourceCompletion.resource_id, StudentResourceCompletion.completed_at
+    ).order_by(StudentResourceCompletion.id)
+
+
+EXPORT_DATASETS = {
+    'users': _users_query,
+    'sessions': _sessions_query,
+    'quiz_attempts': _quiz_attempts_query,
+    'quiz_answers': _quiz_answers_query,
+    'resource_completions': _completions_query,
+}
+
+
+def _serialize(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def iter_dataset_rows(dataset):
+    """Yields (column_names, row) pairs for a dataset, streaming from the database with yield_per."""
+    query = EXPORT_DATASETS[dataset]()
+    columns = [column['name'] for column in query.column_descriptions]
+    for row in query.yield_per(EXPORT_BATCH_SIZE):
+        yield columns, row
+
+
+def _iter_csv(dataset):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    header_written = False
+    pending = 0
+    for columns, row in iter_dataset_rows(dataset):
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerow([_serialize(value) for value in row])
+        pending += 1
+        if pending >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    if not header_written:
+        writer.writerow([column['name'] for column in EXPORT_DATASETS[dataset]().column_descriptions])
+    yield buffer.getvalue()
+
+
+def _iter_ndjson(dataset):
+    lines = []
+    for columns, row in iter_dataset_rows(dataset):
+        lines.append(json.dumps({column: _serialize(value) for column, value in zip(columns, row)}))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) # wbits=31 writes a gzip header and trailer
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def generate_export(dataset, fmt='csv', compress=False):
+    """
+    Returns a generator of bytes for the requested dataset and format ('csv' or 'ndjson'),
+    gzip-compressed on the fly when `compress` is true.
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"Unknown export dataset '{dataset}'.")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'.")
+
+    chunks = _iter_csv(dataset) if fmt == 'csv' else _iter_ndjson(dataset)
+    if compress:
+        return _gzip_chunks(chunks)
+    return (chunk.encode('utf-8') for chunk in chunks)
+
+
+def export_filename(dataset, fmt, compress=False):
+    stamp = datetime.utcnow().strftime('%Y%m%d')
+    return f"{dataset}_{stamp}.{fmt}" + ('.gz' if compress else '')
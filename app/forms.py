@@ -6,10 +6,11 @@ from wtforms import StringField, PasswordField, SubmitField, BooleanField, \
 from wtforms.validators import DataRequired, Length, Email, EqualTo, ValidationError, Optional
 from app.models import User # Import User model to check for uniqueness
 from flask_login import current_user
-from email_validator import validate_email, EmailNotValidError # Import for email validation
 
 # Custom validator for email
 def validate_email_address(form, field):
+    # email_validator (and its DNS stack) is only imported when a form with an email field is validated.
+    from email_validator import validate_email, EmailNotValidError
     try:
         validate_email(field.data)
     except EmailNotValidError:
@@ -133,6 +134,12 @@ class ResourceForm(FlaskForm):
     ], validators=[DataRequired()])
     submit = SubmitField('Add Resource')
 
+# Form for chatbot FAQs (Admin)
+class FAQForm(FlaskForm):
+    question = StringField('Question', validators=[DataRequired(), Length(min=5, max=255)])
+    answer = TextAreaField('Answer', validators=[DataRequired(), Length(max=2000)])
+    submit = SubmitField('Save FAQ')
+
 # Form for searching/filtering users
 class UserSearchFilterForm(FlaskForm):
     search_query = StringField('Search (Username or Email)', validators=[Optional()])
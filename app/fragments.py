@@ -0,0 +1,199 @@
+# mentor_connect_ngo_enhanced/app/fragments.py
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock, local
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+class MemoryFragmentStore:
+    """In-process LRU of rendered fragments with per-entry expiry. Each worker keeps its own copy."""
+
+    def __init__(self, max_entries):
+        self._lock = Lock()
+        self._entries = OrderedDict() # key -> (expires_at, html)
+        self.max_entries = max_entries
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, html, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, html)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteFragmentStore:
+    """
+    Fragments in a SQLite file shared by all workers on the host (its own file, not the app database).
+    Expired rows are ignored on read and pruned, together with the oldest rows beyond max_entries,
+    every PRUNE_EVERY writes.
+    """
+
+    PRUNE_EVERY = 200
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS fragment (key TEXT PRIMARY KEY, html TEXT NOT NULL, '
+                         'expires_at REAL NOT NULL, stored_at REAL NOT NULL)')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None: # One connection per thread
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def get(self, key):
+        row = self._connection().execute('SELECT html FROM fragment WHERE key = ? AND expires_at > ?',
+                                         (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, html, ttl):
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO fragment (key, html, expires_at, stored_at) VALUES (?, ?, ?, ?)',
+                         (key, html, now + ttl, now))
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                conn.execute('DELETE FROM fragment WHERE expires_at <= ?', (now,))
+                conn.execute('DELETE FROM fragment WHERE key NOT IN '
+                             '(SELECT key FROM fragment ORDER BY stored_at DESC LIMIT ?)', (self.max_entries,))
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute('DELETE FROM fragment')
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM fragment').fetchone()[0]
+
+
+class FragmentCacheExtension(Extension):
+    """
+    {% cache key, ttl %}...{% endcache %} renders the body once and reuses the HTML until `ttl` seconds
+    pass (FRAGMENT_CACHE_TTL when omitted). `key` is a string or a list; include everything the body depends on,
+    typically ids plus content_versions(...), so a write that bumps a version switches to a fresh key.
+    """
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render_fragment', args), [], [], body).set_lineno(lineno)
+
+    def _render_fragment(self, key, ttl, caller):
+        return self.environment.fragment_cache.render(key, ttl, caller)
+
+
+class FragmentCache:
+    """
+    Rendered-fragment cache behind the {% cache %} tag, with a pluggable store: FRAGMENT_CACHE_BACKEND is
+    'memory' (per-process LRU), 'sqlite' (a file at FRAGMENT_CACHE_PATH shared by the workers on a host)
+    or 'none'. Also turns on Jinja's bytecode cache for compiled templates (TEMPLATE_BYTECODE_CACHE).
+    """
+
+    def __init__(self, app=None):
+        self._lock = Lock()
+        self.store = None
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('FRAGMENT_CACHE_BACKEND', 'memory')
+        max_entries = app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', 5000)
+        self.default_ttl = app.config.get('FRAGMENT_CACHE_TTL', 300)
+        if backend == 'sqlite':
+            path = app.config.get('FRAGMENT_CACHE_PATH') or os.path.join(app.instance_path, 'fragment_cache.sqlite')
+            self.store = SQLiteFragmentStore(path, max_entries)
+        elif backend == 'memory':
+            self.store = MemoryFragmentStore(max_entries)
+        elif backend == 'none':
+            self.store = None
+        else:
+            raise ValueError(f"Unknown FRAGMENT_CACHE_BACKEND '{backend}' (expected 'memory', 'sqlite' or 'none').")
+        self.backend = backend
+
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        app.jinja_env.fragment_cache = self
+        if app.config.get('TEMPLATE_BYTECODE_CACHE', True):
+            # Compiled templates are reused across restarts and workers instead of being recompiled from source.
+            directory = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR')
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory or None)
+        app.extensions['fragment_cache'] = self
+
+    @staticmethod
+    def make_key(key):
+        parts = key if isinstance(key, (list, tuple)) else [key]
+        flat = []
+        for part in parts:
+            flat.extend(part if isinstance(part, (list, tuple)) else [part])
+        return 'fragment:' + ':'.join(str(part) for part in flat)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def render(self, key, ttl, caller):
+        if self.store is None:
+            return caller()
+        cache_key = self.make_key(key)
+        html = self.store.get(cache_key)
+        if html is not None:
+            self._count('hits')
+            return Markup(html)
+        self._count('misses')
+        html = caller()
+        self.store.set(cache_key, str(html), self.default_ttl if ttl is None else ttl)
+        self._count('stores')
+        return html
+
+    def clear(self):
+        if self.store is not None:
+            self.store.clear()
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else None
+        stats['backend'] = self.backend
+        stats['entries'] = len(self.store) if self.store is not None else 0
+        return stats
+
+
+fragment_cache = FragmentCache()
@@ -0,0 +1,90 @@
+# mentor_connect_ngo_enhanced/app/identity.py
+import time
+from collections import OrderedDict
+from threading import Lock
+from sqlalchemy.orm import make_transient_to_detached
+from app import db
+from app.models import User
+
+# Column values kept per user. The password hash is deliberately left out; it is only needed at
+# login, which always queries the user directly, and is loaded on demand otherwise.
+IDENTITY_COLUMNS = tuple(column.key for column in User.__table__.columns if column.key != 'password')
+
+
+class IdentityCache:
+    """
+    Short-lived, per-process cache of User rows for login_manager.user_loader and for permission
+    checks on other users. Entries hold plain column values (role, mentor_id, username, ...) for
+    IDENTITY_CACHE_TTL seconds. Views that change a user call invalidate(). A cached user is attached
+    to the request's session with merge(load=False), so loading current_user costs no query.
+    """
+
+    def __init__(self, app=None):
+        self._lock = Lock()
+        self._entries = OrderedDict() # user_id -> (expires_at, values)
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('IDENTITY_CACHE_TTL', 30)
+        self.max_entries = app.config.get('IDENTITY_CACHE_MAX_ENTRIES', 10000)
+        app.extensions['identity_cache'] = self
+
+    def _lookup(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.stats['hits'] += 1
+                return entry[1]
+            self.stats['misses'] += 1
+        return None
+
+    def _store(self, user):
+        values = {key: getattr(user, key) for key in IDENTITY_COLUMNS}
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return values
+
+    def get(self, user_id):
+        """Returns a dict of the user's column values, or None if the user does not exist."""
+        values = self._lookup(user_id)
+        if values is None:
+            user = db.session.get(User, user_id)
+            if user is None:
+                return None
+            values = self._store(user)
+        return values
+
+    def load_user(self, user_id):
+        """Returns a session-attached User for Flask-Login, querying the database only on a cache miss."""
+        values = self._lookup(user_id)
+        if values is None:
+            user = db.session.get(User, user_id)
+            if user is not None:
+                self._store(user)
+            return user
+
+        user = User(**values)
+        make_transient_to_detached(user) # Marks the values as loaded; anything else (e.g. password) loads on access
+        return db.session.merge(user, load=False)
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                if self._entries.pop(user_id, None) is not None:
+                    self.stats['invalidations'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+        return stats
+
+
+identity_cache = IdentityCache()
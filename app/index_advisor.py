@@ -0,0 +1,143 @@
+# mentor_connect_ngo_enhanced/app/index_advisor.py
+import re
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Lock
+from sqlalchemy import event
+from app import db
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_ALIAS_RE = re.compile(r'"?(\w+)"? AS "?(\w+)"?') # FROM "user" AS mentor
+_SQLITE_SCAN_RE = re.compile(r'^SCAN (\w+)(?: USING (COVERING )?INDEX (\w+))?')
+_POSTGRES_SCAN_RE = re.compile(r'Seq Scan on "?(\w+)"?')
+_EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+# EXPLAIN prefix per dialect; both only plan the statement, they never run it.
+EXPLAIN_PREFIX = {'sqlite': 'EXPLAIN QUERY PLAN ', 'postgresql': 'EXPLAIN '}
+
+
+def normalize(statement):
+    return _WHITESPACE_RE.sub(' ', statement).strip()
+
+
+class IndexAdvisor:
+    """
+    Collects the distinct SQL statements the app runs (with one sample of their parameters), then asks the
+    database for each statement's query plan and reports the ones that still read a whole table.
+    Capture is opt-in (INDEX_ADVISOR_ENABLED) for a running app, or scoped with `capture()` by
+    benchmark.py --index-advice. Only SQLite and PostgreSQL plans are understood.
+    """
+
+    def __init__(self, app=None):
+        self._lock = Lock()
+        self.statements = OrderedDict() # normalized SQL -> {'sql', 'parameters', 'count'}
+        self.max_statements = 500
+        self.enabled = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('INDEX_ADVISOR_ENABLED', False)
+        self.max_statements = app.config.get('INDEX_ADVISOR_MAX_STATEMENTS', 500)
+        app.extensions['index_advisor'] = self
+        if self.enabled:
+            with app.app_context():
+                event.listen(db.engine, 'before_cursor_execute', self._record)
+
+    @contextmanager
+    def capture(self, engine):
+        """Records statements run on `engine` inside the block (used by benchmark.py)."""
+        event.listen(engine, 'before_cursor_execute', self._record)
+        try:
+            yield self
+        finally:
+            event.remove(engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany or conn.get_execution_options().get('index_advisor') == 'skip' \
+                or not statement.lstrip().upper().startswith(_EXPLAINABLE):
+            return
+        key = normalize(statement)
+        with self._lock:
+            entry = self.statements.get(key)
+            if entry is not None:
+                entry['count'] += 1
+            elif len(self.statements) < self.max_statements:
+                self.statements[key] = {'sql': statement, 'parameters': parameters, 'count': 1}
+
+    def clear(self):
+        with self._lock:
+            self.statements.clear()
+
+    # --- Plans ---
+
+    @staticmethod
+    def _full_scans(dialect, sql, plan):
+        """Tables the plan reads in full, with the alias mapped back to the table name."""
+        aliases = {alias: table for table, alias in _ALIAS_RE.findall(sql)}
+        scans = []
+        for line in plan:
+            if dialect == 'sqlite':
+                match = _SQLITE_SCAN_RE.match(line)
+                # 'SCAN t USING INDEX i' still visits every row, just in index order; a covering index only
+                # reads the (smaller) index, so it is not reported.
+                if match and not match.group(2) and not line.startswith('SCAN CONSTANT ROW'):
+                    scans.append(aliases.get(match.group(1), match.group(1)))
+            else:
+                scans.extend(aliases.get(table, table) for table in _POSTGRES_SCAN_RE.findall(line))
+        return scans
+
+    @staticmethod
+    def explain(conn, sql, parameters):
+        """The plan of one statement as a list of lines."""
+        dialect = conn.dialect.name
+        rows = conn.exec_driver_sql(EXPLAIN_PREFIX[dialect] + sql, parameters).all()
+        if dialect == 'sqlite':
+            return [row[-1] for row in rows] # (id, parent, notused, detail)
+        return [row[0] for row in rows]
+
+    def report(self, engine=None):
+        """
+        One entry per captured statement that full-scans a table: the statement, how often it ran, whether it
+        has a WHERE clause, the scanned tables with their current row counts, and the plan. Filtered statements
+        on the largest tables come first.
+        """
+        engine = engine or db.engine
+        if engine.dialect.name not in EXPLAIN_PREFIX:
+            raise ValueError(f"The index advisor does not understand {engine.dialect.name} query plans.")
+        with self._lock:
+            statements = list(self.statements.values())
+
+        table_rows = {}
+        findings = []
+        with engine.connect().execution_options(index_advisor='skip') as conn: # Keeps its own queries out of the capture
+            for entry in statements:
+                try:
+                    plan = self.explain(conn, entry['sql'], entry['parameters'])
+                except Exception as e: # A statement that cannot be planned on its own (e.g. a savepoint) is skipped
+                    findings.append({'statement': normalize(entry['sql']), 'count': entry['count'], 'error': str(e)})
+                    continue
+                scans = self._full_scans(engine.dialect.name, entry['sql'], plan)
+                if not scans:
+                    continue
+                for table in scans:
+                    if table not in table_rows and table in db.metadata.tables:
+                        table_rows[table] = conn.exec_driver_sql(f'SELECT COUNT(*) FROM "{table}"').scalar()
+                findings.append({
+                    'statement': normalize(entry['sql']),
+                    'count': entry['count'],
+                    'filtered': ' WHERE ' in normalize(entry['sql']).upper(), # Without a WHERE clause no index can avoid the scan
+                    'scans': [{'table': table, 'rows': table_rows.get(table)} for table in scans],
+                    'plan': plan,
+                })
+        findings.sort(key=lambda finding: (finding.get('filtered', False),
+                                           max((scan['rows'] or 0 for scan in finding.get('scans', [])), default=-1)),
+                      reverse=True)
+        return {'statements': len(statements), 'full_scans': findings}
+
+    def snapshot(self):
+        with self._lock:
+            return {'enabled': self.enabled, 'statements': len(self.statements), 'max_statements': self.max_statements}
+
+
+index_advisor = IndexAdvisor()
@@ -1,6 +1,7 @@
 # mentor_connect_ngo_enhanced/app/models.py
 from datetime import datetime, date, timedelta
-from app import db, bcrypt
+from app import db
+from app.passwords import password_hasher
 from flask_login import UserMixin
 from sqlalchemy.schema import UniqueConstraint
 from sqlalchemy.ext.hybrid import hybrid_property, hybrid_method
@@ -22,7 +23,7 @@ class User(db.Model, UserMixin):
     last_activity = db.Column(db.DateTime, nullable=True) # For general activity tracking
 
     # Self-referencing foreign key for mentor-student relationship
-    mentor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    mentor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True, index=True)
     students = db.relationship('User', foreign_keys=[mentor_id], backref=db.backref('assigned_mentor', remote_side=[id]), lazy='dynamic')
 
     # Relationships for In-App Messaging
@@ -49,15 +50,26 @@ class User(db.Model, UserMixin):
     # New: Relationship for Quiz Attempts by a student
     quiz_attempts = db.relationship('QuizAttempt', backref='student_user', lazy='dynamic')
 
+    # Role filters on the admin pages and dashboards (e.g. students with/without a mentor).
+    __table_args__ = (db.Index('ix_user_role_mentor', 'role', 'mentor_id'),)
 
     def __repr__(self):
         return f"User('{self.username}', '{self.email}', Role: '{self.role}')"
 
+    # Hashing runs on the password hasher's process pool (see app/passwords.py).
     def set_password(self, password):
-        self.password = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password = password_hasher.hash(password)
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password, password)
+        return password_hasher.verify(password, self.password)
+
+    def upgrade_password_hash(self, password):
+        """Re-hashes a just-verified password if it was stored at an outdated work factor. Returns True if it changed."""
+        new_hash = password_hasher.rehash_if_needed(password, self.password)
+        if new_hash is None:
+            return False
+        self.password = new_hash
+        return True
 
     def is_admin(self):
         return self.role == 'admin'
@@ -98,67 +110,60 @@ class User(db.Model, UserMixin):
 
     def calculate_streak(self):
         """Calculates the current consecutive daily activity streak."""
-        activity_dates_str = self.daily_activity_dates # This will call the hybrid property to get processed dates
-        if not activity_dates_str:
-            return 0
-
-        # Convert date strings back to date objects for comparison
-        all_dates = sorted([datetime.fromisoformat(d).date() for d in activity_dates_str.keys()])
-
-        if not all_dates:
-            return 0
-
-        today = date.today()
-        # Check if today or yesterday had activity
-        has_today_activity = today in all_dates
-        has_yesterday_activity = (today - timedelta(days=1)) in all_dates
-
-        if not has_today_activity and not has_yesterday_activity:
-            return 0 # No activity today or yesterday, streak broken
-
-        streak = 0
-        current_date = today if has_today_activity else (today - timedelta(days=1))
+        return activity_streak({date.fromisoformat(d) for d in self.daily_activity_dates})
 
-        # Check if the most recent activity is today or yesterday
-        if current_date not in all_dates: # This might happen if last activity was older
-            return 0
 
-        # Iterate backward from the most recent active day
-        for i in range(len(all_dates) - 1, -1, -1):
-            if all_dates[i] == current_date:
-                streak += 1
-                current_date -= timedelta(days=1)
-            elif all_dates[i] < current_date:
-                # If there's a gap or we've gone past the expected previous day, break
-                if all_dates[i] != (current_date + timedelta(days=1)): # Check for exact previous day
-                     break
-                else: # Consecutive day, continue
-                    streak += 1
-                    current_date -= timedelta(days=1)
-            else: # Future date or already counted, skip
-                continue
-
-        return streak
+def activity_streak(active_days, today=None):
+    """Number of consecutive active days ending today, or yesterday when there is no activity today yet."""
+    today = today or date.today()
+    day = today if today in active_days else today - timedelta(days=1)
+    streak = 0
+    while day in active_days:
+        streak += 1
+        day -= timedelta(days=1)
+    return streak
 
 
 # Message model for in-app messaging
 class Message(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    receiver_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    receiver_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     content = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
+    # A conversation is (sender=a AND receiver=b) OR (sender=b AND receiver=a); each half is one range of this
+    # index, already in timestamp order. Its leading column also covers sender_id on its own.
+    __table_args__ = (db.Index('ix_message_conversation', 'sender_id', 'receiver_id', 'timestamp'),)
+
     def __repr__(self):
         return f"Message(From: '{self.sender.username}', To: '{self.receiver.username}', Time: '{self.timestamp}')"
 
+# MessageArchive model: one conversation's messages for one month, moved out of Message by app.archive
+class MessageArchive(db.Model):
+    __tablename__ = 'message_archive'
+    id = db.Column(db.Integer, primary_key=True)
+    user_low_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False) # The smaller of the two user ids
+    user_high_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    month = db.Column(db.Date, nullable=False) # First day of the month
+    message_count = db.Column(db.Integer, nullable=False, default=0)
+    first_timestamp = db.Column(db.DateTime, nullable=False)
+    last_timestamp = db.Column(db.DateTime, nullable=False)
+    payload = db.Column(db.LargeBinary, nullable=False) # zlib-compressed JSON rows, oldest first (see app.archive)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint('user_low_id', 'user_high_id', 'month', name='_message_archive_uc'),)
+
+    def __repr__(self):
+        return f"MessageArchive(Users: {self.user_low_id}/{self.user_high_id}, Month: {self.month}, Messages: {self.message_count})"
+
 # Announcement model
 class Announcement(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    date_posted = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    admin_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date_posted = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    admin_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     admin = db.relationship('User', backref='posted_announcements')
 
     def __repr__(self):
@@ -186,9 +191,37 @@ class SessionLog(db.Model):
     # The 'mentor_of_session' relationship on SessionLog is implicitly created by the backref
     # from User.sessions_logged_as_mentor.
 
+    # Composite indexes backing per-mentor and per-student date range queries (analytics, session history).
+    __table_args__ = (
+        db.Index('ix_session_log_mentor_date', 'mentor_id', 'session_date'),
+        db.Index('ix_session_log_student_date', 'student_id', 'session_date'),
+    )
+
     def __repr__(self):
         return f"SessionLog(Mentor: '{self.mentor_of_session.username}', Student: '{self.student.username}', Date: '{self.session_date}')"
 
+# SessionRollup model: weekly session totals per mentor/student pair, maintained incrementally by app.analytics
+# (writes to session_log outside log_session() and delete_user() need rebuild_session_rollup(), run by init_db.py)
+class SessionRollup(db.Model):
+    __tablename__ = 'session_rollup'
+    id = db.Column(db.Integer, primary_key=True)
+    mentor_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    week_start = db.Column(db.Date, nullable=False) # Monday of the ISO week
+    session_count = db.Column(db.Integer, nullable=False, default=0)
+    total_minutes = db.Column(db.Integer, nullable=False, default=0)
+    last_session_date = db.Column(db.DateTime, nullable=True)
+    max_session_id = db.Column(db.Integer, nullable=False, default=0) # Highest SessionLog.id folded into this row
+
+    __table_args__ = (
+        UniqueConstraint('mentor_id', 'student_id', 'week_start', name='_session_rollup_uc'),
+        db.Index('ix_session_rollup_week', 'week_start'),
+        db.Index('ix_session_rollup_student_week', 'student_id', 'week_start'),
+    )
+
+    def __repr__(self):
+        return f"SessionRollup(Mentor: {self.mentor_id}, Student: {self.student_id}, Week: {self.week_start}, Sessions: {self.session_count})"
+
 # Resource model for curated learning resources
 class Resource(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -196,24 +229,40 @@ class Resource(db.Model):
     description = db.Column(db.Text, nullable=True)
     link_url = db.Column(db.String(255), nullable=True)
     category = db.Column(db.String(50), nullable=True)
-    date_added = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False) # Creator of the resource
+    date_added = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True) # Creator of the resource
 
     # New: relationship to track which students completed this resource
     completions = db.relationship('StudentResourceCompletion', backref='resource_item', lazy='dynamic')
 
+    # The resource list filtered by category, newest first.
+    __table_args__ = (db.Index('ix_resource_category_date', 'category', 'date_added'),)
+
     def __repr__(self):
         return f"Resource('{self.title}', Category: '{self.category}')"
 
+# FAQ model: admin-maintained questions the chatbot can answer without calling the AI service
+class FAQ(db.Model):
+    __tablename__ = 'faq'
+    id = db.Column(db.Integer, primary_key=True)
+    question = db.Column(db.String(255), nullable=False)
+    answer = db.Column(db.Text, nullable=False)
+    date_added = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True) # Admin who added it
+    author = db.relationship('User', backref=db.backref('faqs', lazy='dynamic'))
+
+    def __repr__(self):
+        return f"FAQ('{self.question[:50]}')"
+
 # New Model: StudentResourceCompletion (for tracking which students completed which resources)
 class StudentResourceCompletion(db.Model):
     __tablename__ = 'student_resource_completion'
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    resource_id = db.Column(db.Integer, db.ForeignKey('resource.id'), nullable=False)
+    resource_id = db.Column(db.Integer, db.ForeignKey('resource.id'), nullable=False, index=True)
     completed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
-    __table_args__ = (UniqueConstraint('student_id', 'resource_id', name='_student_resource_uc'),)
+    __table_args__ = (UniqueConstraint('student_id', 'resource_id', name='_student_resource_uc'),) # Also serves student_id lookups
 
     def __repr__(self):
         return f"StudentResourceCompletion(Student: {self.student_id}, Resource: {self.resource_id}, Completed: {self.completed_at})"
@@ -224,19 +273,22 @@ class Quiz(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
-    date_created = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    date_created = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
     creator_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False) # Mentor who created it
     
     # Relationships
     questions = db.relationship('Question', backref='quiz', lazy='dynamic', cascade='all, delete-orphan')
     attempts = db.relationship('QuizAttempt', backref='quiz', lazy='dynamic', cascade='all, delete-orphan')
 
+    # A mentor's own quizzes, newest first (also serves creator_id lookups).
+    __table_args__ = (db.Index('ix_quiz_creator_date', 'creator_id', 'date_created'),)
+
     def __repr__(self):
         return f"Quiz('{self.title}', Creator: '{self.creator.username}')"
 
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
     question_text = db.Column(db.Text, nullable=False)
     question_type = db.Column(db.String(20), nullable=False, default='multiple_choice') # 'multiple_choice', 'true_false'
     
@@ -249,7 +301,7 @@ class Question(db.Model):
 
 class Option(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False, index=True)
     option_text = db.Column(db.String(200), nullable=False)
     is_correct = db.Column(db.Boolean, default=False, nullable=False)
 
@@ -267,7 +319,12 @@ class QuizAttempt(db.Model):
     # Relationships
     answers = db.relationship('QuizAnswer', backref='attempt', lazy='dynamic', cascade='all, delete-orphan')
 
-    __table_args__ = (UniqueConstraint('quiz_id', 'student_id', name='_quiz_student_attempt_uc'),) # Limit one attempt per student per quiz (can be removed for multiple attempts)
+    __table_args__ = (
+        UniqueConstraint('quiz_id', 'student_id', name='_quiz_student_attempt_uc'), # Limit one attempt per student per quiz (can be removed for multiple attempts)
+        # Quiz results and a student's attempts, each newest first.
+        db.Index('ix_quiz_attempt_quiz_date', 'quiz_id', 'attempt_date'),
+        db.Index('ix_quiz_attempt_student_date', 'student_id', 'attempt_date'),
+    )
 
     def __repr__(self):
         return f"QuizAttempt(Student: {self.student_user.username}, Quiz: '{self.quiz.title}', Score: {self.score}/{self.total_questions})"
@@ -275,14 +332,63 @@ class QuizAttempt(db.Model):
 class QuizAnswer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     attempt_id = db.Column(db.Integer, db.ForeignKey('quiz_attempt.id'), nullable=False)
-    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False, index=True)
     # Storing the selected option ID for multiple choice, or text for open-ended
-    selected_option_id = db.Column(db.Integer, db.ForeignKey('option.id'), nullable=True)
+    selected_option_id = db.Column(db.Integer, db.ForeignKey('option.id'), nullable=True, index=True)
     # You might also want to store the actual text answer for open-ended questions
     # student_answer_text = db.Column(db.Text, nullable=True) # For future open-ended questions
 
-    __table_args__ = (UniqueConstraint('attempt_id', 'question_id', name='_attempt_question_uc'),)
+    __table_args__ = (UniqueConstraint('attempt_id', 'question_id', name='_attempt_question_uc'),) # Also serves attempt_id lookups
 
     def __repr__(self):
         return f"QuizAnswer(Attempt: {self.attempt_id}, Question: {self.question_id}, Selected: {self.selected_option_id})"
 
+
+
+# ChatbotCacheEntry model: persistent tier of the chatbot response cache (see app.chatbot)
+class ChatbotCacheEntry(db.Model):
+    __tablename__ = 'chatbot_cache_entry'
+    prompt_hash = db.Column(db.String(64), primary_key=True) # sha256 of the normalized prompt
+    prompt = db.Column(db.Text, nullable=False) # Normalized prompt, kept for inspection
+    response = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"ChatbotCacheEntry('{self.prompt[:50]}', Created: {self.created_at})"
+
+
+# ChatbotJob model: a chatbot request handled off the web worker by app.chatbot.ChatbotJobQueue
+class ChatbotJob(db.Model):
+    __tablename__ = 'chatbot_job'
+    id = db.Column(db.String(32), primary_key=True) # uuid4 hex, handed to the client for polling
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    status = db.Column(db.String(10), nullable=False, default='pending') # 'pending', 'done', 'error'
+    response = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"ChatbotJob('{self.id}', User: {self.user_id}, Status: '{self.status}')"
+
+
+# ChatHistory model: one row per user holding the chatbot ring buffer and rolling summary (see app.chatbot.Conversation)
+class ChatHistory(db.Model):
+    __tablename__ = 'chat_history'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    turns = db.Column(db.Text, nullable=False, default='[]') # JSON list of {"user": ..., "model": ...}
+    summary = db.Column(db.Text, nullable=False, default='')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"ChatHistory(User: {self.user_id}, Updated: {self.updated_at})"
+
+
+# ContentVersion model: a counter bumped whenever a shared listing changes, used as an HTTP validator (see app.conditional)
+class ContentVersion(db.Model):
+    __tablename__ = 'content_version'
+    name = db.Column(db.String(50), primary_key=True) # e.g. 'resources'
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"ContentVersion('{self.name}', {self.version})"
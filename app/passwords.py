@@ -0,0 +1,156 @@
+# mentor_connect_ngo_enhanced/app/passwords.py
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock, BoundedSemaphore
+import bcrypt as bcrypt_lib
+
+# Calibration never goes below this work factor, whatever the target latency: 12, Flask-Bcrypt's default
+# that the app used before. Lower costs need an explicit BCRYPT_LOG_ROUNDS.
+MIN_LOG_ROUNDS = 12
+MAX_LOG_ROUNDS = 16
+# Calibration times one hash at this cheaper cost and scales it up: each round doubles bcrypt's cost,
+# so a cost-8 probe (a sixteenth of a cost-12 hash) keeps create_app() fast.
+CALIBRATION_LOG_ROUNDS = 8
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when no hashing slot frees up within PASSWORD_HASH_TIMEOUT seconds."""
+
+
+# Module-level so they can be pickled into the worker processes.
+def _hash_password(password, rounds):
+    return bcrypt_lib.hashpw(password, bcrypt_lib.gensalt(rounds)).decode('utf-8')
+
+
+def _check_password(password, hashed):
+    return bcrypt_lib.checkpw(password, hashed)
+
+
+def hash_rounds(hashed):
+    """The bcrypt work factor stored in a hash such as '$2b$12$...', or None if it cannot be read."""
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a bounded process pool (PASSWORD_HASH_WORKERS processes, at most PASSWORD_HASH_QUEUE
+    jobs in flight) so login rushes cannot use up the web workers' CPU. The work factor is
+    BCRYPT_LOG_ROUNDS when set. Otherwise it is calibrated at startup (in init_app) to the highest cost
+    that hashes within PASSWORD_HASH_TARGET_MS on this machine, so the first login does not pay for it.
+    With PASSWORD_HASH_WORKERS=0 hashing runs inline.
+    """
+
+    def __init__(self, app=None):
+        self._lock = Lock()
+        self._executor = None
+        self._rounds = None
+        self._calibrated = {} # target_ms -> cost, so apps created later in the same process reuse the measurement
+        self.stats = {'hashes': 0, 'checks': 0, 'rehashes': 0, 'busy': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.configured_rounds = app.config.get('BCRYPT_LOG_ROUNDS')
+        self.target_ms = app.config.get('PASSWORD_HASH_TARGET_MS', 250)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 10)
+        self._slots = BoundedSemaphore(max(1, app.config.get('PASSWORD_HASH_QUEUE', 32)))
+        self._rounds = self.configured_rounds or self.calibrate()
+        app.extensions['password_hasher'] = self
+
+    @property
+    def rounds(self):
+        if self._rounds is None:
+            with self._lock:
+                if self._rounds is None:
+                    self._rounds = self.calibrate()
+        return self._rounds
+
+    def calibrate(self):
+        """
+        Times one hash at CALIBRATION_LOG_ROUNDS, extrapolates it to MIN_LOG_ROUNDS and returns the highest cost
+        expected to stay within target_ms. Measured once per process and target.
+        """
+        if self.target_ms in self._calibrated:
+            return self._calibrated[self.target_ms]
+        started = time.perf_counter()
+        _hash_password(b'calibration', CALIBRATION_LOG_ROUNDS)
+        elapsed_ms = (time.perf_counter() - started) * 1000 * 2 ** (MIN_LOG_ROUNDS - CALIBRATION_LOG_ROUNDS)
+        rounds = MIN_LOG_ROUNDS
+        while rounds < MAX_LOG_ROUNDS and elapsed_ms * 2 <= self.target_ms: # Each extra round doubles the cost
+            rounds += 1
+            elapsed_ms *= 2
+        print(f"Password hashing calibrated to bcrypt cost {rounds} (~{elapsed_ms:.0f} ms per hash)")
+        self._calibrated[self.target_ms] = rounds
+        return rounds
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # 'spawn' keeps the workers independent of the threads and sockets in this process. The workers
+                    # re-import the main module as '__mp_main__', so entry points must not build an app then (see run.py).
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def _run(self, function, *args):
+        if not self.workers:
+            return function(*args)
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.stats['busy'] += 1
+            raise PasswordHasherBusy('Too many logins are being processed. Please try again in a moment.')
+        try:
+            return self._get_executor().submit(function, *args).result()
+        finally:
+            self._slots.release()
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def hash(self, password):
+        if not password:
+            raise ValueError('Password must be non-empty.')
+        rounds = self.rounds
+        self._count('hashes')
+        return self._run(_hash_password, password.encode('utf-8'), rounds)
+
+    def verify(self, password, hashed):
+        if not password or not hashed:
+            return False
+        self._count('checks')
+        return self._run(_check_password, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed):
+        """True if the hash was made with a lower work factor than the current one."""
+        stored = hash_rounds(hashed)
+        return stored is not None and stored < self.rounds
+
+    def rehash_if_needed(self, password, hashed):
+        """After a successful verify(), returns a new hash at the current work factor if `hashed` is weaker, else None."""
+        if not self.needs_rehash(hashed):
+            return None
+        self._count('rehashes')
+        return self.hash(password)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['rounds'] = self._rounds
+        stats['workers'] = self.workers
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher()
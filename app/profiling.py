@@ -0,0 +1,177 @@
+# mentor_connect_ngo_enhanced/app/profiling.py
+import math
+import re
+import time
+from collections import Counter, deque
+from threading import Lock
+from flask import g, request
+from sqlalchemy import event
+from app import db
+
+_WHITESPACE_RE = re.compile(r'\s+')
+PROFILED_BLUEPRINTS = ('main', 'api_v1')
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class RequestProfiler:
+    """
+    Opt-in (PROFILING_ENABLED) per-request instrumentation for the main and API blueprints. SQLAlchemy cursor
+    events count statements and DB time for the current request. A statement whose SQL text runs at least
+    PROFILING_N_PLUS_ONE_THRESHOLD times in one request is flagged as a likely N+1 query. Each endpoint
+    keeps its last PROFILING_WINDOW durations for p50/p95/p99, plus running totals for Prometheus.
+    """
+
+    def __init__(self, app=None):
+        self._lock = Lock()
+        self.endpoints = {}
+        self.n_plus_one = deque(maxlen=50)
+        self.enabled = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        self.window = app.config.get('PROFILING_WINDOW', 1000)
+        self.n_plus_one_threshold = app.config.get('PROFILING_N_PLUS_ONE_THRESHOLD', 5)
+        app.extensions['request_profiler'] = self
+        if not self.enabled:
+            return
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_response)
+        app.teardown_request(self._record_request) # Runs after streamed bodies have been sent
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(db.engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    # --- Request hooks ---
+
+    def _start_request(self):
+        if request.blueprint not in PROFILED_BLUEPRINTS:
+            return
+        g._profile = {'start': time.perf_counter(), 'sql_count': 0, 'db_time': 0.0,
+                      'statements': Counter(), 'status': None}
+
+    def _finish_response(self, response):
+        profile = g.get('_profile')
+        if profile is not None:
+            profile['status'] = response.status_code
+            elapsed_ms = (time.perf_counter() - profile['start']) * 1000
+            response.headers['Server-Timing'] = f"app;dur={elapsed_ms:.1f}, db;dur={profile['db_time'] * 1000:.1f}"
+        return response
+
+    def _record_request(self, exc):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return
+        duration = time.perf_counter() - profile['start']
+        endpoint = request.endpoint or 'unknown'
+        repeated = [(sql, count) for sql, count in profile['statements'].items() if count >= self.n_plus_one_threshold]
+
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = {
+                    'durations': deque(maxlen=self.window), 'requests': 0, 'errors': 0,
+                    'duration_sum': 0.0, 'sql_count': 0, 'db_time': 0.0, 'max_sql_count': 0, 'n_plus_one': 0,
+                }
+            stats['durations'].append(duration)
+            stats['requests'] += 1
+            stats['duration_sum'] += duration
+            stats['sql_count'] += profile['sql_count']
+            stats['db_time'] += profile['db_time']
+            stats['max_sql_count'] = max(stats['max_sql_count'], profile['sql_count'])
+            if exc is not None or (profile['status'] or 500) >= 500:
+                stats['errors'] += 1
+            if repeated:
+                stats['n_plus_one'] += 1
+                for sql, count in repeated:
+                    self.n_plus_one.appendleft({'endpoint': endpoint, 'path': request.path,
+                                                'count': count, 'statement': sql[:300]})
+
+    # --- SQLAlchemy hooks ---
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        profile = g.get('_profile') if g else None
+        if profile is not None:
+            conn.info.setdefault('_profile_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        profile = g.get('_profile') if g else None
+        starts = conn.info.get('_profile_start')
+        if profile is None or not starts:
+            return
+        profile['db_time'] += time.perf_counter() - starts.pop()
+        profile['sql_count'] += 1
+        profile['statements'][_WHITESPACE_RE.sub(' ', statement).strip()] += 1
+
+    # --- Reporting ---
+
+    def report(self):
+        """Per-endpoint summaries, slowest p95 first."""
+        with self._lock:
+            items = [(endpoint, dict(stats, durations=sorted(stats['durations']))) for endpoint, stats in self.endpoints.items()]
+            n_plus_one = list(self.n_plus_one)
+
+        rows = []
+        for endpoint, stats in items:
+            durations = stats['durations']
+            requests = stats['requests']
+            rows.append({
+                'endpoint': endpoint,
+                'requests': requests,
+                'errors': stats['errors'],
+                'p50_ms': round(percentile(durations, 0.50) * 1000, 1),
+                'p95_ms': round(percentile(durations, 0.95) * 1000, 1),
+                'p99_ms': round(percentile(durations, 0.99) * 1000, 1),
+                'avg_sql': round(stats['sql_count'] / requests, 1),
+                'max_sql': stats['max_sql_count'],
+                'avg_db_ms': round(stats['db_time'] / requests * 1000, 1),
+                'n_plus_one': stats['n_plus_one'],
+            })
+        rows.sort(key=lambda row: row['p95_ms'], reverse=True)
+        return rows, n_plus_one
+
+    def prometheus(self):
+        """Metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            items = [(endpoint, dict(stats, durations=sorted(stats['durations']))) for endpoint, stats in self.endpoints.items()]
+
+        lines = [
+            '# HELP mentorconnect_request_duration_seconds Request wall time per endpoint (quantiles over the recent window).',
+            '# TYPE mentorconnect_request_duration_seconds summary',
+        ]
+        for endpoint, stats in sorted(items):
+            for quantile in (0.5, 0.95, 0.99):
+                lines.append(f'mentorconnect_request_duration_seconds{{endpoint="{endpoint}",quantile="{quantile}"}} '
+                             f'{percentile(stats["durations"], quantile):.6f}')
+            lines.append(f'mentorconnect_request_duration_seconds_sum{{endpoint="{endpoint}"}} {stats["duration_sum"]:.6f}')
+            lines.append(f'mentorconnect_request_duration_seconds_count{{endpoint="{endpoint}"}} {stats["requests"]}')
+
+        counters = [
+            ('mentorconnect_request_errors_total', 'Requests that raised or returned a 5xx status.', 'errors', '{}'),
+            ('mentorconnect_sql_statements_total', 'SQL statements executed while handling requests.', 'sql_count', '{}'),
+            ('mentorconnect_db_time_seconds_total', 'Time spent executing SQL while handling requests.', 'db_time', '{:.6f}'),
+            ('mentorconnect_n_plus_one_requests_total', 'Requests that repeated one SQL statement at least the N+1 threshold.', 'n_plus_one', '{}'),
+        ]
+        for name, help_text, key, value_format in counters:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for endpoint, stats in sorted(items):
+                lines.append(f'{name}{{endpoint="{endpoint}"}} ' + value_format.format(stats[key]))
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self.endpoints.clear()
+            self.n_plus_one.clear()
+
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,78 @@
+# mentor_connect_ngo_enhanced/app/read_models.py
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import aliased
+from app import db
+from app.models import User, Message, Resource, SessionLog, QuizAttempt
+
+# Read models for the list pages. Each function runs one column-projected SELECT and returns
+# SQLAlchemy Row objects: slotted, tuple-like rows with attribute access (row.username), that are
+# not tracked by the session's identity map and carry no lazy relationships. Related names are
+# joined in, and large Text columns are only selected where the page shows them.
+
+Mentor = aliased(User, name='mentor')
+
+# Resource cards show description | truncate(150). Jinja's truncate only looks at the first 150 characters
+# (plus a 5-character leeway), so loading 160 renders exactly the same text.
+RESOURCE_DESCRIPTION_CHARS = 160
+
+
+def _rows(statement):
+    return db.session.execute(statement).all()
+
+
+def user_list(search=None, role=None, mentor_assigned=None):
+    """manage_users rows: id, username, email, role, mentor_username. Filters match UserSearchFilterForm."""
+    statement = select(User.id, User.username, User.email, User.role, Mentor.username.label('mentor_username')) \
+        .outerjoin(Mentor, Mentor.id == User.mentor_id).order_by(User.username)
+    if search:
+        statement = statement.where(or_(User.username.ilike(f'%{search}%'), User.email.ilike(f'%{search}%')))
+    if role:
+        statement = statement.where(User.role == role)
+    if mentor_assigned == 'assigned':
+        statement = statement.where(User.role == 'student', User.mentor_id != None)
+    elif mentor_assigned == 'unassigned':
+        statement = statement.where(User.role == 'student', User.mentor_id == None)
+    return _rows(statement)
+
+
+def resource_cards(category=None):
+    """view_resources rows: id, title, category, description (shortened), link_url, date_added, creator_username."""
+    statement = select(
+        Resource.id, Resource.title, Resource.category,
+        func.substr(Resource.description, 1, RESOURCE_DESCRIPTION_CHARS).label('description'),
+        Resource.link_url, Resource.date_added, User.username.label('creator_username')
+    ).join(User, User.id == Resource.user_id).order_by(Resource.date_added.desc())
+    if category and category != 'All':
+        statement = statement.where(Resource.category == category)
+    return _rows(statement)
+
+
+def resource_categories():
+    return sorted(db.session.execute(select(Resource.category).distinct()
+                                     .where(Resource.category != None, Resource.category != '')).scalars())
+
+
+def quiz_attempt_list(quiz_id):
+    """quiz_results rows: id, student_username, attempt_date, score, total_questions."""
+    return _rows(select(
+        QuizAttempt.id, User.username.label('student_username'), QuizAttempt.attempt_date,
+        QuizAttempt.score, QuizAttempt.total_questions
+    ).join(User, User.id == QuizAttempt.student_id)
+     .where(QuizAttempt.quiz_id == quiz_id).order_by(QuizAttempt.attempt_date.desc()))
+
+
+def session_list(student_id):
+    """student_sessions rows: id, session_date, duration_minutes, topics_discussed, progress_notes, mentor_username."""
+    return _rows(select(
+        SessionLog.id, SessionLog.session_date, SessionLog.duration_minutes, SessionLog.topics_discussed,
+        SessionLog.progress_notes, User.username.label('mentor_username')
+    ).join(User, User.id == SessionLog.mentor_id)
+     .where(SessionLog.student_id == student_id).order_by(SessionLog.session_date.desc()))
+
+
+def conversation(user_id, other_user_id):
+    """Message API rows, oldest first: sender_id, receiver_id, content, timestamp."""
+    return _rows(select(Message.sender_id, Message.receiver_id, Message.content, Message.timestamp)
+                 .where(or_(and_(Message.sender_id == user_id, Message.receiver_id == other_user_id),
+                            and_(Message.sender_id == other_user_id, Message.receiver_id == user_id)))
+                 .order_by(Message.timestamp))
@@ -0,0 +1,304 @@
+# mentor_connect_ngo_enhanced/app/reports.py
+import csv
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+from werkzeug.utils import secure_filename
+from app import db
+from app.models import User, Quiz, Question, QuizAttempt, Resource, SessionLog, StudentResourceCompletion, activity_streak
+
+# Term-end progress reports for many students at once. collect_report_data() gathers every student's
+# quiz scores, completions, sessions and activity days with one query per table (not one profile page
+# per student); the HTML/CSV rendering is then split into chunks and run in a process pool.
+# Used by generate_reports.py and by the admin trigger (ProgressReportJobs).
+
+REPORT_FORMATS = ('html', 'csv')
+TEMPLATE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'reports')
+HEATMAP_DAYS = 365
+FETCH_BATCH = 5000 # Rows streamed per fetch from the per-table queries
+
+Mentor = aliased(User, name='mentor')
+
+
+class ReportRunning(Exception):
+    """Raised when a report run is started while another one is still going in this process."""
+
+
+# --- Data collection (parent process) ---
+
+def _stream(statement):
+    return db.session.execute(statement.execution_options(yield_per=FETCH_BATCH))
+
+
+def collect_report_data(mentor_id=None):
+    """
+    One dict per student (ordered by username) with everything a report shows, plus the totals shared
+    by all reports. Five queries whatever the number of students.
+    """
+    student_filter = [User.role == 'student']
+    if mentor_id is not None:
+        student_filter.append(User.mentor_id == mentor_id)
+    student_ids = select(User.id).where(*student_filter)
+
+    students = {}
+    for row in db.session.execute(select(User.id, User.username, User.email, User.last_login,
+                                         Mentor.username.label('mentor_username'))
+                                  .outerjoin(Mentor, Mentor.id == User.mentor_id)
+                                  .where(*student_filter).order_by(User.username)):
+        activity = Counter()
+        if row.last_login:
+            activity[row.last_login.date()] += 1
+        students[row.id] = {'id': row.id, 'username': row.username, 'email': row.email,
+                            'mentor_username': row.mentor_username, 'last_login': row.last_login,
+                            'quiz_attempts': [], 'resources_completed': 0, 'activity': activity,
+                            'sessions': 0, 'session_minutes': 0, 'last_session': None}
+
+    # Same activity events as the profile heatmap: the last login, each completion and each quiz attempt.
+    for row in _stream(select(QuizAttempt.student_id, Quiz.title, QuizAttempt.score, QuizAttempt.total_questions,
+                              QuizAttempt.attempt_date).join(Quiz, Quiz.id == QuizAttempt.quiz_id)
+                       .where(QuizAttempt.student_id.in_(student_ids))
+                       .order_by(QuizAttempt.student_id, QuizAttempt.attempt_date.desc())):
+        student = students[row.student_id]
+        student['quiz_attempts'].append((row.title, row.score or 0, row.total_questions or 0, row.attempt_date))
+        student['activity'][row.attempt_date.date()] += 1
+
+    for row in _stream(select(StudentResourceCompletion.student_id, StudentResourceCompletion.completed_at)
+                       .where(StudentResourceCompletion.student_id.in_(student_ids))):
+        student = students[row.student_id]
+        student['resources_completed'] += 1
+        student['activity'][row.completed_at.date()] += 1
+
+    for row in db.session.execute(select(SessionLog.student_id, func.count(SessionLog.id),
+                                         func.coalesce(func.sum(SessionLog.duration_minutes), 0),
+                                         func.max(SessionLog.session_date))
+                                  .where(SessionLog.student_id.in_(student_ids)).group_by(SessionLog.student_id)):
+        student = students[row[0]]
+        student['sessions'], student['session_minutes'], student['last_session'] = row[1], row[2], row[3]
+
+    totals = db.session.execute(select(select(func.count(Resource.id)).scalar_subquery(),
+                                       select(func.count(Question.id)).scalar_subquery())).one()
+    common = {'total_resources': totals[0], 'total_questions': totals[1],
+              'generated_at': datetime.utcnow(), 'today': date.today()}
+    return list(students.values()), common
+
+
+# --- Rendering (worker processes) ---
+
+_environment = None
+
+
+def _get_environment():
+    global _environment
+    if _environment is None: # Once per worker process
+        _environment = Environment(loader=FileSystemLoader(TEMPLATE_FOLDER), autoescape=select_autoescape(['html']))
+    return _environment
+
+
+def report_filename(student, extension):
+    return f"{secure_filename(student['username']) or student['id']}-{student['id']}.{extension}"
+
+
+def _summarize(student, common):
+    """Derived figures for one report: percentages, streak and the heatmap grid (a column per week)."""
+    today = common['today']
+    activity = student['activity']
+    score = sum(attempt[1] for attempt in student['quiz_attempts'])
+    possible = sum(attempt[2] for attempt in student['quiz_attempts'])
+    start = today - timedelta(days=HEATMAP_DAYS - 1)
+    cells = []
+    for offset in range(HEATMAP_DAYS):
+        day = start + timedelta(days=offset)
+        cells.append({'date': day, 'count': activity.get(day, 0), 'week': (offset + start.weekday()) // 7,
+                      'weekday': day.weekday()})
+    return {
+        'quiz_score': score, 'quiz_possible': possible,
+        'quiz_percentage': round(score / possible * 100, 1) if possible else None,
+        'resource_percentage': round(student['resources_completed'] / common['total_resources'] * 100, 1)
+                               if common['total_resources'] else None,
+        'streak': activity_streak(set(activity), today),
+        'active_days': sum(1 for cell in cells if cell['count']),
+        'heatmap': cells,
+    }
+
+
+def _write_csv(path, student, summary):
+    with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['student', student['username']])
+        writer.writerow(['mentor', student['mentor_username'] or ''])
+        writer.writerow(['resources_completed', student['resources_completed']])
+        writer.writerow(['quiz_points', f"{summary['quiz_score']}/{summary['quiz_possible']}"])
+        writer.writerow(['activity_streak_days', summary['streak']])
+        writer.writerow(['active_days_last_year', summary['active_days']])
+        writer.writerow(['sessions', student['sessions']])
+        writer.writerow(['session_minutes', student['session_minutes']])
+        writer.writerow([])
+        writer.writerow(['quiz', 'score', 'total_questions', 'attempt_date'])
+        for title, score, total, attempt_date in student['quiz_attempts']:
+            writer.writerow([title, score, total, attempt_date.isoformat()])
+
+
+def render_reports(output_dir, formats, common, students):
+    """Writes the reports for a chunk of students; returns one summary row per student for the index."""
+    template = _get_environment().get_template('progress_report.html') if 'html' in formats else None
+    rows = []
+    for student in students:
+        summary = _summarize(student, common)
+        files = {}
+        if template is not None:
+            files['html'] = report_filename(student, 'html')
+            with open(os.path.join(output_dir, files['html']), 'w', encoding='utf-8') as html_file:
+                html_file.write(template.render(student=student, summary=summary, **common))
+        if 'csv' in formats:
+            files['csv'] = report_filename(student, 'csv')
+            _write_csv(os.path.join(output_dir, files['csv']), student, summary)
+        rows.append({'username': student['username'], 'mentor_username': student['mentor_username'],
+                     'resources_completed': student['resources_completed'], 'quiz_percentage': summary['quiz_percentage'],
+                     'quizzes_taken': len(student['quiz_attempts']), 'streak': summary['streak'],
+                     'active_days': summary['active_days'], 'sessions': student['sessions'], 'files': files})
+    return rows
+
+
+def _write_index(output_dir, rows, common, formats):
+    rows = sorted(rows, key=lambda row: row['username'])
+    if 'html' in formats:
+        with open(os.path.join(output_dir, 'index.html'), 'w', encoding='utf-8') as index_file:
+            index_file.write(_get_environment().get_template('index.html').render(rows=rows, **common))
+    with open(os.path.join(output_dir, 'summary.csv'), 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file)
+        columns = ['username', 'mentor_username', 'resources_completed', 'quizzes_taken', 'quiz_percentage',
+                   'streak', 'active_days', 'sessions']
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow([row[column] if row[column] is not None else '' for column in columns])
+
+
+# --- Orchestration ---
+
+def generate_reports(output, formats=('html',), mentor_id=None, workers=None, chunk_size=200, progress=None):
+    """
+    Writes one report per student into the directory `output`, or into a zip file when `output` ends in
+    .zip, plus index.html and summary.csv. Rendering runs in `workers` processes (os.cpu_count() when None,
+    inline when 0). `progress(done, total)` is called as chunks finish. Returns a dict of counts and timings.
+    """
+    started = time.perf_counter()
+    students, common = collect_report_data(mentor_id)
+    collected = time.perf_counter()
+
+    zip_output = output.endswith('.zip')
+    output_dir = tempfile.mkdtemp(prefix='progress-reports-') if zip_output else output
+    os.makedirs(output_dir, exist_ok=True)
+    chunks = [students[i:i + chunk_size] for i in range(0, len(students), chunk_size)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    rows = []
+    try:
+        if workers and len(chunks) > 1:
+            # spawn, not fork: the parent may be a threaded web worker holding database connections.
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                                     mp_context=multiprocessing.get_context('spawn')) as executor:
+                futures = [executor.submit(render_reports, output_dir, formats, common, chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    rows.extend(future.result())
+                    if progress:
+                        progress(len(rows), len(students))
+        else:
+            for chunk in chunks:
+                rows.extend(render_reports(output_dir, formats, common, chunk))
+                if progress:
+                    progress(len(rows), len(students))
+        _write_index(output_dir, rows, common, formats)
+        rendered = time.perf_counter()
+
+        if zip_output:
+            os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+            with zipfile.ZipFile(output + '.part', 'w', zipfile.ZIP_DEFLATED) as archive:
+                for name in sorted(os.listdir(output_dir)):
+                    archive.write(os.path.join(output_dir, name), name)
+            os.replace(output + '.part', output) # Only complete archives ever appear under the final name
+    finally:
+        if zip_output:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+    finished = time.perf_counter()
+    return {'reports': len(students), 'output': output, 'collect_seconds': round(collected - started, 2),
+            'render_seconds': round(rendered - collected, 2), 'total_seconds': round(finished - started, 2)}
+
+
+class ProgressReportJobs:
+    """
+    Runs generate_reports() for the admin trigger on a background thread of the web process, writing
+    progress-reports-<timestamp>.zip into PROGRESS_REPORT_DIR. One run at a time per process.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.current = None # State of the running (or last) run
+        self.stats = {'started': 0, 'completed': 0, 'failed': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.directory = app.config.get('PROGRESS_REPORT_DIR') or os.path.join(app.instance_path, 'reports')
+        self.workers = app.config.get('PROGRESS_REPORT_WORKERS')
+        self.chunk_size = app.config.get('PROGRESS_REPORT_CHUNK_SIZE', 200)
+        app.extensions['progress_reports'] = self
+
+    def start(self, app, formats=('html',), mentor_id=None):
+        """Starts a run and returns the zip file name it will write. Raises ReportRunning if one is in progress."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                raise ReportRunning('Progress reports are already being generated.')
+            name = f"progress-reports-{datetime.utcnow():%Y%m%d-%H%M%S}.zip"
+            self.current = {'state': 'running', 'file': name, 'done': 0, 'total': None, 'error': None,
+                            'started_at': datetime.utcnow().isoformat(timespec='seconds'), 'result': None}
+            self.stats['started'] += 1
+            self._thread = threading.Thread(target=self._run, args=(app, name, formats, mentor_id),
+                                            name='progress-reports', daemon=True)
+            self._thread.start()
+        return name
+
+    def _progress(self, done, total):
+        with self._lock:
+            self.current['done'], self.current['total'] = done, total
+
+    def _run(self, app, name, formats, mentor_id):
+        with app.app_context():
+            try:
+                result = generate_reports(os.path.join(self.directory, name), formats, mentor_id,
+                                          self.workers, self.chunk_size, self._progress)
+                with self._lock:
+                    self.current.update(state='done', result=result)
+                    self.stats['completed'] += 1
+            except Exception as e:
+                print(f"Progress report generation failed: {e}")
+                with self._lock:
+                    self.current.update(state='error', error=str(e))
+                    self.stats['failed'] += 1
+            finally:
+                db.session.remove()
+
+    def files(self):
+        """Finished report archives, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted((name for name in os.listdir(self.directory) if name.endswith('.zip')), reverse=True)
+
+    def snapshot(self):
+        with self._lock:
+            return {'current': dict(self.current) if self.current else None, 'stats': dict(self.stats),
+                    'files': self.files()}
+
+
+progress_report_jobs = ProgressReportJobs()
@@ -0,0 +1,173 @@
+# mentor_connect_ngo_enhanced/app/retrieval.py
+import math
+import re
+import time
+from collections import Counter
+from threading import Lock
+from app import db
+from app.models import Resource, FAQ
+
+# Small stopword list so that "how do I take a quiz" matches on "take" and "quiz" only.
+STOPWORDS = frozenset("""
+a an and are as at be by can could do does for from get got have how i if in into is it its me my of on or
+our please should so that the their them there this to was we what when where which who why will with would
+you your
+""".split())
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Lowercased word tokens without stopwords and with a naive plural strip."""
+    tokens = []
+    for token in _TOKEN_RE.findall((text or '').lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class KnowledgeIndex:
+    """
+    In-memory BM25 index over Resource titles/descriptions and admin-maintained FAQs.
+    The chatbot uses it to answer close FAQ matches locally and to add the most relevant
+    snippets to prompts it still sends upstream. The index is rebuilt lazily after writes
+    (mark_stale) and at most every CHATBOT_INDEX_TTL seconds to pick up other workers' writes.
+    """
+
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, app=None):
+        self._lock = Lock()
+        self._stale = True
+        self._built_at = 0.0
+        self.docs = []
+        self._postings = {}
+        self._idf = {}
+        self._doc_lengths = []
+        self._avg_length = 0.0
+        self.stats = {'lookups': 0, 'local_answers': 0, 'context_injected': 0, 'rebuilds': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('CHATBOT_INDEX_TTL', 300)
+        self.faq_threshold = app.config.get('CHATBOT_FAQ_THRESHOLD', 0.8)
+        self.context_docs = app.config.get('CHATBOT_CONTEXT_DOCS', 3)
+        app.extensions['knowledge_index'] = self
+
+    def mark_stale(self):
+        with self._lock:
+            self._stale = True
+
+    def _load_documents(self):
+        docs = []
+        resources = db.session.query(Resource.id, Resource.title, Resource.description, Resource.link_url).all()
+        for resource in resources:
+            docs.append({
+                'kind': 'resource', 'id': resource.id, 'title': resource.title,
+                'text': resource.description or '', 'link_url': resource.link_url,
+                'tokens': tokenize(f"{resource.title} {resource.title} {resource.description or ''}"),
+            })
+        for faq in db.session.query(FAQ.id, FAQ.question, FAQ.answer).all():
+            docs.append({
+                'kind': 'faq', 'id': faq.id, 'title': faq.question, 'text': faq.answer, 'link_url': None,
+                'tokens': tokenize(f"{faq.question} {faq.question} {faq.answer}"),
+                'question_tokens': set(tokenize(faq.question)),
+            })
+        return docs
+
+    def rebuild(self):
+        docs = self._load_documents()
+        postings = {}
+        doc_lengths = []
+        for index, doc in enumerate(docs):
+            doc_lengths.append(len(doc['tokens']))
+            for term, frequency in Counter(doc['tokens']).items():
+                postings.setdefault(term, []).append((index, frequency))
+
+        count = len(docs)
+        idf = {term: math.log(1 + (count - len(entries) + 0.5) / (len(entries) + 0.5)) for term, entries in postings.items()}
+        with self._lock:
+            self.docs = docs
+            self._postings = postings
+            self._idf = idf
+            self._doc_lengths = doc_lengths
+            self._avg_length = (sum(doc_lengths) / count) if count else 0.0
+            self._stale = False
+            self._built_at = time.monotonic()
+            self.stats['rebuilds'] += 1
+
+    def _ensure_fresh(self):
+        with self._lock:
+            needs_rebuild = self._stale or time.monotonic() - self._built_at > self.ttl
+        if needs_rebuild:
+            self.rebuild()
+
+    def search(self, query, k=3):
+        """Returns up to k (score, doc) pairs ranked by BM25, best first."""
+        self._ensure_fresh()
+        terms = set(tokenize(query))
+        with self._lock:
+            scores = Counter()
+            for term in terms:
+                idf = self._idf.get(term)
+                if idf is None:
+                    continue
+                for index, frequency in self._postings[term]:
+                    norm = self.K1 * (1 - self.B + self.B * self._doc_lengths[index] / self._avg_length)
+                    scores[index] += idf * frequency * (self.K1 + 1) / (frequency + norm)
+            return [(score, self.docs[index]) for index, score in scores.most_common(k)]
+
+    def _coverage(self, query_terms, doc):
+        # Share of the query's IDF weight found in the FAQ question: 1.0 means every query term matched.
+        # Terms missing from the index weigh as much as the rarest possible term; ignoring them would let
+        # "careers in data science" fully match an FAQ about exporting data.
+        unseen = math.log(1 + (len(self.docs) + 0.5) / 0.5)
+        total = sum(self._idf.get(term, unseen) for term in query_terms)
+        if not total:
+            return 0.0
+        return sum(self._idf.get(term, unseen) for term in query_terms if term in doc['question_tokens']) / total
+
+    def faq_answer(self, query):
+        """Returns the answer of an FAQ that matches the query with high confidence, else None."""
+        self._count('lookups')
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return None
+        for score, doc in self.search(query, k=3):
+            if doc['kind'] == 'faq' and self._coverage(query_terms, doc) >= self.faq_threshold:
+                self._count('local_answers')
+                return doc['text']
+        return None
+
+    def context_snippets(self, query):
+        """Formats the top matching resources and FAQs as prompt context, or returns None when nothing matches."""
+        results = self.search(query, k=self.context_docs)
+        if not results:
+            return None
+        lines = []
+        for score, doc in results:
+            if doc['kind'] == 'faq':
+                lines.append(f"- FAQ: {doc['title']} Answer: {doc['text'][:300]}")
+            else:
+                link = f" ({doc['link_url']})" if doc['link_url'] else ''
+                lines.append(f"- Resource: {doc['title']}{link}: {doc['text'][:300]}")
+        self._count('context_injected')
+        return "Relevant MentorConnect content (use it if it helps answer the question):\n" + "\n".join(lines)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['documents'] = len(self.docs)
+        return stats
+
+
+knowledge_index = KnowledgeIndex()
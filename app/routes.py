@@ -1,19 +1,37 @@
 # mentor_connect_ngo_enhanced/app/routes.py
-from flask import Blueprint, render_template, url_for, flash, redirect, request, abort, jsonify, current_app # Import current_app
+from flask import Blueprint, render_template, url_for, flash, redirect, request, abort, jsonify, current_app, \
+                  Response, stream_with_context, make_response, send_from_directory # Import current_app
 from flask_login import login_user, current_user, logout_user, login_required
-from app import db, mail # Import db and mail
+from app import db, get_mail # Import db and the lazily created mail extension
 from app.models import User, Message, SessionLog, Resource, Announcement, \
-                       Quiz, Question, Option, QuizAttempt, QuizAnswer, StudentResourceCompletion
+                       Quiz, Question, Option, QuizAttempt, QuizAnswer, StudentResourceCompletion, FAQ
+from app.analytics import (
+    get_cohort_summary, invalidate_cohort_summary, fold_session, forget_user_sessions,
+    mentor_weekly_hours, student_session_frequency, students_not_seen
+)
+from app import chatbot
+from app.retrieval import knowledge_index
+from app.activity import activity_tracker
+from app.identity import identity_cache
+from app.profiling import request_profiler
+from app.index_advisor import index_advisor
+from app.passwords import PasswordHasherBusy
+from app.conditional import ConditionalResponse, bump_version, version_of
+from app.fragments import fragment_cache
+from app import read_models
+from app import archive
+from app.reports import progress_report_jobs, ReportRunning
+from app.exports import EXPORT_DATASETS, EXPORT_FORMATS, generate_export, export_filename
 from app.forms import (
     RegistrationForm, LoginForm, UserManagementForm, SetPasswordForm,
     MessageForm, AnnouncementForm, SessionLogForm, ResourceForm,
-    UserSearchFilterForm, QuizForm, QuizAttemptForm # New forms
+    UserSearchFilterForm, QuizForm, QuizAttemptForm, FAQForm # New forms
 )
 import functools
-from sqlalchemy import or_, and_, func
-from flask_mail import Message as MailMessage # Rename to avoid conflict with models.Message
+from wtforms import RadioField
+from wtforms.validators import DataRequired
+from sqlalchemy import or_, and_, func, select
 from threading import Thread
-import requests # For Gemini API calls
 import json # For handling JSON responses from Gemini API
 from datetime import datetime, date, timedelta # For heatmap and streaks
 import os # Import os to access environment variables
@@ -30,7 +48,7 @@ main = Blueprint('main', __name__)
 def send_async_email(app, msg):
     with app.app_context():
         try:
-            mail.send(msg)
+            get_mail(app).send(msg)
             print(f"Email sent successfully to {msg.recipients}")
         except Exception as e:
             print(f"Error sending email: {e}")
@@ -38,6 +56,7 @@ def send_async_email(app, msg):
 def send_email(subject, recipients, text_body, html_body=None):
     # Get current Flask app instance for context
     app = current_app._get_current_object() # Use current_app to get the current app object safely
+    from flask_mail import Message as MailMessage # Imported on first use; renamed to avoid conflict with models.Message
     msg = MailMessage(subject, recipients=recipients)
     msg.body = text_body
     if html_body:
@@ -74,10 +93,8 @@ def role_required(role):
 @main.route("/home")
 def home():
     if current_user.is_authenticated:
-        # Update last_login and last_activity
-        current_user.last_login = datetime.utcnow()
-        current_user.last_activity = datetime.utcnow()
-        db.session.commit() # Commit this change
+        # Record last_login and last_activity (written in batches by the activity tracker)
+        activity_tracker.touch(current_user.id, login=True)
 
         if current_user.is_admin():
             return redirect(url_for('main.admin_dashboard'))
@@ -99,7 +116,11 @@ def register():
     form = RegistrationForm()
     if form.validate_on_submit():
         user = User(username=form.username.data, email=form.email.data, role='student')
-        user.set_password(form.password.data)
+        try:
+            user.set_password(form.password.data)
+        except PasswordHasherBusy as e:
+            flash(str(e), 'warning')
+            return render_template('register.html', title='Register', form=form)
         db.session.add(user)
         db.session.commit()
         flash('Your account has been created! You are now able to log in.', 'success')
@@ -114,9 +135,17 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
-        if user and user.check_password(form.password.data):
+        try:
+            authenticated = user is not None and user.check_password(form.password.data)
+            # Hashes made at an older, cheaper work factor are upgraded while the plain password is at hand.
+            if authenticated and user.upgrade_password_hash(form.password.data):
+                identity_cache.invalidate(user.id)
+        except PasswordHasherBusy as e:
+            flash(str(e), 'warning')
+            return render_template('login.html', title='Login', form=form)
+        if authenticated:
             login_user(user, remember=form.remember.data)
-            # Update last_login on successful login
+            # Update last_login on successful login (also saves an upgraded password hash)
             user.last_login = datetime.utcnow()
             user.last_activity = datetime.utcnow()
             db.session.commit()
@@ -143,22 +172,15 @@ def user_profile(username):
     
     # Update last_activity if current user is viewing their own profile
     if current_user.is_authenticated and current_user.id == user.id:
-        user.last_activity = datetime.utcnow()
-        db.session.commit()
-
-    # LeetCode-like profile enhancements for student users
-    quiz_scores = []
-    total_possible_score = 0
-    modules_completed_count = user.resource_completions.count() # Count completed resources
-    
-    # Get total number of resources for calculation
-    total_resources = Resource.query.count()
+        activity_tracker.touch(user.id)
 
-    if user.is_student():
-        # Calculate total possible score from all quizzes
-        all_quizzes = Quiz.query.all()
-        for quiz in all_quizzes:
-            total_possible_score += quiz.questions.count() # Each question assumed to be 1 point
+    # LeetCode-like profile enhancements for student users. Computed only when the template's
+    # {% cache %} block misses; the block is keyed on the 'user:<id>', 'quizzes' and 'resources' versions.
+    @functools.cache
+    def progress():
+        quiz_scores = []
+        # Every question is worth one point, so the total possible score is the number of questions
+        total_possible_score = Question.query.count()
 
         # Get scores for quizzes attempted by this student
         quiz_attempts = user.quiz_attempts.order_by(QuizAttempt.attempt_date.desc()).all()
@@ -169,17 +191,35 @@ def user_profile(username):
                 'total': attempt.total_questions,
                 'percentage': (attempt.score / attempt.total_questions * 100) if attempt.total_questions else 0
             })
-    
-    # Prepare data for heatmap
+        return {
+            'quiz_scores': quiz_scores,
+            'total_possible_score': total_possible_score,
+            'modules_completed_count': user.resource_completions.count(), # Count completed resources
+            'total_resources': Resource.query.count(),
+        }
+
+    login_streak = user.calculate_streak()
+
+    # The heatmap is fetched by the page from user_activity_heatmap(), which answers 304 while nothing changed.
+    return render_template('user_profile.html', user=user, title=f"{user.username}'s Profile",
+                           progress=progress,
+                           login_streak=login_streak)
+
+def _per_student(function, model, student_id):
+    """Scalar subquery applying an aggregate such as func.count to the ids of a student's rows in `model`."""
+    return select(function(model.id)).where(model.student_id == student_id).scalar_subquery()
+
+def _activity_heatmap(user_id):
+    """Daily activity counts (logins, resource completions, quiz attempts) over the last year."""
     heatmap_data = {}
     today = date.today()
     for i in range(365):
         d = today - timedelta(days=i)
         heatmap_data[d.isoformat()] = 0
 
-    login_dates_query = db.session.query(User.last_login).filter(User.id == user.id, User.last_login != None).all()
-    resource_completion_dates_query = db.session.query(StudentResourceCompletion.completed_at).filter(StudentResourceCompletion.student_id == user.id).all()
-    quiz_attempt_dates_query = db.session.query(QuizAttempt.attempt_date).filter(QuizAttempt.student_id == user.id).all()
+    login_dates_query = db.session.query(User.last_login).filter(User.id == user_id, User.last_login != None).all()
+    resource_completion_dates_query = db.session.query(StudentResourceCompletion.completed_at).filter(StudentResourceCompletion.student_id == user_id).all()
+    quiz_attempt_dates_query = db.session.query(QuizAttempt.attempt_date).filter(QuizAttempt.student_id == user_id).all()
 
     for row in login_dates_query:
         if row.last_login:
@@ -201,16 +241,25 @@ def user_profile(username):
         d_obj = date.fromisoformat(d_str)
         if d_obj >= (today - timedelta(days=364)) and d_obj <= today:
              processed_heatmap_data.append({'date': d_str, 'value': count})
-    
-    login_streak = user.calculate_streak()
+    return processed_heatmap_data
 
-    return render_template('user_profile.html', user=user, title=f"{user.username}'s Profile",
-                           quiz_scores=quiz_scores,
-                           total_possible_score=total_possible_score,
-                           modules_completed_count=modules_completed_count,
-                           total_resources=total_resources,
-                           heatmap_data=json.dumps(processed_heatmap_data),
-                           login_streak=login_streak)
+@main.route("/api/profile/<string:username>/heatmap")
+@login_required
+def user_activity_heatmap(username):
+    # Validators in one query: the last login plus count and highest id of the completions and attempts
+    # (both are append-mostly, so a new or deleted row changes at least one of them).
+    row = db.session.execute(select(
+        User.id, User.last_login,
+        _per_student(func.count, StudentResourceCompletion, User.id), _per_student(func.max, StudentResourceCompletion, User.id),
+        _per_student(func.count, QuizAttempt, User.id), _per_student(func.max, QuizAttempt, User.id),
+    ).where(User.username == username)).first()
+    if row is None:
+        abort(404)
+
+    conditional = ConditionalResponse('heatmap', date.today(), *row) # The one-year window moves daily
+    if conditional.fresh:
+        return conditional.not_modified()
+    return conditional.apply(jsonify(_activity_heatmap(row.id)))
 
 
 # --- Admin Routes ---
@@ -218,53 +267,114 @@ def user_profile(username):
 @main.route("/admin/dashboard")
 @role_required('admin')
 def admin_dashboard():
-    total_users = User.query.count()
-    total_mentors = User.query.filter_by(role='mentor').count()
-    total_students = User.query.filter_by(role='student').count()
-    assigned_students = User.query.filter(User.role == 'student').filter(User.mentor_id != None).count()
-    total_sessions = SessionLog.query.count()
-    total_resources = Resource.query.count()
-    total_quizzes = Quiz.query.count()
-    
+    # Platform-wide counts, computed only when the template's {% cache %} blocks miss (they expire after a minute).
+    @functools.cache
+    def stats():
+        return {
+            'total_users': User.query.count(),
+            'total_mentors': User.query.filter_by(role='mentor').count(),
+            'total_students': User.query.filter_by(role='student').count(),
+            'assigned_students': User.query.filter(User.role == 'student').filter(User.mentor_id != None).count(),
+            'total_sessions': SessionLog.query.count(),
+            'total_resources': Resource.query.count(),
+            'total_quizzes': Quiz.query.count(),
+        }
+
     announcements = Announcement.query.order_by(Announcement.date_posted.desc()).limit(5).all()
 
     return render_template('admin_dashboard.html', title='Admin Dashboard',
-                           total_users=total_users,
-                           total_mentors=total_mentors,
-                           total_students=total_students,
-                           assigned_students=assigned_students,
-                           total_sessions=total_sessions,
-                           total_resources=total_resources,
-                           total_quizzes=total_quizzes,
-                           announcements=announcements)
+                           stats=stats,
+                           announcements=announcements,
+                           progress_report_files=progress_report_jobs.files())
+
+@main.route("/admin/analytics/sessions")
+@role_required('admin')
+def session_analytics():
+    weeks = min(max(request.args.get('weeks', 8, type=int), 1), 52)
+    gap_days = min(max(request.args.get('gap_days', 14, type=int), 1), 365)
+
+    week_starts, mentor_hours = mentor_weekly_hours(weeks)
+    student_frequency = student_session_frequency(weeks)
+    unseen_students = students_not_seen(gap_days)
+
+    return render_template('session_analytics.html', title='Session Analytics',
+                           weeks=weeks, gap_days=gap_days, week_starts=week_starts,
+                           mentor_hours=mentor_hours, student_frequency=student_frequency,
+                           unseen_students=unseen_students)
+
+@main.route("/admin/metrics")
+@role_required('admin')
+def request_metrics():
+    endpoint_stats, n_plus_one = request_profiler.report()
+    return render_template('request_metrics.html', title='Request Metrics', enabled=request_profiler.enabled,
+                           endpoint_stats=endpoint_stats, n_plus_one=n_plus_one)
+
+@main.route("/admin/metrics/prometheus")
+def request_metrics_prometheus():
+    # Scrapers authenticate with "Authorization: Bearer <METRICS_TOKEN>"; admins can also view it in the browser.
+    token = current_app.config.get('METRICS_TOKEN')
+    authorized = bool(token) and request.headers.get('Authorization') == f"Bearer {token}"
+    if not authorized and not (current_user.is_authenticated and current_user.is_admin()):
+        abort(403)
+    return Response(request_profiler.prometheus(), mimetype='text/plain; version=0.0.4')
+
+@main.route("/admin/metrics/reset", methods=['POST'])
+@role_required('admin')
+def reset_request_metrics():
+    request_profiler.reset()
+    flash('Request metrics have been reset.', 'info')
+    return redirect(url_for('main.request_metrics'))
+
+@main.route("/admin/export/<string:dataset>")
+@role_required('admin')
+def export_dataset(dataset):
+    if dataset not in EXPORT_DATASETS:
+        abort(404)
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        abort(400)
+    compress = request.args.get('gzip', '0').lower() in ('1', 'true', 'yes')
+
+    # The body is generated lazily while the response is sent, so the table is never held in memory.
+    mimetype = 'application/gzip' if compress else ('text/csv' if fmt == 'csv' else 'application/x-ndjson')
+    response = Response(stream_with_context(generate_export(dataset, fmt, compress)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{export_filename(dataset, fmt, compress)}"'
+    return response
+
+@main.route("/admin/reports/progress", methods=['GET', 'POST'])
+@role_required('admin')
+def progress_reports():
+    # POST starts a background run writing a zip of every student's report (see app/reports.py);
+    # GET returns the run's progress and the finished archives as JSON.
+    if request.method == 'POST':
+        formats = ('html', 'csv') if request.form.get('csv') else ('html',)
+        try:
+            filename = progress_report_jobs.start(current_app._get_current_object(), formats)
+            flash(f'Generating progress reports into {filename}. It will be listed under Data Exports when done.', 'info')
+        except ReportRunning as e:
+            flash(str(e), 'warning')
+        return redirect(url_for('main.admin_dashboard'))
+    return jsonify(progress_report_jobs.snapshot())
+
+@main.route("/admin/reports/progress/<string:filename>")
+@role_required('admin')
+def download_progress_reports(filename):
+    if filename not in progress_report_jobs.files():
+        abort(404)
+    return send_from_directory(progress_report_jobs.directory, filename, as_attachment=True)
 
 @main.route("/admin/users", methods=['GET', 'POST'])
 @role_required('admin')
 def manage_users():
     form = UserSearchFilterForm()
-    users_query = User.query.order_by(User.username)
 
+    # Projected rows (see app/read_models.py) rather than User objects; the template only shows a few columns.
     if form.validate_on_submit():
-        search_query = form.search_query.data
-        filter_role = form.filter_role.data
-        filter_mentor_assigned = form.filter_mentor_assigned.data
-
-        if search_query:
-            users_query = users_query.filter(or_(
-                User.username.ilike(f'%{search_query}%'),
-                User.email.ilike(f'%{search_query}%')
-            ))
-        if filter_role:
-            users_query = users_query.filter_by(role=filter_role)
-        if filter_mentor_assigned == 'assigned':
-            users_query = users_query.filter(User.role == 'student').filter(User.mentor_id != None)
-        elif filter_mentor_assigned == 'unassigned':
-            users_query = users_query.filter(User.role == 'student').filter(User.mentor_id == None)
-        
-        users = users_query.all()
+        users = read_models.user_list(search=form.search_query.data, role=form.filter_role.data,
+                                      mentor_assigned=form.filter_mentor_assigned.data)
         flash('Filters applied.', 'info')
     else:
-        users = users_query.all()
+        users = read_models.user_list()
 
     return render_template('manage_users.html', title='Manage Users', users=users, form=form)
 
@@ -286,7 +396,11 @@ def create_user():
             expertise_areas=form.expertise_areas.data,
             contact_preference=form.contact_preference.data
         )
-        user.set_password(temp_password)
+        try:
+            user.set_password(temp_password)
+        except PasswordHasherBusy as e:
+            flash(str(e), 'warning')
+            return render_template('create_edit_user.html', title='Create New User', form=form, legend='Create New User')
 
         if form.role.data == 'student' and form.mentor_id.data is not None:
             user.mentor_id = form.mentor_id.data
@@ -311,6 +425,8 @@ def edit_user(user_id):
     form.mentor_id.choices.insert(0, ('', 'No Mentor Assigned'))
 
     if form.validate_on_submit():
+        if user.username != form.username.data:
+            bump_version('resources') # Resource cards show their creator's username
         user.username = form.username.data
         user.email = form.email.data
         user.role = form.role.data
@@ -318,12 +434,16 @@ def edit_user(user_id):
         user.expertise_areas = form.expertise_areas.data
         user.contact_preference = form.contact_preference.data
 
+        previous_mentor_id = user.mentor_id
         if form.role.data == 'student' and form.mentor_id.data is not None:
             user.mentor_id = form.mentor_id.data
         else:
             user.mentor_id = None
 
         db.session.commit()
+        identity_cache.invalidate(user.id)
+        invalidate_cohort_summary(previous_mentor_id)
+        invalidate_cohort_summary(user.mentor_id)
         flash(f'User "{user.username}" updated!', 'success')
         return redirect(url_for('main.manage_users'))
     elif request.method == 'GET':
@@ -358,8 +478,13 @@ def set_user_password(user_id):
     user = User.query.get_or_404(user_id)
     form = SetPasswordForm()
     if form.validate_on_submit():
-        user.set_password(form.password.data)
+        try:
+            user.set_password(form.password.data)
+        except PasswordHasherBusy as e:
+            flash(str(e), 'warning')
+            return render_template('set_password.html', title='Set Password', form=form, user=user)
         db.session.commit()
+        identity_cache.invalidate(user.id)
         flash(f'Password for "{user.username}" has been updated.', 'success')
         return redirect(url_for('main.manage_users'))
     return render_template('set_password.html', title='Set Password', form=form, user=user)
@@ -378,9 +503,16 @@ def delete_user(user_id):
             student.mentor_id = None
             db.session.add(student)
         db.session.commit()
+        identity_cache.invalidate(*[student.id for student in students_to_unassign])
+        invalidate_cohort_summary(user.id)
 
+    mentor_id = user.mentor_id
+    forget_user_sessions(user.id) # Sessions need both users; their rollup rows go in the same transaction
     db.session.delete(user)
+    bump_version('resources') # Resource cards show their creator's username
     db.session.commit()
+    identity_cache.invalidate(user_id)
+    invalidate_cohort_summary(mentor_id)
     flash(f'User "{user.username}" has been deleted.', 'success')
     return redirect(url_for('main.manage_users'))
 
@@ -421,6 +553,56 @@ def delete_announcement(announcement_id):
     flash('Announcement deleted.', 'success')
     return redirect(url_for('main.manage_announcements'))
 
+# Chatbot FAQ Management (Admin)
+@main.route("/admin/faqs")
+@role_required('admin')
+def manage_faqs():
+    faqs = FAQ.query.order_by(FAQ.date_added.desc()).all()
+    return render_template('manage_faqs.html', title='Chatbot FAQs', faqs=faqs)
+
+@main.route("/admin/faqs/new", methods=['GET', 'POST'])
+@role_required('admin')
+def create_faq():
+    form = FAQForm()
+    if form.validate_on_submit():
+        faq = FAQ(question=form.question.data, answer=form.answer.data, author=current_user)
+        db.session.add(faq)
+        bump_version('faqs') # Cached chatbot answers were generated without it
+        db.session.commit()
+        knowledge_index.mark_stale()
+        flash('FAQ added! The chatbot will now answer matching questions directly.', 'success')
+        return redirect(url_for('main.manage_faqs'))
+    return render_template('create_edit_faq.html', title='New FAQ', form=form, legend='New FAQ')
+
+@main.route("/admin/faq/<int:faq_id>/edit", methods=['GET', 'POST'])
+@role_required('admin')
+def edit_faq(faq_id):
+    faq = FAQ.query.get_or_404(faq_id)
+    form = FAQForm()
+    if form.validate_on_submit():
+        faq.question = form.question.data
+        faq.answer = form.answer.data
+        bump_version('faqs')
+        db.session.commit()
+        knowledge_index.mark_stale()
+        flash('FAQ updated!', 'success')
+        return redirect(url_for('main.manage_faqs'))
+    elif request.method == 'GET':
+        form.question.data = faq.question
+        form.answer.data = faq.answer
+    return render_template('create_edit_faq.html', title='Edit FAQ', form=form, legend='Edit FAQ')
+
+@main.route("/admin/faq/<int:faq_id>/delete", methods=['POST'])
+@role_required('admin')
+def delete_faq(faq_id):
+    faq = FAQ.query.get_or_404(faq_id)
+    db.session.delete(faq)
+    bump_version('faqs')
+    db.session.commit()
+    knowledge_index.mark_stale()
+    flash('FAQ deleted.', 'success')
+    return redirect(url_for('main.manage_faqs'))
+
 # Resource Management (Admin/Mentor)
 @main.route("/resources/new", methods=['GET', 'POST'])
 @role_required('mentor')
@@ -435,7 +617,9 @@ def create_resource():
             creator=current_user
         )
         db.session.add(resource)
+        bump_version('resources')
         db.session.commit()
+        knowledge_index.mark_stale()
         flash('Resource added successfully!', 'success')
         return redirect(url_for('main.view_resources'))
     return render_template('create_edit_resource.html', title='Add New Resource', form=form, legend='Add New Resource')
@@ -444,20 +628,32 @@ def create_resource():
 @login_required
 def view_resources():
     category_filter = request.args.get('category')
-    resources_query = Resource.query.order_by(Resource.date_added.desc())
-
-    if category_filter and category_filter != 'All':
-        resources_query = resources_query.filter_by(category=category_filter)
-
-    resources = resources_query.all()
-    categories = sorted(list(set([r.category for r in Resource.query.all() if r.category])))
-    
-    completed_resource_ids = []
-    if current_user.is_authenticated:
-        completed_resource_ids = [comp.resource_id for comp in current_user.resource_completions.all()]
-
-    return render_template('resources.html', title='Learning Resources', resources=resources, categories=categories, selected_category=category_filter,
-                           completed_resource_ids=completed_resource_ids)
+    # Validators in one query: the 'resources' version (bumped by resource and user edits), the resource
+    # count and highest id (which also catch bulk-loaded rows), and the same for the user's completions.
+    validators = db.session.execute(select(
+        version_of('resources'),
+        select(func.count(Resource.id)).scalar_subquery(), select(func.max(Resource.id)).scalar_subquery(),
+        _per_student(func.count, StudentResourceCompletion, current_user.id),
+        _per_student(func.max, StudentResourceCompletion, current_user.id),
+    )).one()
+    conditional = ConditionalResponse('resources', category_filter, *validators)
+    if conditional.fresh:
+        return conditional.not_modified()
+
+    # Loaded only when the template's {% cache %} block misses.
+    @functools.cache
+    def listing():
+        completed_resource_ids = set()
+        if current_user.is_authenticated:
+            completed_resource_ids = set(db.session.execute(
+                select(StudentResourceCompletion.resource_id).where(StudentResourceCompletion.student_id == current_user.id)
+            ).scalars())
+        return {'resources': read_models.resource_cards(category_filter), 'categories': read_models.resource_categories(),
+                'completed_resource_ids': completed_resource_ids}
+
+    return conditional.apply(make_response(render_template(
+        'resources.html', title='Learning Resources', listing=listing, selected_category=category_filter,
+        resource_versions=validators)))
 
 @main.route("/resource/<int:resource_id>/mark_complete", methods=['POST'])
 @login_required
@@ -475,8 +671,10 @@ def mark_resource_complete(resource_id):
     else:
         completion = StudentResourceCompletion(student_id=current_user.id, resource_id=resource.id)
         db.session.add(completion)
-        current_user.last_activity = datetime.utcnow()
+        bump_version(f'user:{current_user.id}') # Busts this student's cached profile fragments
+        activity_tracker.touch(current_user.id)
         db.session.commit()
+        invalidate_cohort_summary(current_user.mentor_id)
         flash(f'Resource "{resource.title}" marked as complete!', 'success')
 
     return redirect(url_for('main.view_resources'))
@@ -494,7 +692,9 @@ def edit_resource(resource_id):
         resource.description = form.description.data
         resource.link_url = form.link_url.data
         resource.category = form.category.data
+        bump_version('resources')
         db.session.commit()
+        knowledge_index.mark_stale()
         flash('Resource updated successfully!', 'success')
         return redirect(url_for('main.view_resources'))
     elif request.method == 'GET':
@@ -511,7 +711,9 @@ def delete_resource(resource_id):
     if resource.creator != current_user and not current_user.is_admin():
         abort(403)
     db.session.delete(resource)
+    bump_version('resources')
     db.session.commit()
+    knowledge_index.mark_stale()
     flash('Resource deleted successfully!', 'success')
     return redirect(url_for('main.view_resources'))
 
@@ -531,6 +733,12 @@ def mentor_dashboard():
                            students=students, announcements=announcements,
                            recent_sessions=recent_sessions, my_quizzes=my_quizzes)
 
+@main.route("/mentor/cohort")
+@role_required('mentor')
+def mentor_cohort_summary():
+    cohort = get_cohort_summary(current_user.id)
+    return render_template('mentor_cohort.html', title='Cohort Summary', cohort=cohort)
+
 @main.route("/mentor/log_session/<int:student_id>", methods=['GET', 'POST'])
 @login_required
 def log_session(student_id):
@@ -552,9 +760,12 @@ def log_session(student_id):
             progress_notes=form.progress_notes.data
         )
         db.session.add(session_log)
-        current_user.last_activity = datetime.utcnow()
-        student.last_activity = datetime.utcnow()
+        db.session.flush() # Assigns the id and session_date the rollup row needs
+        fold_session(session_log)
+        activity_tracker.touch(current_user.id)
+        activity_tracker.touch(student.id)
         db.session.commit()
+        invalidate_cohort_summary(student.mentor_id)
         flash(f'Session with {student.username} logged successfully!', 'success')
         return redirect(url_for('main.mentor_dashboard'))
     
@@ -568,7 +779,7 @@ def student_sessions(student_id):
         flash('You are not authorized to view sessions for this student.', 'danger')
         abort(403)
     
-    sessions = SessionLog.query.filter_by(student_id=student.id).order_by(SessionLog.session_date.desc()).all()
+    sessions = read_models.session_list(student.id)
     return render_template('student_sessions.html', title=f'Sessions for {student.username}', student=student, sessions=sessions)
 
 
@@ -580,6 +791,7 @@ def create_quiz():
     if form.validate_on_submit():
         quiz = Quiz(title=form.title.data, description=form.description.data, creator=current_user)
         db.session.add(quiz)
+        bump_version('quizzes') # Profiles show the total possible score
         db.session.commit()
 
         for q_form in form.questions.entries:
@@ -592,8 +804,7 @@ def create_quiz():
                 db.session.add(option)
             db.session.commit()
         
-        current_user.last_activity = datetime.utcnow()
-        db.session.commit()
+        activity_tracker.touch(current_user.id)
         flash(f'Quiz "{quiz.title}" created successfully!', 'success')
         return redirect(url_for('main.mentor_dashboard'))
     return render_template('create_quiz.html', title='Create New Quiz', form=form, legend='Create New Quiz')
@@ -623,10 +834,10 @@ def edit_quiz(quiz_id):
             for opt_form in q_form.options.entries:
                 option = Option(question_id=question.id, option_text=opt_form.option_text.data, is_correct=opt_form.is_correct.data)
                 db.session.add(option)
+        bump_version('quizzes') # Profiles show quiz titles and the total possible score
         db.session.commit()
         
-        current_user.last_activity = datetime.utcnow()
-        db.session.commit()
+        activity_tracker.touch(current_user.id)
         flash(f'Quiz "{quiz.title}" updated successfully!', 'success')
         return redirect(url_for('main.mentor_dashboard'))
 
@@ -640,6 +851,7 @@ def delete_quiz(quiz_id):
     if quiz.creator != current_user and not current_user.is_admin():
         abort(403)
     db.session.delete(quiz)
+    bump_version('quizzes') # Its attempts disappear from student profiles
     db.session.commit()
     flash(f'Quiz "{quiz.title}" deleted.', 'success')
     return redirect(url_for('main.mentor_dashboard'))
@@ -651,7 +863,7 @@ def quiz_results(quiz_id):
     if quiz.creator != current_user and not current_user.is_admin():
         abort(403)
     
-    attempts = quiz.attempts.order_by(QuizAttempt.attempt_date.desc()).all()
+    attempts = read_models.quiz_attempt_list(quiz.id)
     return render_template('quiz_results.html', title=f'Results for "{quiz.title}"', quiz=quiz, attempts=attempts)
 
 
@@ -660,20 +872,26 @@ def quiz_results(quiz_id):
 @main.route("/student/dashboard")
 @role_required('student')
 def student_dashboard():
-    mentor = None
-    if current_user.mentor_id:
-        mentor = User.query.get(current_user.mentor_id)
+    mentor = current_user.assigned_mentor
 
     announcements = Announcement.query.order_by(Announcement.date_posted.desc()).limit(5).all()
     recent_sessions = current_user.sessions_as_student.order_by(SessionLog.session_date.desc()).limit(5).all()
 
-    available_quizzes = Quiz.query.order_by(Quiz.date_created.desc()).all()
-    
-    attempted_quiz_ids = {attempt.quiz_id for attempt in current_user.quiz_attempts.all()}
-    
+    # Only the visible page of quizzes is loaded. The LEFT JOIN against this student's attempts
+    # gives each row its attempt id (or None), so no attempt objects or full quiz list are needed.
+    page = request.args.get('page', 1, type=int)
+    available_quizzes = db.session.query(
+        Quiz.id, Quiz.title, Quiz.date_created,
+        User.username.label('creator_username'),
+        QuizAttempt.id.label('attempt_id')
+    ).join(User, User.id == Quiz.creator_id) \
+     .outerjoin(QuizAttempt, and_(QuizAttempt.quiz_id == Quiz.id, QuizAttempt.student_id == current_user.id)) \
+     .order_by(Quiz.date_created.desc(), Quiz.id.desc()) \
+     .paginate(page=page, per_page=10, error_out=False)
+
     return render_template('student_dashboard.html', title='Student Dashboard',
                            mentor=mentor, announcements=announcements, recent_sessions=recent_sessions,
-                           available_quizzes=available_quizzes, attempted_quiz_ids=attempted_quiz_ids)
+                           available_quizzes=available_quizzes)
 
 @main.route("/student/take_quiz/<int:quiz_id>", methods=['GET', 'POST'])
 @role_required('student')
@@ -685,12 +903,17 @@ def take_quiz(quiz_id):
         flash(f'You have already attempted "{quiz.title}". You can view your results.', 'info')
         return redirect(url_for('main.view_quiz_attempt', attempt_id=existing_attempt.id))
 
-    form = QuizAttemptForm(quiz_id=quiz.id)
+    # Question fields must exist on the form class before it is instantiated, otherwise WTForms
+    # never binds them and form['question_<id>'] fails in the template.
+    class TakeQuizForm(QuizAttemptForm):
+        pass
 
     for question in quiz.questions.all():
         if question.question_type == 'multiple_choice':
             choices = [(str(option.id), option.option_text) for option in question.options.all()]
-            setattr(form, f'question_{question.id}', SelectField(question.question_text, choices=choices, validators=[DataRequired()]))
+            setattr(TakeQuizForm, f'question_{question.id}', RadioField(question.question_text, choices=choices, validators=[DataRequired()]))
+
+    form = TakeQuizForm(quiz_id=quiz.id)
 
     if form.validate_on_submit():
         new_attempt = QuizAttempt(quiz_id=quiz.id, student_id=current_user.id, total_questions=quiz.questions.count())
@@ -714,8 +937,10 @@ def take_quiz(quiz_id):
                     db.session.add(quiz_answer)
         
         new_attempt.score = score
-        current_user.last_activity = datetime.utcnow()
+        bump_version(f'user:{current_user.id}') # Busts this student's cached profile fragments
+        activity_tracker.touch(current_user.id)
         db.session.commit()
+        invalidate_cohort_summary(current_user.mentor_id)
         
         flash(f'You completed "{quiz.title}" with a score of {score} out of {new_attempt.total_questions}!', 'success')
         return redirect(url_for('main.view_quiz_attempt', attempt_id=new_attempt.id))
@@ -748,77 +973,154 @@ def view_quiz_attempt(attempt_id):
 
 # --- Messaging Routes ---
 
+def _can_message(other_user):
+    # Compares ids from the identity cache instead of loading the related mentor objects.
+    return (current_user.is_admin() or
+            (current_user.is_mentor() and other_user['mentor_id'] == current_user.id) or
+            (current_user.is_student() and other_user['id'] == current_user.mentor_id) or
+            (current_user.id == other_user['id']))
+
+def _conversation_filter(other_user):
+    return (((Message.sender_id == current_user.id) & (Message.receiver_id == other_user['id'])) |
+            ((Message.sender_id == other_user['id']) & (Message.receiver_id == current_user.id)))
+
+def _conversation_messages(other_user, messages_query=None):
+    if messages_query is None:
+        messages_query = read_models.conversation(current_user.id, other_user['id'])
+
+    # Every message is between these two users, so usernames come from them rather than msg.sender/msg.receiver.
+    usernames = {current_user.id: current_user.username, other_user['id']: other_user['username']}
+    return [
+        {
+            'sender_username': usernames.get(msg.sender_id),
+            'receiver_username': usernames.get(msg.receiver_id),
+            'content': msg.content,
+            'timestamp': msg.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+            'is_current_user_sender': msg.sender_id == current_user.id
+        }
+        for msg in messages_query
+    ]
+
+def _conversation_response(other_user):
+    # Messages are never edited, so the count and highest id change whenever the conversation does.
+    # The poll in messages.js revalidates every 3 seconds and mostly gets an empty 304.
+    count, last_id, last_timestamp = db.session.query(
+        func.count(Message.id), func.max(Message.id), func.max(Message.timestamp)
+    ).filter(_conversation_filter(other_user)).one()
+    conditional = ConditionalResponse('messages', other_user['id'], other_user['username'], count, last_id,
+                                      last_modified=last_timestamp)
+    if conditional.fresh:
+        return conditional.not_modified()
+    return conditional.apply(jsonify(_conversation_messages(other_user)))
+
 @main.route("/messages/<int:other_user_id>", methods=['GET', 'POST'])
 @login_required
 def messages(other_user_id):
-    other_user = User.query.get_or_404(other_user_id)
+    other_user = identity_cache.get(other_user_id)
+    if other_user is None:
+        abort(404)
 
-    if not (current_user.is_admin() or
-            (current_user.is_mentor() and other_user.assigned_mentor == current_user) or
-            (current_user.is_student() and other_user == current_user.assigned_mentor) or
-            (current_user.id == other_user_id)):
+    if not _can_message(other_user):
         flash('You are not authorized to message this user.', 'danger')
         abort(403)
 
     form = MessageForm()
     if form.validate_on_submit():
-        message = Message(sender=current_user, receiver=other_user, content=form.content.data)
+        message = Message(sender_id=current_user.id, receiver_id=other_user_id, content=form.content.data)
         db.session.add(message)
-        current_user.last_activity = datetime.utcnow()
-        other_user.last_activity = datetime.utcnow()
+        activity_tracker.touch(current_user.id)
+        activity_tracker.touch(other_user_id)
         db.session.commit()
-        return redirect(url_for('main.messages', other_user_id=other_user.id))
+        return redirect(url_for('main.messages', other_user_id=other_user_id))
 
-    messages_query = Message.query.filter(
-        ((Message.sender_id == current_user.id) & (Message.receiver_id == other_user.id)) |
-        ((Message.sender_id == other_user.id) & (Message.receiver_id == current_user.id))
-    ).order_by(Message.timestamp).all()
-
-    message_data = [
-        {
-            'sender_username': msg.sender.username,
-            'receiver_username': msg.receiver.username,
-            'content': msg.content,
-            'timestamp': msg.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-            'is_current_user_sender': msg.sender_id == current_user.id
-        }
-        for msg in messages_query
-    ]
-    return jsonify(message_data)
+    return _conversation_response(other_user)
 
 @main.route("/api/messages/<int:other_user_id>")
 @login_required
 def get_messages_api(other_user_id):
-    other_user = User.query.get_or_404(other_user_id)
+    other_user = identity_cache.get(other_user_id)
+    if other_user is None:
+        abort(404)
 
-    if not (current_user.is_admin() or
-            (current_user.is_mentor() and other_user.assigned_mentor == current_user) or
-            (current_user.is_student() and other_user == current_user.assigned_mentor) or
-            (current_user.id == other_user_id)):
+    if not _can_message(other_user):
         return jsonify({"error": "Unauthorized"}), 403
 
-    messages_query = Message.query.filter(
-        ((Message.sender_id == current_user.id) & (Message.receiver_id == other_user.id)) |
-        ((Message.sender_id == other_user.id) & (Message.receiver_id == current_user.id))
-    ).order_by(Message.timestamp).all()
+    return _conversation_response(other_user)
 
-    message_data = [
-        {
-            'sender_username': msg.sender.username,
-            'receiver_username': msg.receiver.username,
-            'content': msg.content,
-            'timestamp': msg.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-            'is_current_user_sender': msg.sender_id == current_user.id
-        }
-        for msg in messages_query
-    ]
-    return jsonify(message_data)
+@main.route("/api/messages/<int:other_user_id>/archive")
+@login_required
+def get_archived_messages_api(other_user_id):
+    # Messages moved to cold storage by archive_messages.py: without ?month= the archived months of the
+    # conversation (newest first), with ?month=YYYY-MM that month's messages in the same shape as /api/messages.
+    other_user = identity_cache.get(other_user_id)
+    if other_user is None:
+        abort(404)
+
+    if not _can_message(other_user):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    month = request.args.get('month')
+    if not month:
+        months = archive.archive_months(current_user.id, other_user_id)
+        conditional = ConditionalResponse('message-archive', other_user['id'], other_user['username'],
+                                          [(row.month, row.message_count) for row in months],
+                                          last_modified=max((row.archived_at for row in months), default=None))
+        if conditional.fresh:
+            return conditional.not_modified()
+        return conditional.apply(jsonify({'months': [{'month': row.month.strftime('%Y-%m'), 'messages': row.message_count}
+                                                     for row in months]}))
+
+    try:
+        month_date = datetime.strptime(month, '%Y-%m').date()
+    except ValueError:
+        return jsonify({"error": "'month' must look like YYYY-MM."}), 400
+    archived = archive.archived_month(current_user.id, other_user_id, month_date)
+    if archived is None:
+        return jsonify({"error": f"No archived messages for {month}."}), 404
+    conditional = ConditionalResponse('message-archive', other_user['id'], other_user['username'], archived.id,
+                                      archived.message_count, last_modified=archived.archived_at)
+    if conditional.fresh: # Archived months are rewritten only when a later run adds messages to them
+        return conditional.not_modified()
+    messages = _conversation_messages(other_user, archive.unpack(archived.payload))
+    return conditional.apply(jsonify({'month': month, 'messages': messages}))
 
 # --- Chatbot Integration ---
+@main.route("/admin/chatbot/cache")
+@role_required('admin')
+def chatbot_cache_stats():
+    return jsonify(chatbot.response_cache.snapshot())
+
+@main.route("/admin/db/index-advisor")
+@role_required('admin')
+def index_advisor_report():
+    # EXPLAINs every statement captured since startup (INDEX_ADVISOR_ENABLED) and lists those that scan whole tables.
+    return jsonify(dict(index_advisor.snapshot(), **index_advisor.report()))
+
+@main.route("/admin/cache/fragments")
+@role_required('admin')
+def fragment_cache_stats():
+    return jsonify(fragment_cache.snapshot())
+
+@main.route("/admin/chatbot/client")
+@role_required('admin')
+def chatbot_client_stats():
+    return jsonify(chatbot.chatbot_client.snapshot())
+
+@main.route("/admin/chatbot/jobs")
+@role_required('admin')
+def chatbot_job_stats():
+    return jsonify(chatbot.job_queue.snapshot())
+
+@main.route("/admin/chatbot/retrieval")
+@role_required('admin')
+def chatbot_retrieval_stats():
+    return jsonify(knowledge_index.snapshot())
+
+
 @main.route("/chatbot", methods=['GET'])
 @login_required
 def chatbot_page():
-    return render_template('chatbot.html', title='AI Chatbot')
+    return render_template('chatbot.html', title='AI Chatbot', delivery=current_app.config['CHATBOT_DELIVERY'])
 
 @main.route("/api/chatbot", methods=['POST'])
 @login_required
@@ -829,8 +1131,8 @@ def chatbot_api():
     if not user_message:
         return jsonify({"error": "No message provided"}), 400
 
-    current_user.last_activity = datetime.utcnow()
-    db.session.commit()
+    activity_tracker.touch(current_user.id)
+    import requests # Loaded on the first chatbot call rather than at app startup
 
     try:
         apiKey = os.getenv("GEMINI_API_KEY") 
@@ -838,31 +1140,14 @@ def chatbot_api():
             print("Error: GEMINI_API_KEY environment variable not set.")
             return jsonify({"error": "AI service not configured. Please contact support."}), 500
 
-        chatHistory = []
-        # Add a system instruction to encourage a natural, concise, and helpful tone.
-        system_instruction = "If you get user query as Hi then respond friendly like Hi back. You are a friendly, concise, and natural learning assistant. Respond directly and helpfully. Always use Markdown for formatting (lists, bolding, paragraphs) as appropriate. Avoid explicitly stating that you are using Markdown or that you are 'ready to assist'. Focus on delivering information clearly and directly related to the user's query about learning, courses, or general doubts in the context of MentorConnect."
-        
-        chatHistory.append({ "role": "user", "parts": [{ "text": system_instruction + "\n\n" + user_message }] })
-        
-        payload = { "contents": chatHistory }
-        
-        apiUrl = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={apiKey}"
-        
-        print(f"Sending message to Gemini: {user_message}") # Debugging print
-        response = requests.post(apiUrl, headers={'Content-Type': 'application/json'}, json=payload)
-        response.raise_for_status() # Raises HTTPError for bad responses (4xx or 5xx)
-        
-        result = response.json()
-        print(f"Received response from Gemini: {result}") # Debugging print
-        
-        if result.get('candidates') and result['candidates'][0].get('content') and result['candidates'][0]['content'].get('parts'):
-            bot_response = result['candidates'][0]['content']['parts'][0]['text']
-        else:
-            bot_response = "I'm sorry, I couldn't generate a response. The AI might have returned an empty or malformed response."
-            print(f"Gemini API returned unexpected structure: {result}")
-            
+        # Repeated and FAQ-style questions are answered from the response cache without calling Gemini.
+        # Earlier turns of the user's conversation are sent along within a fixed token budget.
+        bot_response = chatbot.get_reply(user_message, apiKey, current_user.id)
         return jsonify({"response": bot_response})
 
+    except chatbot.ChatbotUnavailable as e:
+        print(f"Gemini API call skipped: {e}")
+        return jsonify({"error": str(e)}), 503
     except requests.exceptions.RequestException as e:
         print(f"Error calling Gemini API: {e}")
         return jsonify({"error": f"Failed to connect to the AI service: {str(e)}"}), 500
@@ -875,3 +1160,86 @@ def chatbot_api():
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@main.route("/api/chatbot/stream", methods=['POST'])
+@login_required
+def chatbot_stream_api():
+    user_message = request.json.get('message')
+
+    if not user_message:
+        return jsonify({"error": "No message provided"}), 400
+
+    activity_tracker.touch(current_user.id)
+
+    apiKey = os.getenv("GEMINI_API_KEY")
+    if not apiKey:
+        print("Error: GEMINI_API_KEY environment variable not set.")
+        return jsonify({"error": "AI service not configured. Please contact support."}), 500
+
+    # Relays the reply to the browser as Server-Sent Events while Gemini is still generating it.
+    # Errors after the stream has started can only be reported in-band as an 'error' event.
+    user_id = current_user.id
+    def generate():
+        import requests # Loaded on the first chatbot call rather than at app startup
+        try:
+            for chunk in chatbot.stream_reply(user_message, apiKey, user_id):
+                yield f"data: {json.dumps({'text': chunk})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except chatbot.ChatbotUnavailable as e:
+            print(f"Gemini API call skipped: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        except requests.exceptions.RequestException as e:
+            print(f"Error calling Gemini API: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': f'Failed to connect to the AI service: {str(e)}'})}\n\n"
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            yield f"event: error\ndata: {json.dumps({'error': f'An unexpected error occurred: {str(e)}'})}\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # Stop nginx from buffering the stream
+    return response
+
+@main.route("/api/chatbot/jobs", methods=['POST'])
+@login_required
+def chatbot_submit_job():
+    user_message = request.json.get('message')
+
+    if not user_message:
+        return jsonify({"error": "No message provided"}), 400
+
+    activity_tracker.touch(current_user.id)
+
+    apiKey = os.getenv("GEMINI_API_KEY")
+    if not apiKey:
+        print("Error: GEMINI_API_KEY environment variable not set.")
+        return jsonify({"error": "AI service not configured. Please contact support."}), 500
+
+    # Cached and FAQ answers are returned straight away; everything else runs on the chatbot
+    # thread pool and the client polls the returned status URL.
+    answer = chatbot.local_reply(user_message, chatbot.Conversation(current_user.id))
+    if answer is not None:
+        return jsonify({"status": "done", "text": answer})
+
+    try:
+        job_id = chatbot.job_queue.submit(current_user.id, user_message, apiKey)
+    except chatbot.ChatbotUnavailable as e:
+        return jsonify({"error": str(e)}), 503
+
+    return jsonify({"status": "pending", "job_id": job_id,
+                    "status_url": url_for('main.chatbot_job_status', job_id=job_id)}), 202
+
+@main.route("/api/chatbot/reset", methods=['POST'])
+@login_required
+def chatbot_reset():
+    # Starts a new conversation: earlier turns are no longer sent as context.
+    chatbot.Conversation(current_user.id).reset()
+    return jsonify({"status": "reset"})
+
+@main.route("/api/chatbot/jobs/<string:job_id>")
+@login_required
+def chatbot_job_status(job_id):
+    job_status = chatbot.job_queue.status(job_id, current_user.id)
+    if job_status is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job_status)
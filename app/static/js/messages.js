@@ -13,7 +13,8 @@ document.addEventListener('DOMContentLoaded', function() {
     let lastMessageCount = 0;
     function fetchMessages() {
         // 'fetchMessagesUrl' and 'currentUserId' are passed from the Jinja template in messages.html
-        fetch(fetchMessagesUrl)
+        // 'no-cache' revalidates the browser's copy via ETag, so an unchanged conversation costs an empty 304.
+        fetch(fetchMessagesUrl, { cache: 'no-cache' })
             .then(response => {
                 if (!response.ok) {
                     throw new Error('Network response was not ok');
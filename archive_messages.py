@@ -0,0 +1,58 @@
+# mentor_connect_ngo_enhanced/archive_messages.py
+import argparse
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app import create_app, db
+from app.archive import archive_messages, archive_stats
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Moves messages older than MESSAGE_ARCHIVE_AFTER_DAYS (or --older-than-days) from the message table into
+# compressed monthly archives (see app/archive.py). Safe to re-run: months that already have an archive row
+# are extended. Schedule it nightly; run init_db.py first so the message_archive table exists.
+# Example: python archive_messages.py --older-than-days 365 --vacuum
+#          python archive_messages.py --stats
+
+
+def vacuum():
+    """Returns the space freed by the deleted rows to the filesystem (SQLite) or refreshes statistics (PostgreSQL)."""
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        if conn.dialect.name == 'sqlite':
+            conn.execute(text('VACUUM'))
+        elif conn.dialect.name == 'postgresql':
+            conn.execute(text('VACUUM ANALYZE message'))
+
+
+def print_stats():
+    for name, value in archive_stats().items():
+        print(f"  {name}: {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive old messages into compressed monthly batches.')
+    parser.add_argument('--older-than-days', type=int, help='archive messages older than this (default: MESSAGE_ARCHIVE_AFTER_DAYS)')
+    parser.add_argument('--batch-size', type=int, help='messages moved per transaction (default: MESSAGE_ARCHIVE_BATCH_SIZE)')
+    parser.add_argument('--vacuum', action='store_true', help='reclaim the freed space afterwards (locks the database while it runs)')
+    parser.add_argument('--stats', action='store_true', help='only print hot/archived message counts')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.stats:
+            print_stats()
+            return
+        days = args.older_than_days if args.older_than_days is not None else app.config['MESSAGE_ARCHIVE_AFTER_DAYS']
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        print(f"Archiving messages sent before {cutoff:%Y-%m-%d %H:%M} UTC")
+        stats = archive_messages(cutoff, args.batch_size or app.config['MESSAGE_ARCHIVE_BATCH_SIZE'],
+                                 progress=lambda stats: print(f"  {stats['messages']} messages archived..."))
+        print(f"Archived {stats['messages']} messages from {stats['conversations']} conversations "
+              f"into {stats['months']} monthly batches in {stats['seconds']}s")
+        if args.vacuum:
+            vacuum()
+            print('Vacuumed.')
+        print_stats()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,821 @@
+# mentor_connect_ngo_enhanced/benchmark.py
+import argparse
+import contextlib
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sqlalchemy import event, func
+from app import create_app, db
+from app.index_advisor import index_advisor
+from app.models import User, Quiz, Question, Option, QuizAttempt, SessionLog
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Drives the hot routes through the Flask test client as real (seeded) users and reports latency
+# percentiles and SQL statement counts per route, plus cold-start cost of importing the app and
+# running create_app(). Run it against a database filled by seed_data.py.
+# Example: python benchmark.py --save-baseline benchmark_baseline.json
+#          python benchmark.py --compare benchmark_baseline.json   (exits with 1 on a regression)
+#          python benchmark.py manage_users quiz_results --memory   (adds peak Python memory per request)
+#          python benchmark.py --index-advice   (lists the queries the routes ran that still scan whole tables)
+#          python benchmark.py chatbot_upstream --threads 16   (load scenarios are only run when named)
+#          python benchmark.py chatbot_saturation --web-workers 8   (dashboard latency while the chatbot is saturated)
+#          python benchmark.py export_memory --export-rows 100000,1000000,3000000   (peak memory per export, scratch databases)
+
+SCENARIOS = ['startup', 'user_profile', 'view_resources', 'get_messages_api', 'take_quiz', 'admin_dashboard',
+             'manage_users', 'quiz_results', 'student_sessions']
+
+# Measures a cold start in a fresh interpreter: importing the app package, then create_app().
+# 'queries' counts SQL statements run by the factory, which should stay at zero.
+STARTUP_PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+statements = []
+event.listen(Engine, 'before_cursor_execute', lambda *args: statements.append(1))
+imported = time.perf_counter()
+from app import create_app
+app_imported = time.perf_counter()
+create_app()
+finished = time.perf_counter()
+print(json.dumps({'import': app_imported - imported, 'factory': finished - app_imported,
+                  'total': finished - started, 'queries': len(statements), 'modules': len(sys.modules)}))
+'''
+
+
+def percentile(sorted_values, fraction):
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def pick_actors():
+    """The users and objects the scenarios run as: a student with a mentor, that mentor, an admin and an unattempted quiz."""
+    student = User.query.filter(User.role == 'student', User.mentor_id != None).order_by(User.id).first()
+    admin = User.query.filter_by(role='admin').order_by(User.id).first()
+    if student is None or admin is None:
+        sys.exit('The database needs at least one admin and one student with a mentor. Run seed_data.py first.')
+    attempted = QuizAttempt.query.with_entities(QuizAttempt.quiz_id).filter_by(student_id=student.id)
+    quiz = Quiz.query.filter(~Quiz.id.in_(attempted)).order_by(Quiz.id).first()
+    # The longest lists, for the list-page scenarios.
+    busiest_quiz = db.session.query(QuizAttempt.quiz_id).group_by(QuizAttempt.quiz_id) \
+        .order_by(func.count(QuizAttempt.id).desc()).limit(1).scalar()
+    busiest_student = db.session.query(SessionLog.student_id).group_by(SessionLog.student_id) \
+        .order_by(func.count(SessionLog.id).desc()).limit(1).scalar()
+    return {'student': student.id, 'student_username': student.username, 'mentor': student.mentor_id,
+            'admin': admin.id, 'quiz': quiz.id if quiz else None,
+            'busiest_quiz': busiest_quiz, 'busiest_student': busiest_student}
+
+
+def build_scenarios(actors):
+    # (name, user id to log in as, path). take_quiz is measured as the GET that renders the form,
+    # since submitting it creates an attempt and would change what later iterations measure.
+    scenarios = {
+        'user_profile': (actors['student'], f"/profile/{actors['student_username']}"),
+        'view_resources': (actors['student'], '/resources'),
+        'get_messages_api': (actors['student'], f"/api/messages/{actors['mentor']}"),
+        'take_quiz': (actors['student'], f"/student/take_quiz/{actors['quiz']}") if actors['quiz'] else None,
+        'admin_dashboard': (actors['admin'], '/admin/dashboard'),
+        'manage_users': (actors['admin'], '/admin/users'),
+        'quiz_results': (actors['admin'], f"/mentor/quizzes/{actors['busiest_quiz']}/results") if actors['busiest_quiz'] else None,
+        'student_sessions': (actors['admin'], f"/mentor/sessions/{actors['busiest_student']}") if actors['busiest_student'] else None,
+    }
+    return {name: scenario for name, scenario in scenarios.items() if scenario is not None}
+
+
+def logged_in_client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    return client
+
+
+def measure_startup(iterations):
+    """Runs STARTUP_PROBE in `iterations` fresh interpreters and summarises the timings."""
+    probes = []
+    for i in range(iterations):
+        output = subprocess.run([sys.executable, '-c', STARTUP_PROBE], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout
+        probes.append(json.loads(output.strip().splitlines()[-1]))
+
+    totals = sorted(probe['total'] for probe in probes)
+    return {
+        'path': 'create_app()',
+        'iterations': iterations,
+        'p50_ms': round(percentile(totals, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(totals, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(totals, 0.99) * 1000, 2),
+        'import_p50_ms': round(percentile(sorted(probe['import'] for probe in probes), 0.50) * 1000, 2),
+        'factory_p50_ms': round(percentile(sorted(probe['factory'] for probe in probes), 0.50) * 1000, 2),
+        'modules': max(probe['modules'] for probe in probes),
+        'queries': max(probe['queries'] for probe in probes),
+    }
+
+
+def measure_peak_memory(client, path, runs=3):
+    """Highest Python heap growth (tracemalloc) seen while serving `path`, in KiB."""
+    peaks = []
+    for i in range(runs):
+        tracemalloc.start()
+        client.get(path)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return round(max(peaks) / 1024, 1)
+
+
+def run_benchmark(app, names, iterations, warmup, memory=False):
+    statements = [0]
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        statements[0] += 1
+
+    with app.app_context():
+        actors = pick_actors()
+        scenarios = build_scenarios(actors)
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+
+    results = {}
+    try:
+        for name in names:
+            if name not in scenarios:
+                print(f"  {name}: skipped (no suitable data)")
+                continue
+            user_id, path = scenarios[name]
+            client = logged_in_client(app, user_id)
+
+            timings, query_counts = [], []
+            for i in range(warmup + iterations):
+                statements[0] = 0
+                started = time.perf_counter()
+                response = client.get(path)
+                elapsed = time.perf_counter() - started
+                if response.status_code != 200:
+                    sys.exit(f"{name}: GET {path} returned {response.status_code}")
+                if i >= warmup:
+                    timings.append(elapsed)
+                    query_counts.append(statements[0])
+
+            timings.sort()
+            results[name] = {
+                'path': path,
+                'iterations': iterations,
+                'p50_ms': round(percentile(timings, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(timings, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(timings, 0.99) * 1000, 2),
+                'queries': max(query_counts),
+            }
+            if memory: # Measured separately, since tracing slows every allocation down
+                results[name]['peak_kb'] = measure_peak_memory(client, path)
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', count_statement)
+    return results
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256 # The default backlog of 5 drops connections under the load scenarios
+
+
+class StubUpstream:
+    """
+    Local stand-in for the Gemini API used by the chatbot load scenarios. Answers generateContent with a
+    canned JSON reply and streamGenerateContent with three SSE chunks, after `latency` seconds, or with a
+    503 while `failing` is set. Counts requests, TCP connections and the most requests in flight at once.
+    """
+
+    REPLY = {'candidates': [{'content': {'parts': [{'text': 'A stub answer from the benchmark upstream.'}]}}]}
+
+    def __init__(self, latency=0.2):
+        self.latency = latency
+        self.failing = False
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stats = {'requests': 0, 'connections': 0, 'max_in_flight': 0}
+
+    def _enter(self):
+        with self._lock:
+            self.stats['requests'] += 1
+            self._in_flight += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self._in_flight)
+
+    def _leave(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1' # Keep-alive, like the real upstream
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.stats['connections'] += 1
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                stub._enter()
+                try:
+                    if stub.failing:
+                        self._send(503, 'application/json', [b'{"error": "unavailable"}'])
+                    elif 'stream' in self.path: # Chunks spread over the latency, as the reply is generated
+                        chunk = json.dumps(stub.REPLY).encode('utf-8')
+                        self._send(200, 'text/event-stream', [b'data: ' + chunk + b'\r\n\r\n'] * 3, stub.latency / 3)
+                    else: # The whole reply is generated before the first byte is sent
+                        time.sleep(stub.latency)
+                        self._send(200, 'application/json', [json.dumps(stub.REPLY).encode('utf-8')])
+                finally:
+                    stub._leave()
+
+            def _send(self, status, content_type, parts, gap=0):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(sum(len(part) for part in parts)))
+                self.end_headers()
+                for part in parts:
+                    time.sleep(gap)
+                    self.wfile.write(part)
+                    self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._server = _StubServer(('127.0.0.1', 0), self._handler())
+        threading.Thread(target=self._server.serve_forever, name='stub-upstream', daemon=True).start()
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/v1beta/models/stub"
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def run_concurrently(threads, calls, call):
+    """
+    Runs `call(thread_index, call_index)` `calls` times on each of `threads` threads, all started together.
+    Returns (sorted latencies in seconds, error count, wall-clock seconds).
+    """
+    timings, errors = [], [0]
+    lock = threading.Lock()
+    start = threading.Barrier(threads + 1)
+
+    def worker(thread_index):
+        start.wait()
+        for call_index in range(calls):
+            started = time.perf_counter()
+            try:
+                call(thread_index, call_index)
+                failed = False
+            except Exception:
+                failed = True
+            elapsed = time.perf_counter() - started
+            with lock:
+                timings.append(elapsed)
+                errors[0] += failed
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    start.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    timings.sort()
+    return timings, errors[0], time.perf_counter() - started
+
+
+class BackgroundReader:
+    """
+    Calls `request()` in a loop on its own thread, `pause` seconds apart, while a load scenario runs,
+    recording each latency: the "everyone else" traffic whose latency a burst should not hurt.
+    """
+
+    def __init__(self, request, pause=0.05):
+        self.request = request
+        self.pause = pause
+        self.timings = []
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            self.request()
+            self.timings.append(time.perf_counter() - started)
+            self._stop.wait(self.pause)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name='benchmark-reader', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self, prefix):
+        timings = sorted(self.timings)
+        return {f"{prefix}_p50_ms": round(percentile(timings, 0.50) * 1000, 1),
+                f"{prefix}_p95_ms": round(percentile(timings, 0.95) * 1000, 1)}
+
+
+def load_row(label, timings, errors, wall, **extra):
+    row = {'case': label, 'calls': len(timings), 'errors': errors, 'per_s': round(len(timings) / wall, 1),
+           'p50_ms': round(percentile(timings, 0.50) * 1000, 1), 'p95_ms': round(percentile(timings, 0.95) * 1000, 1)}
+    row.update(extra)
+    return row
+
+
+def load_chatbot_upstream(args):
+    """
+    Chatbot upstream calls against a stub server with injected latency: a bare requests.post per call
+    (a new connection each time, no timeout, no limit) against the shared ChatbotClient (pooled keep-alive
+    connections, timeouts, concurrency limit, retries and circuit breaker). Each client is run against a
+    healthy upstream, one slower than the read timeout and one answering 503.
+    """
+    import requests
+    from app.chatbot import ChatbotClient, ChatbotUnavailable, _build_payload
+
+    payload = _build_payload('How do I prepare for my algebra exam?')
+    read_timeout = 0.5
+    slow_latency = read_timeout * 4
+    rows = []
+    with StubUpstream(args.upstream_latency or 0.2) as stub:
+        app = create_app()
+        app.config.update(CHATBOT_READ_TIMEOUT=read_timeout, CHATBOT_BREAKER_RESET=60)
+        clients = {
+            'requests.post': lambda: lambda t, i: requests.post(stub.url, params={'key': 'bench'}, json=payload).raise_for_status(),
+            'ChatbotClient': lambda: ChatbotClient(app).post_json,
+        }
+        for condition, latency, failing in [('healthy', stub.latency, False),
+                                            ('slow', slow_latency, False), ('failing', stub.latency, True)]:
+            calls = args.calls if condition != 'slow' else max(1, args.calls // 5)
+            for name, make_client in clients.items():
+                stub.latency, stub.failing = latency, failing
+                stub.reset()
+                call = make_client()
+                if name == 'ChatbotClient':
+                    client_call = call
+                    call = lambda t, i: client_call(stub.url, payload, params={'key': 'bench'})
+                timings, errors, wall = run_concurrently(args.threads, calls, call)
+                rows.append(load_row(f"{condition}, {name}", timings, errors, wall, upstream_requests=stub.stats['requests'],
+                                     connections=stub.stats['connections'], max_in_flight=stub.stats['max_in_flight']))
+    return rows
+
+
+def load_chatbot_saturation(args):
+    """
+    Dashboard latency while students keep the chatbot busy. Requests are served by a fixed pool of
+    --web-workers threads standing in for the WSGI server's workers, against a stub upstream. Compared:
+    idle, the synchronous /api/chatbot endpoint (a worker is held for the whole upstream call) and the job
+    queue (/api/chatbot/jobs, polled every 250 ms like the chat page; the worker is freed once the job is queued).
+    """
+    from app.chatbot import job_queue
+
+    with StubUpstream(args.upstream_latency or 1.0) as stub:
+        with environment({'CHATBOT_API_URL': stub.url + ':generateContent', 'GEMINI_API_KEY': os.getenv('GEMINI_API_KEY') or 'benchmark',
+                          'CHATBOT_STREAM_API_URL': stub.url + ':streamGenerateContent'}):
+            app = create_app()
+            with app.app_context():
+                students = [student.id for student in User.query.filter_by(role='student').order_by(User.id).limit(args.threads + 1)]
+            if len(students) < args.threads + 1:
+                sys.exit(f"The database needs {args.threads + 1} students. Run seed_data.py first.")
+            reader_client = logged_in_client(app, students[0])
+            clients = [logged_in_client(app, student_id) for student_id in students[1:]]
+            web_workers = ThreadPoolExecutor(max_workers=args.web_workers, thread_name_prefix='web')
+
+            def serve(request):
+                return web_workers.submit(request).result()
+
+            def dashboard():
+                if serve(lambda: reader_client.get('/student/dashboard')).status_code != 200:
+                    raise RuntimeError('GET /student/dashboard failed')
+
+            def ask_sync(thread_index, call_index):
+                response = serve(lambda: clients[thread_index].post('/api/chatbot', json={'message': f"Question {uuid.uuid4().hex}"}))
+                if response.status_code != 200:
+                    raise RuntimeError(f"POST /api/chatbot returned {response.status_code}")
+
+            submits, depths = [], [0]
+
+            def ask_job(thread_index, call_index):
+                started = time.perf_counter()
+                response = serve(lambda: clients[thread_index].post('/api/chatbot/jobs', json={'message': f"Question {uuid.uuid4().hex}"}))
+                submits.append(time.perf_counter() - started)
+                depths[0] = max(depths[0], job_queue.snapshot()['queue_depth'])
+                if response.status_code != 202:
+                    raise RuntimeError(f"POST /api/chatbot/jobs returned {response.status_code}")
+                status_url = response.get_json()['status_url']
+                while True:
+                    time.sleep(0.25)
+                    job = serve(lambda: clients[thread_index].get(status_url)).get_json()
+                    if job['status'] == 'done':
+                        return
+                    if job['status'] == 'error':
+                        raise RuntimeError(job['error'])
+
+            rows = []
+            with contextlib.redirect_stdout(open(os.devnull, 'w')): # The chatbot module logs every upstream call
+                with BackgroundReader(dashboard) as reader:
+                    time.sleep(3)
+                rows.append({'case': 'idle', **reader.summary('dashboard')})
+                for label, ask in [('sync /api/chatbot', ask_sync), ('job queue', ask_job)]:
+                    stub.reset()
+                    with BackgroundReader(dashboard) as reader:
+                        timings, errors, wall = run_concurrently(args.threads, args.calls, ask)
+                    extra = {'submit_p50_ms': round(percentile(sorted(submits), 0.50) * 1000, 1),
+                             'max_queue_depth': depths[0]} if ask is ask_job else {}
+                    rows.append(load_row(label, timings, errors, wall, **reader.summary('dashboard'),
+                                         upstream_max_in_flight=stub.stats['max_in_flight'], **extra))
+            web_workers.shutdown()
+    return rows
+
+
+def load_login_rush(args):
+    """
+    A morning login rush: `threads` clients each POST /login `calls` times with the seeded password,
+    with bcrypt run inline in the request threads and then in the hashing process pool, while one
+    student keeps loading their dashboard.
+    """
+    from app.passwords import password_hasher
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        students = User.query.filter(User.role == 'student').order_by(User.id).limit(args.threads * args.calls + 1).all()
+        if len(students) < 2:
+            sys.exit('The database needs students. Run seed_data.py first.')
+        reader_id, emails = students[0].id, [student.email for student in students[1:]]
+        # Seeded users share one hash. Upgrade it first if it is weaker than the current work factor,
+        # so that neither run also pays for rehashing on login.
+        upgraded = None
+        for student in students:
+            if password_hasher.needs_rehash(student.password):
+                upgraded = upgraded or password_hasher.hash('password')
+                student.password = upgraded
+        db.session.commit()
+
+    def login(thread_index, call_index):
+        email = emails[(thread_index * args.calls + call_index) % len(emails)]
+        response = app.test_client().post('/login', data={'email': email, 'password': 'password'})
+        if response.status_code != 302:
+            raise RuntimeError(f"POST /login returned {response.status_code}")
+
+    reader_client = logged_in_client(app, reader_id)
+    app.config['BCRYPT_LOG_ROUNDS'] = password_hasher.rounds # Both runs at the same cost, not recalibrated
+    rows = []
+    for label, workers in [('inline', 0), ('process pool', app.config['PASSWORD_HASH_WORKERS'] or 2)]:
+        app.config['PASSWORD_HASH_WORKERS'] = workers
+        password_hasher.shutdown()
+        password_hasher.init_app(app)
+        login(0, 0) # Starts the pool's processes outside the measurement
+        with BackgroundReader(lambda: reader_client.get('/student/dashboard')) as reader:
+            timings, errors, wall = run_concurrently(args.threads, args.calls, login)
+        rows.append(load_row(f"{label} ({workers} processes)" if workers else label, timings, errors, wall,
+                             rounds=password_hasher.rounds, **reader.summary('dashboard')))
+    password_hasher.shutdown()
+    return rows
+
+
+# Engine settings from before the SQLite production profile: rollback journal, synchronous=FULL, SQLite's
+# default cache and no mmap, and SQLAlchemy's default pool. busy_timeout stays at pysqlite's 5 s default.
+PRE_WAL_PROFILE = {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL', 'SQLITE_CACHE_SIZE': '-2000',
+                   'SQLITE_MMAP_SIZE': '0', 'DB_POOL_SIZE': '5', 'DB_MAX_OVERFLOW': '10',
+                   'DB_POOL_PRE_PING': 'False', 'DB_POOL_RECYCLE': '-1'}
+
+
+@contextlib.contextmanager
+def environment(overrides):
+    previous = {name: os.environ.get(name) for name in overrides}
+    os.environ.update(overrides)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def sqlite_path():
+    uri = os.getenv('DATABASE_URL', '')
+    if not uri.startswith('sqlite:///') or uri == 'sqlite:///:memory:':
+        sys.exit('This scenario needs DATABASE_URL to point at a SQLite file (sqlite:///path/to.db).')
+    return uri[len('sqlite:///'):]
+
+
+def write_mix_actors(threads, quizzes):
+    """
+    Per client thread: a student's email, their mentor and `quizzes` new quizzes (five questions each)
+    with an answer for every question. The quizzes are created for the run, in the scratch copy.
+    """
+    students = User.query.filter(User.role == 'student', User.mentor_id != None).order_by(User.id).limit(threads).all()
+    if len(students) < threads:
+        sys.exit(f"The database needs {threads} students with mentors. Run seed_data.py first.")
+    plans = []
+    for n in range(quizzes):
+        quiz = Quiz(title=f"Write mix quiz {n}", creator_id=students[0].mentor_id)
+        db.session.add(quiz)
+        db.session.flush()
+        answers = {}
+        for index in range(5):
+            question = Question(quiz_id=quiz.id, question_text=f"Question {index}?")
+            db.session.add(question)
+            db.session.flush()
+            options = [Option(question_id=question.id, option_text=f"Option {k}", is_correct=k == 0) for k in range(4)]
+            db.session.add_all(options)
+            db.session.flush()
+            answers[f"question_{question.id}"] = str(options[0].id)
+        plans.append((quiz.id, answers))
+    db.session.commit()
+    return [{'email': student.email, 'mentor': student.mentor_id, 'quizzes': plans} for student in students]
+
+
+def load_write_mix(args):
+    """
+    Concurrent writes through the real routes: each client thread cycles through a login, a message to
+    its mentor and a quiz submission. Runs on a fresh copy of the SQLite database once with the engine
+    settings from before the production profile (PRE_WAL_PROFILE) and once with the configured ones.
+    Logins verify a cost-4 hash, inline, so that bcrypt does not hide the database's share of the time.
+    """
+    from app.activity import activity_tracker
+    from benchmark_archive import copy_database
+
+    source = sqlite_path()
+    rows = []
+    for label, profile in [('before (rollback journal)', PRE_WAL_PROFILE), ('configured profile', {})]:
+        scratch_dir = tempfile.mkdtemp(prefix='write-mix-')
+        scratch = os.path.join(scratch_dir, 'copy.db')
+        copy_database(source, scratch)
+        overrides = dict(profile, DATABASE_URL='sqlite:///' + scratch, BCRYPT_LOG_ROUNDS='4', PASSWORD_HASH_WORKERS='0')
+        try:
+            with environment(overrides):
+                app = create_app()
+            app.config['WTF_CSRF_ENABLED'] = False
+            with app.app_context():
+                actors = write_mix_actors(args.threads, args.calls // 3 + 1)
+                cheap = app.extensions['password_hasher'].hash('password')
+                User.query.filter(User.email.in_([actor['email'] for actor in actors])).update(
+                    {User.password: cheap}, synchronize_session=False)
+                db.session.commit()
+                journal_mode = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+            clients = [None] * args.threads
+
+            def expect_redirect(response, what):
+                if response.status_code != 302:
+                    raise RuntimeError(f"{what} returned {response.status_code}")
+
+            def write(thread_index, call_index):
+                actor = actors[thread_index]
+                step = call_index % 3
+                if step == 0 or clients[thread_index] is None:
+                    clients[thread_index] = app.test_client()
+                    expect_redirect(clients[thread_index].post('/login', data={'email': actor['email'], 'password': 'password'}), 'login')
+                elif step == 1:
+                    expect_redirect(clients[thread_index].post(f"/messages/{actor['mentor']}",
+                                                               data={'content': f"Benchmark message {call_index}"}), 'message')
+                else:
+                    quiz_id, answers = actor['quizzes'][call_index // 3]
+                    expect_redirect(clients[thread_index].post(f"/student/take_quiz/{quiz_id}", data=answers), 'quiz submit')
+
+            timings, errors, wall = run_concurrently(args.threads, args.calls, write)
+            activity_tracker.flush()
+            rows.append(load_row(label, timings, errors, wall, journal_mode=journal_mode))
+            with app.app_context():
+                db.engine.dispose()
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+    return rows
+
+
+# Streams one export in a fresh interpreter and reports its size and memory high-water marks: the
+# tracemalloc peak (Python heap) and the growth of ru_maxrss (whole process, in KiB on Linux) while exporting.
+EXPORT_PROBE = '''
+import csv, json, resource, sys, time, tracemalloc, zlib
+from app import create_app
+from app.exports import generate_export
+dataset, fmt, compress = sys.argv[1], sys.argv[2], sys.argv[3] == 'gzip'
+
+
+def text_lines(chunks):
+    # Decoded lines with their endings, rejoined across chunk (and gzip block) boundaries for csv.reader.
+    decompressor = zlib.decompressobj(31) if compress else None
+    rest = ''
+    for chunk in chunks:
+        lines = (rest + (decompressor.decompress(chunk) if compress else chunk).decode('utf-8')).splitlines(keepends=True)
+        rest = lines.pop() if lines and not lines[-1].endswith('\\n') else ''
+        yield from lines
+    if rest:
+        yield rest
+
+
+app = create_app()
+with app.app_context():
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = 0
+
+    def measured():
+        global size
+        for chunk in generate_export(dataset, fmt, compress):
+            size += len(chunk)
+            yield chunk
+
+    # csv.reader keeps quoted fields with embedded newlines in one record; NDJSON escapes them.
+    records = sum(1 for record in (csv.reader(text_lines(measured())) if fmt == 'csv' else text_lines(measured())))
+    finished = time.perf_counter()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(json.dumps({'records': records, 'bytes': size, 'seconds': finished - started, 'peak': peak,
+                      'maxrss_growth': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline}))
+'''
+
+EXPORT_DATASETS = ('sessions', 'quiz_answers', 'users')
+
+
+def load_export_memory(args):
+    """
+    Peak memory per export as the tables grow. For every size in --export-rows a scratch SQLite database
+    is seeded (seed_data.py, fixed seed) with that many sessions and quiz answers, then each dataset is
+    exported by EXPORT_PROBE in a fresh interpreter, which also counts the records it streams (gzip is
+    decompressed on the fly). Memory should stay flat while the row counts grow.
+    mmap is turned off so the database file is not counted in ru_maxrss; SQLite's page cache still adds up
+    to SQLITE_CACHE_SIZE to it. Times include the tracemalloc overhead.
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    rows = []
+    for size in args.export_rows:
+        with tempfile.TemporaryDirectory() as scratch:
+            # Five questions per quiz, so size // 5 attempts give `size` answers; attempts are unique per
+            # quiz and student, so the student count grows with the size.
+            seed = ['--profile', 'small', '--messages', '0', '--sessions', str(size), '--attempts', str(size // 5),
+                    '--students', str(max(500, size // 250)), '--questions-per-quiz', '5']
+            with environment({'DATABASE_URL': f"sqlite:///{os.path.join(scratch, 'export.db')}", 'BCRYPT_LOG_ROUNDS': '4',
+                              'SQLITE_MMAP_SIZE': '0'}):
+                started = time.perf_counter()
+                subprocess.run([sys.executable, os.path.join(root, 'seed_data.py')] + seed,
+                               capture_output=True, text=True, cwd=root, check=True)
+                print(f"Seeded {size} sessions and quiz answers in {time.perf_counter() - started:.0f}s", file=sys.stderr)
+                for dataset in EXPORT_DATASETS:
+                    output = subprocess.run([sys.executable, '-c', EXPORT_PROBE, dataset, args.export_format,
+                                             'gzip' if args.export_gzip else 'plain'],
+                                            capture_output=True, text=True, cwd=root, check=True).stdout
+                    probe = json.loads(output.strip().splitlines()[-1])
+                    rows.append({'case': f"{dataset} @ {size}",
+                                 'rows': probe['records'] - (args.export_format == 'csv'), # Minus the CSV header
+                                 'mb': round(probe['bytes'] / 2 ** 20, 1), 'seconds': round(probe['seconds'], 1),
+                                 'peak_heap_kib': round(probe['peak'] / 1024), 'maxrss_growth_kib': probe['maxrss_growth']})
+    return rows
+
+
+def compare(results, baseline, tolerance):
+    """Returns a list of regression messages: p95 slower than baseline by more than `tolerance`, or more queries."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {result['p95_ms']} ms vs baseline {previous['p95_ms']} ms")
+        if result['queries'] > previous['queries']:
+            regressions.append(f"{name}: {result['queries']} queries vs baseline {previous['queries']}")
+        if 'peak_kb' in result and 'peak_kb' in previous and result['peak_kb'] > previous['peak_kb'] * (1 + tolerance):
+            regressions.append(f"{name}: peak memory {result['peak_kb']} KiB vs baseline {previous['peak_kb']} KiB")
+    return regressions
+
+
+def print_index_advice(report):
+    findings = report['full_scans']
+    print(f"\nIndex advice: {len(findings)} of {report['statements']} distinct statements scan a whole table")
+    for finding in findings:
+        if 'error' in finding:
+            print(f"  could not EXPLAIN ({finding['error']}): {finding['statement'][:160]}")
+            continue
+        tables = ', '.join(f"{scan['table']} ({scan['rows']} rows)" for scan in finding['scans'])
+        print(f"  x{finding['count']:<5} scans {tables}" + ('' if finding['filtered'] else ' (no WHERE clause)'))
+        print(f"         {finding['statement'][:240]}")
+        for line in finding['plan']:
+            print(f"           {line}")
+
+
+def print_load_results(name, rows):
+    columns = list(dict.fromkeys(column for row in rows for column in row))
+    widths = {column: max(len(column), *(len(str(row.get(column, ''))) for row in rows)) + 2 for column in columns}
+    print(f"\n{name}")
+    print(''.join(f"{column:<{widths[column]}}" if column == 'case' else f"{column:>{widths[column]}}" for column in columns))
+    for row in rows:
+        print(''.join(f"{str(row.get(column, '')):<{widths[column]}}" if column == 'case'
+                      else f"{str(row.get(column, '')):>{widths[column]}}" for column in columns))
+
+
+# Concurrent load scenarios, only run when named on the command line. Each prints its own table.
+LOAD_SCENARIOS = {
+    'chatbot_upstream': load_chatbot_upstream,
+    'chatbot_saturation': load_chatbot_saturation,
+    'login_rush': load_login_rush,
+    'write_mix': load_write_mix,
+    'export_memory': load_export_memory,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the hot MentorConnect routes.')
+    parser.add_argument('scenarios', nargs='*', metavar='route',
+                        help=f"routes to benchmark, any of: {', '.join(SCENARIOS)} (default: all), "
+                             f"or load scenarios: {', '.join(LOAD_SCENARIOS)}")
+    parser.add_argument('-n', '--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5, help='untimed requests per route before measuring')
+    parser.add_argument('--startup-runs', type=int, default=10, help='fresh interpreters started for the startup benchmark')
+    parser.add_argument('--memory', action='store_true', help='also record peak Python memory per request (tracemalloc)')
+    parser.add_argument('--index-advice', action='store_true',
+                        help='EXPLAIN every query the routes ran and report full table scans')
+    parser.add_argument('--threads', type=int, default=16, help='concurrent clients in the load scenarios')
+    parser.add_argument('--calls', type=int, default=10, help='requests per client thread in the load scenarios')
+    parser.add_argument('--upstream-latency', type=float,
+                        help='seconds the stub chatbot upstream takes to answer (default: 0.2, 1 for chatbot_saturation)')
+    parser.add_argument('--web-workers', type=int, default=8, help='request threads serving chatbot_saturation')
+    parser.add_argument('--export-rows', type=lambda value: [int(size) for size in value.split(',')], default=[100000, 1000000],
+                        help='comma-separated session/quiz answer counts seeded for export_memory (default: 100000,1000000)')
+    parser.add_argument('--export-format', choices=('csv', 'ndjson'), default='csv', help='format used by export_memory')
+    parser.add_argument('--export-gzip', action='store_true', help='gzip the exports in export_memory')
+    parser.add_argument('--save-baseline', metavar='FILE', help='write the results as the new baseline')
+    parser.add_argument('--compare', metavar='FILE', help='compare against a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed p95 slowdown before flagging (0.2 = 20%%)')
+    args = parser.parse_args()
+    unknown = [name for name in args.scenarios if name not in SCENARIOS and name not in LOAD_SCENARIOS]
+    if unknown:
+        parser.error(f"unknown route(s): {', '.join(unknown)}")
+
+    loads = [name for name in args.scenarios if name in LOAD_SCENARIOS]
+    names = [name for name in args.scenarios if name in SCENARIOS] or ([] if loads else SCENARIOS)
+    results = {}
+    if 'startup' in names:
+        results['startup'] = measure_startup(args.startup_runs)
+    routes = [name for name in names if name != 'startup']
+    if routes:
+        app = create_app()
+        app.config['WTF_CSRF_ENABLED'] = False
+        with app.app_context():
+            engine = db.engine
+        if args.index_advice:
+            with index_advisor.capture(engine):
+                results.update(run_benchmark(app, routes, args.iterations, args.warmup, args.memory))
+        else:
+            results.update(run_benchmark(app, routes, args.iterations, args.warmup, args.memory))
+
+    if results:
+        print(f"{'route':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}" + (f"{'peak KiB':>12}" if args.memory else ''))
+    for name, result in results.items():
+        print(f"{name:<20}{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}{result['queries']:>10}"
+              + (f"{result.get('peak_kb', ''):>12}" if args.memory else ''))
+    if 'startup' in results:
+        startup = results['startup']
+        print(f"startup: import {startup['import_p50_ms']} ms + create_app {startup['factory_p50_ms']} ms (p50), "
+              f"{startup['modules']} modules loaded")
+
+    for name in loads:
+        print_load_results(name, LOAD_SCENARIOS[name](args))
+
+    if args.index_advice and routes:
+        with app.app_context():
+            print_index_advice(index_advisor.report())
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        if regressions:
+            print('Regressions:')
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print('No regressions against the baseline.')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# mentor_connect_ngo_enhanced/benchmark_archive.py
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Measures what message archival buys on a copy of a seeded SQLite database: the database file size and the
+# latency of the two hot message paths (the full conversation fetch and the 3-second poll that is answered
+# with a 304), before and after archive_messages.py moves old messages to cold storage and vacuums.
+# The configured database is never modified.
+# Example: python seed_data.py --profile small --messages 2000000 --history-days 1095
+#          python benchmark_archive.py --older-than-days 90
+
+
+def copy_database(source, target):
+    """Consistent copy of a live SQLite database (including WAL contents) via the backup API."""
+    with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+        src.backup(dst)
+
+
+def file_size_mb(path):
+    return round(os.path.getsize(path) / (1024 * 1024), 1)
+
+
+def measure_conversations(app, conversations, iterations):
+    """p50/p95 ms of the full fetch and of the revalidating poll over the sampled (student, mentor) conversations."""
+    from benchmark import percentile
+    full, poll, messages = [], [], 0
+    for student_id, mentor_id in conversations:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(student_id)
+            session['_fresh'] = True
+        path = f"/api/messages/{mentor_id}"
+        for i in range(iterations):
+            started = time.perf_counter()
+            response = client.get(path)
+            full.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            revalidated = client.get(path, headers={'If-None-Match': response.headers['ETag']})
+            poll.append(time.perf_counter() - started)
+            if response.status_code != 200 or revalidated.status_code != 304:
+                sys.exit(f"GET {path} returned {response.status_code}/{revalidated.status_code}")
+        messages += len(response.get_json())
+    full.sort()
+    poll.sort()
+    return {'full_p50_ms': round(percentile(full, 0.50) * 1000, 2), 'full_p95_ms': round(percentile(full, 0.95) * 1000, 2),
+            'poll_p50_ms': round(percentile(poll, 0.50) * 1000, 2), 'poll_p95_ms': round(percentile(poll, 0.95) * 1000, 2),
+            'messages_per_conversation': messages // len(conversations)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark message archival on a copy of the database.')
+    parser.add_argument('--older-than-days', type=int, default=90, help='archive cutoff used for the run')
+    parser.add_argument('--conversations', type=int, default=20, help='student/mentor conversations sampled')
+    parser.add_argument('-n', '--iterations', type=int, default=5, help='requests per conversation and path')
+    parser.add_argument('--scratch', help='where to put the copy (default: a temporary file, removed afterwards)')
+    args = parser.parse_args()
+
+    source_uri = os.getenv('DATABASE_URL', '')
+    if not source_uri.startswith('sqlite:///') or source_uri in ('sqlite://', 'sqlite:///:memory:'):
+        sys.exit('benchmark_archive.py needs DATABASE_URL to point at a SQLite file (sqlite:///path/to.db).')
+    scratch_dir = None if args.scratch else tempfile.mkdtemp(prefix='archive-bench-')
+    scratch = args.scratch or os.path.join(scratch_dir, 'copy.db')
+    print(f"Copying {source_uri[len('sqlite:///'):]} to {scratch}")
+    copy_database(source_uri[len('sqlite:///'):], scratch)
+    os.environ['DATABASE_URL'] = 'sqlite:///' + scratch
+
+    from app import create_app, db
+    from app.archive import archive_messages, archive_stats
+    from app.database import init_schema
+    from app.models import User
+    from archive_messages import vacuum
+
+    app = create_app()
+    try:
+        with app.app_context():
+            init_schema(db) # Adds message_archive (and any missing index) to older copies
+            conversations = [(student.id, student.mentor_id) for student in User.query.filter(
+                User.role == 'student', User.mentor_id != None).order_by(User.id).limit(args.conversations)]
+            if not conversations:
+                sys.exit('The database needs students with mentors. Run seed_data.py first.')
+            rows = {'before': dict(archive_stats(), size_mb=file_size_mb(scratch))}
+        rows['before'].update(measure_conversations(app, conversations, args.iterations))
+
+        with app.app_context():
+            cutoff = datetime.utcnow() - timedelta(days=args.older_than_days)
+            archived = archive_messages(cutoff, app.config['MESSAGE_ARCHIVE_BATCH_SIZE'])
+            started = time.perf_counter()
+            vacuum()
+            vacuum_seconds = time.perf_counter() - started
+            rows['after'] = dict(archive_stats(), size_mb=file_size_mb(scratch))
+        rows['after'].update(measure_conversations(app, conversations, args.iterations))
+    finally:
+        if scratch_dir:
+            shutil.rmtree(scratch_dir, ignore_errors=True) # The copy and its -wal/-shm files
+
+    print(f"Archived {archived['messages']} messages older than {args.older_than_days} days into "
+          f"{archived['months']} monthly batches in {archived['seconds']}s (+ {vacuum_seconds:.1f}s VACUUM)")
+    columns = ['hot_messages', 'archived_messages', 'archive_payload_bytes', 'size_mb', 'messages_per_conversation',
+               'full_p50_ms', 'full_p95_ms', 'poll_p50_ms', 'poll_p95_ms']
+    print(f"{'':<28}{'before':>14}{'after':>14}")
+    for column in columns:
+        print(f"{column:<28}{rows['before'][column]:>14}{rows['after'][column]:>14}")
+
+if __name__ == '__main__':
+    main()
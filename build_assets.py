@@ -0,0 +1,123 @@
+# mentor_connect_ngo_enhanced/build_assets.py
+import argparse
+import gzip
+import hashlib
+import json
+import os
+from app.assets import BUILDS_NAME, DIST_DIR, MANIFEST_NAME
+
+try:
+    import brotli # Optional: pip install brotli
+except ImportError:
+    brotli = None
+
+# Copies every file under app/static/ to app/static/dist/ with a content hash in its name
+# (css/style.css -> css/style.<hash>.css), writes .gz and .br variants next to it, and records the mapping
+# in dist/manifest.json for asset_url() (see app/assets.py). Run it on every deploy, after pulling changes
+# to the static files, and restart the app so it reads the new manifest.
+# The files of the previous --keep builds stay on disk (listed in dist/builds.json) and are still served:
+# workers that have not restarted yet and pages cached by browsers keep referring to the old names.
+# Example: python build_assets.py --keep 5
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'static')
+HASH_LENGTH = 12
+KEEP_BUILDS = 3
+VARIANT_SUFFIXES = ('.gz', '.br')
+
+
+def fingerprint(relative_path, content):
+    stem, extension = os.path.splitext(relative_path)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{extension}"
+
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as output_file:
+        output_file.write(content)
+
+
+def load_builds(dist_folder):
+    """
+    Fingerprinted names of the earlier builds, newest first. A dist folder built before builds.json
+    existed counts as one earlier build, holding the files in its manifest.
+    """
+    for name, to_builds in [(BUILDS_NAME, lambda builds: builds),
+                            (MANIFEST_NAME, lambda manifest: [sorted(set(manifest.values()))])]:
+        try:
+            with open(os.path.join(dist_folder, name)) as json_file:
+                return to_builds(json.load(json_file))
+        except FileNotFoundError:
+            continue
+    return []
+
+
+def prune(dist_folder, builds):
+    """Deletes built files (and their .gz/.br variants) that none of `builds` refers to. Returns the number deleted."""
+    kept = set().union(*builds)
+    removed = 0
+    for root, dirs, files in os.walk(dist_folder, topdown=False):
+        for name in files:
+            path = os.path.join(root, name)
+            relative_path = os.path.relpath(path, dist_folder).replace(os.sep, '/')
+            base, suffix = os.path.splitext(relative_path)
+            if relative_path in (MANIFEST_NAME, BUILDS_NAME) or relative_path in kept \
+                    or (suffix in VARIANT_SUFFIXES and base in kept):
+                continue
+            os.remove(path)
+            removed += 1
+        if root != dist_folder and not os.listdir(root):
+            os.rmdir(root)
+    return removed
+
+
+def build(static_folder, keep=KEEP_BUILDS):
+    dist_folder = os.path.join(static_folder, DIST_DIR)
+    builds = load_builds(dist_folder)
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != dist_folder)
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            relative_path = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as source_file:
+                content = source_file.read()
+
+            built = fingerprint(relative_path, content)
+            target = os.path.join(dist_folder, built)
+            write_file(target, content)
+            manifest[relative_path] = built
+
+            sizes = [f"{len(content)} B"]
+            variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))] # mtime=0 keeps builds reproducible
+            if brotli is not None:
+                variants.append(('.br', brotli.compress(content, quality=11)))
+            for suffix, compressed in variants:
+                if len(compressed) < len(content): # Not worth serving if it does not shrink (e.g. images)
+                    write_file(target + suffix, compressed)
+                    sizes.append(f"{suffix} {len(compressed)} B")
+            print(f"  {relative_path} -> {built} ({', '.join(sizes)})")
+
+    current = sorted(set(manifest.values()))
+    builds = [current] + [files for files in builds if files and files != current][:max(keep, 0)]
+    removed = prune(dist_folder, builds)
+    if removed:
+        print(f"  removed {removed} files no longer used by the last {keep + 1} builds")
+    write_file(os.path.join(dist_folder, BUILDS_NAME), json.dumps(builds, indent=2).encode('utf-8'))
+    write_file(os.path.join(dist_folder, MANIFEST_NAME), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fingerprint and precompress the static assets.')
+    parser.add_argument('--static-folder', default=STATIC_FOLDER, help='folder to build (default: app/static)')
+    parser.add_argument('--keep', type=int, default=KEEP_BUILDS,
+                        help=f"earlier builds whose files are kept and served (default: {KEEP_BUILDS})")
+    args = parser.parse_args()
+
+    if brotli is None:
+        print("brotli is not installed; writing gzip variants only (pip install brotli).")
+    manifest = build(args.static_folder, args.keep)
+    print(f"Built {len(manifest)} assets into {os.path.join(args.static_folder, DIST_DIR)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+# mentor_connect_ngo_enhanced/export_data.py
+import argparse
+import sys
+from app import create_app
+from app.exports import EXPORT_DATASETS, EXPORT_FORMATS, generate_export
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Streams a dataset to a file (or stdout) without loading the table into memory.
+# Example: python export_data.py sessions --format ndjson --gzip -o sessions.ndjson.gz
+
+def main():
+    parser = argparse.ArgumentParser(description='Export MentorConnect data as CSV or NDJSON.')
+    parser.add_argument('dataset', choices=sorted(EXPORT_DATASETS))
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+    parser.add_argument('--gzip', action='store_true', help='gzip-compress the output')
+    parser.add_argument('-o', '--output', help='output file (defaults to stdout)')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+        try:
+            for chunk in generate_export(args.dataset, args.format, args.gzip):
+                out.write(chunk)
+        finally:
+            if args.output:
+                out.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+# mentor_connect_ngo_enhanced/init_db.py
+from app import create_app, db
+from app.database import init_schema
+from app.analytics import rebuild_session_rollup
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Creates missing tables and indexes and rebuilds the session analytics rollup. Run once per deploy
+# (and after pulling model changes) instead of on every app start, so that workers don't race each other on DDL.
+
+def init_database():
+    app = create_app()
+    with app.app_context():
+        created_tables, created_indexes = init_schema(db)
+        if not created_tables and not created_indexes:
+            print("Database schema is up to date.")
+        for table in created_tables:
+            print(f"Created table '{table}'.")
+        for index in created_indexes:
+            print(f"Created index '{index}'.")
+        print(f"Rebuilt the session analytics rollup ({rebuild_session_rollup()} sessions).")
+
+if __name__ == '__main__':
+    init_database()
@@ -0,0 +1,115 @@
+# mentor_connect_ngo_enhanced/replay_chatbot_log.py
+import argparse
+import contextlib
+import json
+import os
+import tempfile
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Replays a log of chatbot questions through POST /api/chatbot against a stub Gemini upstream, once with the
+# local FAQ/resource index and once without it, and reports how many questions were answered directly, how
+# many upstream calls were made and the answer latency. The log carries the FAQs and resources it is replayed
+# against, which are loaded into a scratch SQLite database, so the configured database is never touched.
+# The response cache is off, so repeated questions measure the index rather than the cache.
+# Example: python replay_chatbot_log.py
+#          python replay_chatbot_log.py --log chatbot_query_log.json --upstream-latency 0.8 --show-local
+
+MODES = {
+    'with index': {},
+    # Coverage never exceeds 1.0, so no FAQ is answered directly, and no snippets are added to prompts.
+    'without index': {'CHATBOT_FAQ_THRESHOLD': '2', 'CHATBOT_CONTEXT_DOCS': '0'},
+}
+
+
+def load_content(app, log):
+    """Creates the schema and the log's FAQs and resources. Returns one student id per mode, so conversations start empty."""
+    from app import db
+    from app.database import init_schema
+    from app.models import User, FAQ, Resource
+
+    with app.app_context():
+        init_schema(db)
+        admin = User(username='replay_admin', email='replay_admin@example.org', password='!', role='admin')
+        students = [User(username=f"replay_student{n}", email=f"replay_student{n}@example.org", password='!', role='student')
+                    for n in range(len(MODES))]
+        db.session.add_all([admin] + students)
+        db.session.flush()
+        db.session.add_all([FAQ(question=faq['question'], answer=faq['answer'], user_id=admin.id) for faq in log['faqs']])
+        db.session.add_all([Resource(title=resource['title'], description=resource['description'], category=resource['category'],
+                                     link_url=resource['link_url'], user_id=admin.id) for resource in log['resources']])
+        db.session.commit()
+        return [student.id for student in students]
+
+
+def replay(app, student_id, queries, stub):
+    """Asks every query in order as one student. Returns the report row and the queries answered locally."""
+    from app.retrieval import knowledge_index
+    from benchmark import logged_in_client, percentile
+
+    client = logged_in_client(app, student_id)
+    stub.reset()
+    local_before = knowledge_index.snapshot()['local_answers']
+    timings, errors, local = [], 0, []
+    with contextlib.redirect_stdout(open(os.devnull, 'w')): # The chatbot module logs every upstream call
+        for query in queries:
+            requests_before = stub.stats['requests']
+            started = time.perf_counter()
+            response = client.post('/api/chatbot', json={'message': query})
+            timings.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+            elif stub.stats['requests'] == requests_before:
+                local.append(query)
+
+    direct = knowledge_index.snapshot()['local_answers'] - local_before
+    timings.sort()
+    return {
+        'queries': len(queries), 'errors': errors, 'direct': direct,
+        'direct_rate': f"{100 * direct / len(queries):.0f}%", 'upstream_calls': stub.stats['requests'],
+        'p50_ms': round(percentile(timings, 0.50) * 1000, 1), 'p95_ms': round(percentile(timings, 0.95) * 1000, 1),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 1),
+    }, local
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a chatbot query log with and without the local retrieval index.')
+    parser.add_argument('--log', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chatbot_query_log.json'),
+                        help='JSON file with "queries", "faqs" and "resources" (default: chatbot_query_log.json)')
+    parser.add_argument('--upstream-latency', type=float, default=0.5, help='seconds the stub upstream takes to answer')
+    parser.add_argument('--show-local', action='store_true', help='list the queries answered without an upstream call')
+    args = parser.parse_args()
+
+    with open(args.log) as log_file:
+        log = json.load(log_file)
+
+    from app import create_app
+    from benchmark import StubUpstream, environment, print_load_results
+
+    rows = []
+    with tempfile.TemporaryDirectory() as scratch, StubUpstream(args.upstream_latency) as stub:
+        base = {'DATABASE_URL': f"sqlite:///{os.path.join(scratch, 'replay.db')}", 'CHATBOT_CACHE_ENABLED': 'False',
+                'CHATBOT_API_URL': stub.url + ':generateContent', 'GEMINI_API_KEY': os.getenv('GEMINI_API_KEY') or 'replay',
+                'BCRYPT_LOG_ROUNDS': '4'}
+        with environment(base):
+            student_ids = load_content(create_app(), log)
+        for (mode, overrides), student_id in zip(MODES.items(), student_ids):
+            with environment(dict(base, **overrides)):
+                row, local = replay(create_app(), student_id, log['queries'], stub)
+            rows.append({'case': mode, **row})
+            if args.show_local:
+                print(f"{mode}: answered locally ({len(local)})")
+                for query in local:
+                    print(f"  {query}")
+
+    print_load_results(f"{os.path.basename(args.log)} ({len(log['queries'])} queries, "
+                       f"{len(log['faqs'])} FAQs, {len(log['resources'])} resources)", rows)
+    with_index, without_index = rows
+    print(f"\nUpstream calls: {without_index['upstream_calls']} -> {with_index['upstream_calls']}, "
+          f"median latency: {without_index['p50_ms']} ms -> {with_index['p50_ms']} ms, "
+          f"mean latency: {without_index['mean_ms']} ms -> {with_index['mean_ms']} ms")
+
+if __name__ == '__main__':
+    main()
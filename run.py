@@ -8,10 +8,19 @@ from app import create_app
 debug_mode = os.environ.get('FLASK_DEBUG') == '1'
 
 # Creates the Flask application instance using the factory function `create_app()`.
-app = create_app()
+# Processes spawned by the password hashing pool re-import this module as '__mp_main__'; they only run
+# bcrypt, so they skip building an app (database engine, calibration, background threads).
+if __name__ != '__mp_main__':
+    app = create_app()
 
 # This block ensures that the Flask development server runs only when the script is executed directly.
 if __name__ == '__main__':
+    # The development server creates any missing tables itself; in production run `python init_db.py` on deploy.
+    from app import db
+    from app.database import init_schema
+    with app.app_context():
+        init_schema(db)
+
     # Runs the Flask development server.
     # 'debug=debug_mode' dynamically enables/disables debugging features.
     app.run(debug=debug_mode)
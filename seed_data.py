@@ -0,0 +1,228 @@
+# mentor_connect_ngo_enhanced/seed_data.py
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert
+from app import create_app, db
+from app.database import init_schema
+from app.analytics import rebuild_session_rollup
+from app.passwords import password_hasher
+from app.models import User, Message, Announcement, SessionLog, Resource, StudentResourceCompletion, \
+                       Quiz, Question, Option, QuizAttempt, QuizAnswer
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Fills the database with synthetic but realistic data for benchmarking (see benchmark.py).
+# Rows are written with bulk INSERTs in batches and explicit ids, so foreign keys can be
+# computed instead of read back. Every seeded user has the password "password".
+# Example: python seed_data.py --profile large
+#          python seed_data.py --profile small --messages 100000
+#          python seed_data.py --profile small --messages 2000000 --history-days 1095   (for benchmark_archive.py)
+
+PROFILES = {
+    'small': {
+        'admins': 2, 'mentors': 20, 'students': 500, 'messages': 20000, 'sessions': 5000,
+        'resources': 200, 'completions': 5000, 'quizzes': 100, 'questions_per_quiz': 5,
+        'attempts': 2000, 'announcements': 20,
+    },
+    'large': {
+        'admins': 5, 'mentors': 1000, 'students': 50000, 'messages': 2000000, 'sessions': 200000,
+        'resources': 5000, 'completions': 500000, 'quizzes': 10000, 'questions_per_quiz': 10,
+        'attempts': 500000, 'announcements': 200, # 500k attempts x 10 questions = 5M answers
+    },
+}
+
+OPTIONS_PER_QUESTION = 4
+HISTORY_DAYS = 180
+TOPICS = ['python', 'algebra', 'physics', 'writing', 'career planning', 'chemistry', 'history', 'statistics',
+          'web development', 'biology', 'public speaking', 'data science']
+CATEGORIES = ['Academics', 'Career', 'Life Skills', 'Technology', 'Wellbeing']
+
+
+class Seeder:
+    def __init__(self, counts, batch_size, rng, history_days=HISTORY_DAYS):
+        self.counts = counts
+        self.batch_size = batch_size
+        self.rng = rng
+        self.history_days = history_days
+        self.now = datetime.utcnow()
+
+    def _random_time(self):
+        return self.now - timedelta(seconds=self.rng.randint(0, self.history_days * 86400))
+
+    def _next_id(self, model):
+        return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+    def _bulk_insert(self, model, rows):
+        """Inserts rows from an iterable in batches of batch_size. Returns the number of rows written."""
+        table = model.__table__
+        started = time.perf_counter()
+        batch = []
+        written = 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                db.session.execute(insert(table), batch)
+                db.session.commit()
+                written += len(batch)
+                batch = []
+        if batch:
+            db.session.execute(insert(table), batch)
+            db.session.commit()
+            written += len(batch)
+        print(f"  {table.name}: {written} rows in {time.perf_counter() - started:.1f}s")
+        return written
+
+    def run(self):
+        counts = self.counts
+        password_hash = password_hasher.hash('password') # One hash shared by all seeded users
+
+        # Users: admins, then mentors, then students (each assigned a mentor).
+        first_user = self._next_id(User)
+        admin_ids = range(first_user, first_user + counts['admins'])
+        mentor_ids = range(admin_ids.stop, admin_ids.stop + counts['mentors'])
+        student_ids = range(mentor_ids.stop, mentor_ids.stop + counts['students'])
+
+        def users():
+            for role, ids in (('admin', admin_ids), ('mentor', mentor_ids), ('student', student_ids)):
+                for user_id in ids:
+                    username = f"{role}{user_id}" # Ids are unique, so usernames stay unique across repeated runs
+                    yield {
+                        'id': user_id, 'username': username, 'email': f"{username}@example.org",
+                        'password': password_hash, 'role': role,
+                        'bio': f"Seeded {role} account.",
+                        'expertise_areas': ', '.join(self.rng.sample(TOPICS, 3)),
+                        'contact_preference': 'email',
+                        'mentor_id': mentor_ids[user_id % len(mentor_ids)] if role == 'student' and mentor_ids else None,
+                        'last_login': self._random_time(), 'last_activity': self._random_time(),
+                    }
+        self._bulk_insert(User, users())
+
+        def mentor_of(student_id):
+            return mentor_ids[student_id % len(mentor_ids)]
+
+        # Messages go back and forth between students and their mentors.
+        if mentor_ids and student_ids:
+            def messages():
+                for n in range(counts['messages']):
+                    student_id = student_ids[self.rng.randrange(len(student_ids))]
+                    mentor_id = mentor_of(student_id)
+                    sender, receiver = (student_id, mentor_id) if n % 2 else (mentor_id, student_id)
+                    yield {'sender_id': sender, 'receiver_id': receiver, 'timestamp': self._random_time(),
+                           'content': f"Message {n} about {self.rng.choice(TOPICS)}."}
+            self._bulk_insert(Message, messages())
+
+            def sessions():
+                for n in range(counts['sessions']):
+                    student_id = student_ids[self.rng.randrange(len(student_ids))]
+                    yield {'mentor_id': mentor_of(student_id), 'student_id': student_id,
+                           'session_date': self._random_time(), 'duration_minutes': self.rng.choice([30, 45, 60, 90]),
+                           'topics_discussed': ', '.join(self.rng.sample(TOPICS, 2)),
+                           'progress_notes': 'Seeded session.'}
+            self._bulk_insert(SessionLog, sessions())
+
+        if admin_ids:
+            self._bulk_insert(Announcement, ({
+                'title': f"Announcement {n}", 'content': f"Seeded announcement {n}.",
+                'date_posted': self._random_time(), 'admin_id': admin_ids[n % len(admin_ids)],
+            } for n in range(counts['announcements'])))
+
+        # Resources and completions (unique per student/resource pair).
+        creators = mentor_ids or admin_ids
+        first_resource = self._next_id(Resource)
+        resource_ids = range(first_resource, first_resource + (counts['resources'] if creators else 0))
+        self._bulk_insert(Resource, ({
+            'id': resource_id, 'title': f"{self.rng.choice(TOPICS).title()} guide {resource_id}",
+            'description': f"A seeded resource about {self.rng.choice(TOPICS)}.",
+            'link_url': f"https://example.org/resources/{resource_id}", 'category': self.rng.choice(CATEGORIES),
+            'date_added': self._random_time(), 'user_id': creators[resource_id % len(creators)],
+        } for resource_id in resource_ids))
+
+        if resource_ids and student_ids:
+            completions = min(counts['completions'], len(resource_ids) * len(student_ids))
+            self._bulk_insert(StudentResourceCompletion, ({
+                'student_id': student_ids[n % len(student_ids)],
+                'resource_id': resource_ids[(n // len(student_ids) + (n % len(student_ids)) * 7) % len(resource_ids)],
+                'completed_at': self._random_time(),
+            } for n in range(completions)))
+
+        # Quizzes with questions and options; option ids are derived from question ids, first option correct.
+        per_quiz = counts['questions_per_quiz']
+        first_quiz = self._next_id(Quiz)
+        first_question = self._next_id(Question)
+        first_option = self._next_id(Option)
+        quiz_ids = range(first_quiz, first_quiz + (counts['quizzes'] if mentor_ids else 0))
+
+        def question_id(quiz_id, index):
+            return first_question + (quiz_id - first_quiz) * per_quiz + index
+
+        def option_id(question, index):
+            return first_option + (question - first_question) * OPTIONS_PER_QUESTION + index
+
+        self._bulk_insert(Quiz, ({
+            'id': quiz_id, 'title': f"{self.rng.choice(TOPICS).title()} quiz {quiz_id}",
+            'description': 'Seeded quiz.', 'date_created': self._random_time(),
+            'creator_id': mentor_ids[quiz_id % len(mentor_ids)],
+        } for quiz_id in quiz_ids))
+        self._bulk_insert(Question, ({
+            'id': question_id(quiz_id, index), 'quiz_id': quiz_id,
+            'question_text': f"Question {index + 1} of quiz {quiz_id}?", 'question_type': 'multiple_choice',
+        } for quiz_id in quiz_ids for index in range(per_quiz)))
+        self._bulk_insert(Option, ({
+            'id': option_id(question_id(quiz_id, index), choice), 'question_id': question_id(quiz_id, index),
+            'option_text': f"Option {choice + 1}", 'is_correct': choice == 0,
+        } for quiz_id in quiz_ids for index in range(per_quiz) for choice in range(OPTIONS_PER_QUESTION)))
+
+        # Attempts are unique per quiz/student pair; each one answers every question of its quiz.
+        # The chosen options are derived from the attempt id, so answers need not be kept in memory.
+        if quiz_ids and student_ids:
+            attempts = min(counts['attempts'], len(quiz_ids) * len(student_ids))
+            first_attempt = self._next_id(QuizAttempt)
+
+            def attempt_plan():
+                for n in range(attempts):
+                    student_id = student_ids[n % len(student_ids)]
+                    quiz_id = quiz_ids[(n // len(student_ids) + student_id * 37) % len(quiz_ids)]
+                    yield first_attempt + n, quiz_id, student_id
+
+            def chosen_option(attempt_id, index):
+                return ((attempt_id * 2654435761 + index * 40503) >> 7) % OPTIONS_PER_QUESTION
+
+            self._bulk_insert(QuizAttempt, ({
+                'id': attempt_id, 'quiz_id': quiz_id, 'student_id': student_id, 'attempt_date': self._random_time(),
+                'score': sum(1 for index in range(per_quiz) if chosen_option(attempt_id, index) == 0),
+                'total_questions': per_quiz,
+            } for attempt_id, quiz_id, student_id in attempt_plan()))
+            self._bulk_insert(QuizAnswer, ({
+                'attempt_id': attempt_id, 'question_id': question_id(quiz_id, index),
+                'selected_option_id': option_id(question_id(quiz_id, index), chosen_option(attempt_id, index)),
+            } for attempt_id, quiz_id, student_id in attempt_plan() for index in range(per_quiz)))
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed the MentorConnect database with synthetic data for benchmarking.')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='small')
+    for name in PROFILES['small']:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name, help=f"override the profile's {name} count")
+    parser.add_argument('--batch-size', type=int, default=10000, help='rows per INSERT batch')
+    parser.add_argument('--history-days', type=int, default=HISTORY_DAYS, help='how far back seeded timestamps go')
+    parser.add_argument('--seed', type=int, default=42, help='random seed, for reproducible datasets')
+    args = parser.parse_args()
+
+    counts = dict(PROFILES[args.profile])
+    for name in counts:
+        if getattr(args, name) is not None:
+            counts[name] = getattr(args, name)
+
+    app = create_app()
+    with app.app_context():
+        init_schema(db)
+        print(f"Seeding with {counts}")
+        started = time.perf_counter()
+        Seeder(counts, args.batch_size, random.Random(args.seed), args.history_days).run()
+        rebuild_session_rollup() # The bulk inserts bypass the rollup that log_session() maintains
+        print(f"Done in {time.perf_counter() - started:.1f}s")
+
+if __name__ == '__main__':
+    main()